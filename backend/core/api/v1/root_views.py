@@ -19,6 +19,7 @@ def api_root(request):
             'habits': '/api/v1/habits/',
             'users': '/api/v1/users/', 
             'forest': '/api/v1/forest/',
+            'sync': '/api/v1/sync/',
             'admin': '/admin/'
         },
         'documentation': {
@@ -2,6 +2,7 @@
 API v1 URL Configuration
 """
 from django.urls import path, include
+from habits.views import SyncView
 from . import root_views
 
 urlpatterns = [
@@ -13,4 +14,5 @@
     path('users/', include('users.urls')),
     path('habits/', include('habits.urls')),
     path('forest/', include('forest.urls')),
+    path('sync/', SyncView.as_view(), name='sync'),
 ]
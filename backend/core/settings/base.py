@@ -11,8 +11,11 @@
 
 from pathlib import Path
 from datetime import timedelta
+import importlib.util
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 PROJECT_ROOT = BASE_DIR.parent
@@ -196,6 +199,71 @@
     'SCHEMA_PATH_PREFIX': '/api/v1',
 }
 
+# ============================================================================
+# Cache Configuration
+# ----------------------------------------------------------------------------
+# Shared between all workers when REDIS_URL is set. Without Redis, CACHE_DIR
+# selects a file cache shared by the workers of one host, and local
+# development falls back to a per-process memory cache.
+# ============================================================================
+
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHE_DIR = os.environ.get('CACHE_DIR', '')
+
+if REDIS_URL and importlib.util.find_spec('redis') is None:
+    # A silent fallback would give every worker its own cache and stale responses
+    raise ImproperlyConfigured('REDIS_URL is set but the redis package is not installed')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'habitflow',
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# ============================================================================
+# Habits Configuration
+# ============================================================================
+
+# Days of history embedded in habit responses for the default `?entries=recent`
+HABIT_ENTRIES_RECENT_DAYS = int(os.environ.get('HABIT_ENTRIES_RECENT_DAYS', 30))
+
+# Deletes are kept this long for delta sync; older sync cursors get a full snapshot
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+
+# Ended weather events are deleted after this many days by `archive_weather_events`
+WEATHER_EVENT_RETENTION_DAYS = int(os.environ.get('WEATHER_EVENT_RETENTION_DAYS', 30))
+
+# Creature visits are deleted this many days after they ended by `sweep_creatures`
+FOREST_CREATURE_RETENTION_DAYS = int(os.environ.get('FOREST_CREATURE_RETENTION_DAYS', 7))
+
+# Accounts with more followers than this are not fanned out to follower inboxes;
+# their followers read the account's feed items directly instead
+FEED_FANOUT_MAX_FOLLOWERS = int(os.environ.get('FEED_FANOUT_MAX_FOLLOWERS', 1000))
+
+# Redis holding the leaderboard sorted sets; empty uses per-process in-memory
+# boards seeded from the database
+LEADERBOARD_REDIS_URL = os.environ.get('LEADERBOARD_REDIS_URL', REDIS_URL)
+
+# Without Redis, each process refreshes its in-memory leaderboards from the
+# database in the background this often (seconds)
+LEADERBOARD_MEMORY_REFRESH = int(os.environ.get('LEADERBOARD_MEMORY_REFRESH', 300))
+
 # ============================================================================
 # Logging Configuration
 # ============================================================================
@@ -0,0 +1,281 @@
+"""
+Caching helpers built on the Django cache
+
+Global aggregates
+-----------------
+An aggregate is an expensive, user-independent value (site-wide counts and
+similar) that is computed by a function and shared through the Django cache.
+
+- Single flight: when a value is missing or stale only the request holding
+  the refresh lock (taken with `cache.add`) recomputes it
+- Stale while revalidate: values are kept for `stale_ttl` seconds past their
+  freshness window and served to everyone else while the refresh runs
+- Pre-warming: `manage.py refresh_aggregates` recomputes every registered
+  aggregate, so scheduled refreshes keep requests off the slow path entirely
+
+Aggregates register themselves in an `aggregates` module of any installed app:
+
+    @register('community_stats', ttl=300)
+    def community_stats():
+        return {...}
+
+and are read with `get('community_stats')`.
+
+Per-user responses
+------------------
+Every user has a version per namespace ("habits", "forest"), bumped by
+`bump_user_version` when a write commits. Versions are nanosecond timestamps of the
+last change, so they double as Last-Modified times.
+
+- `cache_user_response(namespace)` caches a view's response data per user.
+  Keys embed the version, so a bump invalidates every cached response of
+  that user at once; old entries are never read again and simply expire.
+- `conditional_user_response(namespace)` adds ETag/Last-Modified headers
+  derived from the version and answers conditional GETs with 304 before
+  the view runs. Validators are only emitted when the cache is shared
+  between processes: with a per-process cache a worker that never saw a
+  write would keep confirming a stale ETag.
+"""
+import functools
+import hashlib
+import logging
+import math
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.module_loading import autodiscover_modules
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'aggregate'
+
+# How long a request without any cached value waits for another request's
+# refresh before computing the value itself
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.05
+
+
+class CachedAggregate:
+    """A named aggregate with its compute function and cache policy"""
+
+    def __init__(self, name, compute, ttl=300, stale_ttl=None, lock_timeout=30):
+        self.name = name
+        self.compute = compute
+        self.ttl = ttl
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.lock_timeout = lock_timeout
+
+    @property
+    def key(self):
+        return f'{KEY_PREFIX}:{self.name}'
+
+    @property
+    def lock_key(self):
+        return f'{self.key}:lock'
+
+    def get(self):
+        """Return the cached value, refreshing it if it is missing or stale."""
+        envelope = cache.get(self.key)
+        if envelope is not None:
+            if envelope['fresh_until'] <= time.time() and self._acquire():
+                return self._refresh_locked(fallback=envelope['value'])
+            return envelope['value']
+
+        if self._acquire():
+            return self._refresh_locked()
+        return self._wait_for_value()
+
+    def refresh(self):
+        """Recompute and store the value regardless of its freshness."""
+        value = self.compute()
+        cache.set(
+            self.key,
+            {'value': value, 'fresh_until': time.time() + self.ttl},
+            self.ttl + self.stale_ttl,
+        )
+        return value
+
+    def invalidate(self):
+        cache.delete(self.key)
+
+    def _acquire(self):
+        return cache.add(self.lock_key, 1, self.lock_timeout)
+
+    def _refresh_locked(self, fallback=None):
+        try:
+            return self.refresh()
+        except Exception:
+            if fallback is None:
+                raise
+            # A failed refresh keeps serving the stale value until it expires
+            logger.exception('Refreshing aggregate %s failed', self.name)
+            return fallback
+        finally:
+            cache.delete(self.lock_key)
+
+    def _wait_for_value(self):
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            envelope = cache.get(self.key)
+            if envelope is not None:
+                return envelope['value']
+        # The lock holder is slow or gone; compute without storing a competing value
+        return self.compute()
+
+
+_registry = {}
+
+
+def register(name, ttl=300, stale_ttl=None, lock_timeout=30):
+    """Decorator registering a function as a cached aggregate."""
+    def decorator(compute):
+        _registry[name] = CachedAggregate(name, compute, ttl, stale_ttl, lock_timeout)
+        return compute
+    return decorator
+
+
+def autodiscover():
+    """Import the `aggregates` module of every installed app."""
+    autodiscover_modules('aggregates')
+
+
+def get_aggregate(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        autodiscover()
+        return _registry[name]
+
+
+def get(name):
+    return get_aggregate(name).get()
+
+
+def registered():
+    autodiscover()
+    return dict(_registry)
+
+
+USER_RESPONSE_TTL = 300
+
+
+def _version_key(namespace, user_id):
+    return f'version:{namespace}:{user_id}'
+
+
+def _new_version():
+    # Time based, so a version key that was evicted never restarts at a value
+    # whose responses may still be cached
+    return time.time_ns()
+
+
+def user_version(namespace, user_id):
+    """Return the current version of a user's namespace, creating it if needed."""
+    key = _version_key(namespace, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id, *namespaces):
+    """Invalidate every cached response of a user in the given namespaces.
+
+    The bump runs once the current transaction commits: bumping earlier would
+    let a concurrent request cache data from before the write under the new
+    version.
+    """
+    def bump():
+        version = _new_version()
+        cache.set_many(
+            {_version_key(namespace, user_id): version for namespace in namespaces}, None
+        )
+
+    transaction.on_commit(bump, robust=True)
+
+
+def cache_user_response(namespace, ttl=USER_RESPONSE_TTL):
+    """Cache successful responses of a view method per user, path and day.
+
+    The day is part of the key because responses default to "today".
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            user_id = request.user.pk
+            key = (
+                f'response:{namespace}:{user_id}:{user_version(namespace, user_id)}:'
+                f'{timezone.now().date().isoformat()}:{request.get_full_path()}'
+            )
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = view_method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, ttl)
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_is_shared():
+    """Whether every process reads the same cache (and so the same user versions)"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def user_validators(request, namespace, period=None):
+    """Return the (etag, last_modified) pair of a user's response.
+
+    Responses default to "today", so both validators also change at midnight.
+    `period` (seconds) additionally rolls them over at that interval for
+    responses that change with time and not only on writes.
+    """
+    changed = user_version(namespace, request.user.pk) / 1e9
+    floor = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    if period:
+        floor = max(floor, time.time() // period * period)
+    # Rounded up: a second that saw a write never reads as unmodified since its start
+    last_modified = math.ceil(max(changed, floor))
+    fingerprint = f'{namespace}:{changed}:{floor}:{request.get_full_path()}'
+    etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+    return etag, last_modified
+
+
+def conditional_user_response(namespace, period=None):
+    """Serve a view method with per-user ETag/Last-Modified validators.
+
+    An `If-None-Match` that still matches gets a 304 without running the view,
+    so neither queries nor serializers run for unchanged data. Last-Modified
+    is informational only: it has one second resolution, so two writes in the
+    same second would be indistinguishable to `If-Modified-Since`.
+    Without a shared cache the view runs unchanged and no validators are sent.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            if not cache_is_shared():
+                return view_method(view, request, *args, **kwargs)
+            etag, last_modified = user_validators(request, namespace, period)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is None:
+                response = view_method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            else:
+                response = not_modified
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,296 @@
+"""
+Forest achievement engine
+
+Achievements declare their requirements in `ForestAchievement.required_actions`
+as counter targets, e.g. ``{'water_streak': 7}``. Counters are stored in
+`ForestActionCounter`, one row per user and key, and are fed by the forest
+actions a user records:
+
+- ``plant``, ``fertilize_count``, ``creatures_attracted`` and
+  ``decorations_placed`` count actions
+- ``prune_unique`` and ``weather_types`` count distinct trees pruned and
+  distinct weather types started
+- ``water_streak`` is the run of consecutive days with a watering
+- ``<season>_days`` (e.g. ``spring_days``) counts days with any action in that season
+- ``ancient_trees`` is fed by the forest tick when trees reach the ancient stage
+
+`record_actions` applies every counter change of a batch of actions with one
+UPDATE, then evaluates only the achievements whose requirements mention a
+changed key. They are found through an index from key to achievements that is
+kept in the cache, dropped when achievements change and expires after
+`INDEX_TTL` to pick up changes made elsewhere, so awarding costs
+O(affected achievements) and the action log is never rescanned.
+
+`rebuild_counters` derives the counters from the action history, for data
+recorded before they existed or after they drift (see the
+``rebuild_forest_counters`` command).
+
+Level and points milestones (achievements without counter requirements) are
+not evaluated here.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from forest.models import (
+    ForestAchievement, ForestAction, ForestActionCounter, ForestLayout, TreePosition,
+    UserForestAchievement,
+)
+
+INDEX_CACHE_KEY = 'forest:achievement_index'
+INDEX_TTL = 60 * 60  # Bounds staleness when achievements change without signals
+
+# Counters incremented once per action
+COUNTED = {
+    'plant': 'plant',
+    'fertilize': 'fertilize_count',
+    'creature_visit': 'creatures_attracted',
+    'decorate': 'decorations_placed',
+}
+
+# Counters of consecutive days with at least one such action
+STREAKS = {
+    'water': 'water_streak',
+}
+
+# Counters of distinct values: action type -> (key, lookup on ForestAction, value of an action)
+DISTINCT = {
+    'prune': ('prune_unique', 'tree_position_id', lambda action: action.tree_position_id),
+    'weather_change': (
+        'weather_types', 'metadata__new_weather', lambda action: action.metadata.get('new_weather')
+    ),
+}
+
+
+def achievement_index() -> dict:
+    """Return {counter key: [achievement, ...]} for achievements with counter requirements"""
+    index = cache.get(INDEX_CACHE_KEY)
+    if index is None:
+        index = {}
+        achievements = ForestAchievement.objects.values(
+            'id', 'code', 'required_actions', 'points_reward'
+        )
+        for achievement in achievements:
+            for key in achievement['required_actions'] or {}:
+                index.setdefault(key, []).append(achievement)
+        cache.set(INDEX_CACHE_KEY, index, INDEX_TTL)
+    return index
+
+
+def invalidate_index():
+    cache.delete(INDEX_CACHE_KEY)
+
+
+def record_actions(user_id, actions, today=None) -> list:
+    """Update the user's counters for a batch of ForestAction instances and award achievements.
+
+    Call it in the transaction that saves the actions, before they are saved:
+    distinct counters look up earlier actions to tell new values from repeats.
+    Returns the codes of the achievements awarded.
+    """
+    counts = Counter()
+    streak_keys, day_keys = set(), set()
+    distinct = {}
+    for action in actions:
+        if action.action_type in COUNTED:
+            counts[COUNTED[action.action_type]] += 1
+        if action.action_type in STREAKS:
+            streak_keys.add(STREAKS[action.action_type])
+        if action.action_type in DISTINCT:
+            value = DISTINCT[action.action_type][2](action)
+            if value is not None:
+                distinct.setdefault(action.action_type, set()).add(value)
+        if action.season_at_time:
+            day_keys.add(f'{action.season_at_time}_days')
+
+    for action_type, values in distinct.items():
+        key, lookup, _ = DISTINCT[action_type]
+        seen = set(
+            ForestAction.objects.filter(
+                user_id=user_id, action_type=action_type, **{f'{lookup}__in': values}
+            ).values_list(lookup, flat=True)
+        )
+        counts[key] += len(values - seen)
+
+    return _apply(user_id, counts, streak_keys, day_keys, today or timezone.localdate())
+
+
+def record_counts(user_id, counts, today=None) -> list:
+    """Add `counts` ({key: amount}) to the user's counters and award achievements"""
+    return _apply(user_id, Counter(counts), set(), set(), today or timezone.localdate())
+
+
+def _apply(user_id, counts, streak_keys, day_keys, today) -> list:
+    counts = +counts  # drop zero counts
+    keys = set(counts) | streak_keys | day_keys
+    if not keys:
+        return []
+
+    ForestActionCounter.objects.bulk_create(
+        [ForestActionCounter(user_id=user_id, key=key) for key in keys], ignore_conflicts=True
+    )
+    yesterday = today - timedelta(days=1)
+    whens = [When(key=key, then=F('value') + amount) for key, amount in counts.items()]
+    for key in streak_keys:
+        whens += [
+            When(key=key, last_date=today, then=F('value')),
+            When(key=key, last_date=yesterday, then=F('value') + 1),
+            When(key=key, then=Value(1)),
+        ]
+    for key in day_keys:
+        whens += [
+            When(key=key, last_date=today, then=F('value')),
+            When(key=key, then=F('value') + 1),
+        ]
+    updates = {'value': Case(*whens, default=F('value'))}
+    if streak_keys or day_keys:
+        updates['last_date'] = Case(
+            When(key__in=streak_keys | day_keys, then=Value(today)), default=F('last_date')
+        )
+    ForestActionCounter.objects.filter(user_id=user_id, key__in=keys).update(
+        updated_at=timezone.now(), **updates
+    )
+    return evaluate(user_id, keys)
+
+
+def evaluate(user_id, keys) -> list:
+    """Award the user's achievements that depend on `keys` and are now complete"""
+    index = achievement_index()
+    candidates = {
+        achievement['id']: achievement for key in keys for achievement in index.get(key, [])
+    }
+    if not candidates:
+        return []
+    earned = set(
+        UserForestAchievement.objects.filter(user_id=user_id, achievement_id__in=candidates)
+        .values_list('achievement_id', flat=True)
+    )
+    pending = [achievement for pk, achievement in candidates.items() if pk not in earned]
+    if not pending:
+        return []
+
+    required = {key for achievement in pending for key in achievement['required_actions']}
+    values = dict(
+        ForestActionCounter.objects.filter(user_id=user_id, key__in=required)
+        .values_list('key', 'value')
+    )
+    awarded = [
+        achievement for achievement in pending
+        if all(
+            values.get(key, 0) >= target
+            for key, target in achievement['required_actions'].items()
+        )
+    ]
+    if awarded:
+        _award(user_id, awarded, values)
+    return [achievement['code'] for achievement in awarded]
+
+
+def _award(user_id, awarded, values):
+    UserForestAchievement.objects.bulk_create([
+        UserForestAchievement(
+            user_id=user_id,
+            achievement_id=achievement['id'],
+            progress={key: values.get(key, 0) for key in achievement['required_actions']},
+        )
+        for achievement in awarded
+    ], ignore_conflicts=True)
+    ForestAction.objects.bulk_create([
+        ForestAction(
+            user_id=user_id,
+            action_type='achievement',
+            points_earned=achievement['points_reward'],
+            metadata={'achievement': achievement['code']},
+        )
+        for achievement in awarded
+    ])
+    ForestLayout.objects.filter(user_id=user_id).update(
+        total_points=F('total_points') + sum(
+            achievement['points_reward'] for achievement in awarded
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def count_history(actions, trees) -> dict:
+    """Derive counters from ForestAction and TreePosition querysets.
+
+    Returns {(user_id, key): (value, last_date)} as `record_actions` would have
+    left them. Only the querysets are used, so migrations can pass historical models.
+    """
+    counters = {}
+    counted = (
+        actions.filter(action_type__in=COUNTED).order_by()
+        .values('user_id', 'action_type').annotate(total=Count('id'))
+    )
+    for row in counted:
+        counters[row['user_id'], COUNTED[row['action_type']]] = (row['total'], None)
+
+    for action_type, (key, lookup, _) in DISTINCT.items():
+        seen = (
+            actions.filter(action_type=action_type, **{f'{lookup}__isnull': False})
+            .order_by().values_list('user_id', lookup).distinct()
+        )
+        for user_id, total in Counter(user_id for user_id, _ in seen).items():
+            counters[user_id, key] = (total, None)
+
+    for action_type, key in STREAKS.items():
+        days = (
+            actions.filter(action_type=action_type).annotate(day=TruncDate('timestamp'))
+            .order_by('user_id', 'day').values_list('user_id', 'day').distinct()
+        )
+        for user_id, day in days:
+            value, last_date = counters.get((user_id, key), (0, None))
+            value = value + 1 if last_date == day - timedelta(days=1) else 1
+            counters[user_id, key] = (value, day)
+
+    days = (
+        actions.exclude(season_at_time='').annotate(day=TruncDate('timestamp'))
+        .order_by('user_id', 'season_at_time', 'day')
+        .values_list('user_id', 'season_at_time', 'day').distinct()
+    )
+    for user_id, season, day in days:
+        value, _ = counters.get((user_id, f'{season}_days'), (0, None))
+        counters[user_id, f'{season}_days'] = (value + 1, day)
+
+    ancient = (
+        trees.filter(growth_stage='ancient').order_by()
+        .values('user_id').annotate(total=Count('id'))
+    )
+    for row in ancient:
+        counters[row['user_id'], 'ancient_trees'] = (row['total'], None)
+    return counters
+
+
+def rebuild_counters(user=None, batch_size=5000) -> int:
+    """Recreate counters from the action history, optionally for one user.
+
+    Achievements the rebuilt counters complete are awarded. Returns the number
+    of counter rows written.
+    """
+    actions = ForestAction.objects.all()
+    trees = TreePosition.objects.all()
+    rows = ForestActionCounter.objects.all()
+    if user is not None:
+        actions = actions.filter(user=user)
+        trees = trees.filter(user=user)
+        rows = rows.filter(user=user)
+
+    counters = count_history(actions, trees)
+    keys = {}
+    with transaction.atomic():
+        rows.delete()
+        ForestActionCounter.objects.bulk_create([
+            ForestActionCounter(user_id=user_id, key=key, value=value, last_date=last_date)
+            for (user_id, key), (value, last_date) in counters.items()
+        ], batch_size=batch_size)
+        for user_id, key in counters:
+            keys.setdefault(user_id, set()).add(key)
+        for user_id, user_keys in keys.items():
+            evaluate(user_id, user_keys)
+    return len(counters)
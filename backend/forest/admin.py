@@ -5,7 +5,7 @@
 from .models import (
     ForestLayout, TreePosition, ForestAction, ForestDecoration,
     ForestCreature, WeatherEvent, ForestAchievement, UserForestAchievement,
-    DailyChallenge, UserDailyChallenge
+    ForestActionCounter, DailyChallenge, UserDailyChallenge
 )
 
 
@@ -40,7 +40,9 @@ class ForestDecorationAdmin(admin.ModelAdmin):
 
 @admin.register(ForestCreature)
 class ForestCreatureAdmin(admin.ModelAdmin):
-    list_display = ['user', 'creature_type', 'tree_position', 'is_active', 'visit_start']
+    list_display = [
+        'user', 'creature_type', 'tree_position', 'is_active', 'visit_start', 'expires_at',
+    ]
     list_filter = ['creature_type', 'is_active']
     search_fields = ['user__username']
 
@@ -66,6 +68,13 @@ class UserForestAchievementAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'achievement__name']
 
 
+@admin.register(ForestActionCounter)
+class ForestActionCounterAdmin(admin.ModelAdmin):
+    list_display = ['user', 'key', 'value', 'last_date', 'updated_at']
+    list_filter = ['key']
+    search_fields = ['user__username']
+
+
 @admin.register(DailyChallenge)
 class DailyChallengeAdmin(admin.ModelAdmin):
     list_display = ['date', 'challenge_type', 'title', 'target_value', 'points_reward']
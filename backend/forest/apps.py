@@ -3,4 +3,7 @@
 
 class ForestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'forest'
\ No newline at end of file
+    name = 'forest'
+
+    def ready(self):
+        import forest.signals
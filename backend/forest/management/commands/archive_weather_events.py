@@ -0,0 +1,19 @@
+"""
+Management command to expire and archive weather events
+"""
+from django.core.management.base import BaseCommand
+
+from forest.services import WeatherService
+
+
+class Command(BaseCommand):
+    help = (
+        'Deactivate expired weather events, reset the weather of their forests and '
+        'delete ended events older than WEATHER_EVENT_RETENTION_DAYS.'
+    )
+
+    def handle(self, *args, **options):
+        expired, deleted = WeatherService.archive()
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {expired} weather events, deleted {deleted} old events'
+        ))
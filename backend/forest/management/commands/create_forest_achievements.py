@@ -2,6 +2,7 @@
 Management command to create initial forest achievements
 """
 from django.core.management.base import BaseCommand
+from forest.achievements import invalidate_index
 from forest.models import ForestAchievement
 
 
@@ -148,6 +149,8 @@ def handle(self, *args, **options):
                     self.style.WARNING(f'Achievement already exists: {achievement.name}')
                 )
 
+        # Other processes may hold an index built before these rows existed
+        invalidate_index()
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {created_count} new achievements')
         )
\ No newline at end of file
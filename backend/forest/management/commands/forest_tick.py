@@ -0,0 +1,26 @@
+"""
+Management command to advance the forest simulation
+"""
+from django.core.management.base import BaseCommand
+
+from forest.services import ForestTickService
+
+
+class Command(BaseCommand):
+    help = (
+        'Advance every forest: grow trees, apply disease and cures, rotate seasons, '
+        'day/night and auto-weather, and send visiting creatures home. '
+        'Schedule it every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=ForestTickService.BATCH_SIZE,
+            help='Rows per UPDATE (default: %(default)s)',
+        )
+
+    def handle(self, *args, **options):
+        changes = ForestTickService.tick(batch_size=options['batch_size'])
+        for step, count in changes.items():
+            self.stdout.write(f'{step}: {count}')
+        self.stdout.write(self.style.SUCCESS('Forest tick complete'))
@@ -0,0 +1,28 @@
+"""
+Management command to rebuild forest achievement counters from the action history
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from forest import achievements
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recreate ForestActionCounter rows from forest actions and award completed achievements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild counters of this username')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} not found")
+
+        written = achievements.rebuild_counters(user=user, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} forest counters'))
@@ -0,0 +1,28 @@
+"""
+Management command to end creature visits and delete old ones
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from forest.services import ForestTickService
+
+
+class Command(BaseCommand):
+    help = (
+        'Deactivate creature visits past their expiry and delete visits that ended '
+        'more than FOREST_CREATURE_RETENTION_DAYS ago, in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=ForestTickService.BATCH_SIZE,
+            help='Rows per UPDATE/DELETE (default: %(default)s)',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = ForestTickService.expire_creatures(now, options['batch_size'])
+        deleted = ForestTickService.purge_creatures(now, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {expired} creature visits, deleted {deleted} old visits'
+        ))
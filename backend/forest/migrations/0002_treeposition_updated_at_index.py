@@ -0,0 +1,20 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forest', '0001_initial'),
+        ('habits', '0009_sync_tombstones_and_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='treeposition',
+            index=models.Index(fields=['user', 'updated_at'], name='forest_tree_user_id_aab6ac_idx'),
+        ),
+    ]
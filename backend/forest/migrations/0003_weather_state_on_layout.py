@@ -0,0 +1,72 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:48
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_weather_state(apps, schema_editor):
+    """Compute ends_at for existing events and point layouts at their active one"""
+    WeatherEvent = apps.get_model('forest', 'WeatherEvent')
+    ForestLayout = apps.get_model('forest', 'ForestLayout')
+
+    events = []
+    for event in WeatherEvent.objects.only('id', 'start_time', 'duration_hours').iterator(chunk_size=1000):
+        event.ends_at = event.start_time + timedelta(hours=event.duration_hours)
+        events.append(event)
+        if len(events) == 1000:
+            WeatherEvent.objects.bulk_update(events, ['ends_at'])
+            events = []
+    WeatherEvent.objects.bulk_update(events, ['ends_at'])
+
+    # Ordered oldest first, so the latest active event of each user wins
+    latest = {}
+    for event in WeatherEvent.objects.filter(is_active=True).order_by('start_time').iterator(chunk_size=1000):
+        latest[event.user_id] = event
+    layouts = list(ForestLayout.objects.filter(user_id__in=latest))
+    for layout in layouts:
+        event = latest[layout.user_id]
+        layout.weather_event_id = event.id
+        layout.weather_expires_at = event.ends_at
+    ForestLayout.objects.bulk_update(layouts, ['weather_event', 'weather_expires_at'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forest', '0002_treeposition_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forestlayout',
+            name='weather_event',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='forest.weatherevent'),
+        ),
+        migrations.AddField(
+            model_name='forestlayout',
+            name='weather_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='weatherevent',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='weatherevent',
+            index=models.Index(fields=['user', 'is_active'], name='forest_weat_user_id_c6d105_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherevent',
+            index=models.Index(fields=['is_active', 'ends_at'], name='forest_weat_is_acti_796fc0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherevent',
+            index=models.Index(fields=['start_time'], name='forest_weat_start_t_542879_idx'),
+        ),
+        migrations.RunPython(backfill_weather_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:55
+
+import forest.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_expires_at(apps, schema_editor):
+    """Existing visits end CREATURE_STAY after they started"""
+    ForestCreature = apps.get_model('forest', 'ForestCreature')
+    creatures = []
+    for creature in ForestCreature.objects.only('id', 'visit_start').iterator(chunk_size=1000):
+        creature.expires_at = creature.visit_start + forest.models.CREATURE_STAY
+        creatures.append(creature)
+        if len(creatures) == 1000:
+            ForestCreature.objects.bulk_update(creatures, ['expires_at'])
+            creatures = []
+    ForestCreature.objects.bulk_update(creatures, ['expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forest', '0003_weather_state_on_layout'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forestcreature',
+            name='expires_at',
+            field=models.DateTimeField(default=forest.models.creature_visit_expiry),
+        ),
+        migrations.AddIndex(
+            model_name='forestcreature',
+            index=models.Index(fields=['user', 'expires_at'], name='forest_crea_user_id_d2d6d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forestcreature',
+            index=models.Index(fields=['is_active', 'expires_at'], name='forest_crea_is_acti_dab263_idx'),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+    ]
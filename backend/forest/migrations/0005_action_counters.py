@@ -0,0 +1,31 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forest', '0004_creature_expiry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForestActionCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50)),
+                ('value', models.IntegerField(default=0)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forest_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'forest_action_counter',
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.8 on 2026-10-17 09:12
+
+from django.db import migrations
+
+from forest.achievements import count_history
+
+
+def backfill_counters(apps, schema_editor):
+    """Derive counters from the existing action history.
+
+    Achievements are not awarded here; `rebuild_forest_counters` does both.
+    """
+    ForestAction = apps.get_model('forest', 'ForestAction')
+    ForestActionCounter = apps.get_model('forest', 'ForestActionCounter')
+    TreePosition = apps.get_model('forest', 'TreePosition')
+    counters = count_history(ForestAction.objects.all(), TreePosition.objects.all())
+    ForestActionCounter.objects.bulk_create([
+        ForestActionCounter(user_id=user_id, key=key, value=value, last_date=last_date)
+        for (user_id, key), (value, last_date) in counters.items()
+    ], batch_size=5000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forest', '0005_action_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
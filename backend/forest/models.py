@@ -2,6 +2,7 @@
 Forest Game Models - Enhanced interactive forest with data persistence
 """
 import uuid
+from datetime import timedelta
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
@@ -21,6 +22,13 @@ class ForestLayout(models.Model):
                                            ('rainy', 'Rainy'), ('stormy', 'Stormy')])
     is_night = models.BooleanField(default=False)
     
+    # Active weather event and when it ends, so reads need no WeatherEvent query
+    # (see `forest.services.WeatherService`)
+    weather_event = models.ForeignKey(
+        'WeatherEvent', null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    weather_expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    
     # Unlocked features
     unlocked_tree_types = models.JSONField(default=list, blank=True)  # ['cherry_blossom', 'oak', etc.]
     unlocked_decorations = models.JSONField(default=list, blank=True)  # ['rock_1', 'stream', etc.]
@@ -79,6 +87,7 @@ class TreePosition(models.Model):
     class Meta:
         db_table = 'forest_tree_position'
         unique_together = ['user', 'habit']
+        indexes = [models.Index(fields=['user', 'updated_at'])]
 
 
 class ForestAction(models.Model):
@@ -158,6 +167,14 @@ class Meta:
         db_table = 'forest_decoration'
 
 
+# How long a visiting creature stays in the forest
+CREATURE_STAY = timedelta(hours=1)
+
+
+def creature_visit_expiry():
+    return timezone.now() + CREATURE_STAY
+
+
 class ForestCreature(models.Model):
     """Animated creatures that visit healthy trees"""
     CREATURE_TYPES = [
@@ -178,6 +195,7 @@ class ForestCreature(models.Model):
     # Visit details
     visit_start = models.DateTimeField(auto_now_add=True)
     visit_duration = models.IntegerField(default=30)  # Seconds
+    expires_at = models.DateTimeField(default=creature_visit_expiry)  # When the creature leaves
     is_active = models.BooleanField(default=True)
     
     # Animation state
@@ -187,6 +205,10 @@ class ForestCreature(models.Model):
     
     class Meta:
         db_table = 'forest_creature'
+        indexes = [
+            models.Index(fields=['user', 'expires_at']),
+            models.Index(fields=['is_active', 'expires_at']),
+        ]
 
 
 class WeatherEvent(models.Model):
@@ -208,6 +230,7 @@ class WeatherEvent(models.Model):
     # Duration
     start_time = models.DateTimeField(auto_now_add=True)
     duration_hours = models.IntegerField(default=6)
+    ends_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     
     # Effects
@@ -217,6 +240,11 @@ class WeatherEvent(models.Model):
     
     class Meta:
         db_table = 'forest_weather'
+        indexes = [
+            models.Index(fields=['user', 'is_active']),
+            models.Index(fields=['is_active', 'ends_at']),
+            models.Index(fields=['start_time']),
+        ]
 
 
 class ForestAchievement(models.Model):
@@ -263,6 +291,22 @@ class Meta:
         unique_together = ['user', 'achievement']
 
 
+class ForestActionCounter(models.Model):
+    """Per-user counter behind achievement requirements (see `forest.achievements`)"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='forest_counters'
+    )
+    key = models.CharField(max_length=50)  # Requirement key, e.g. 'water_streak'
+    value = models.IntegerField(default=0)
+    # Last day counted, for daily counters and streaks
+    last_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'forest_action_counter'
+        unique_together = ['user', 'key']
+
+
 class DailyChallenge(models.Model):
     """Daily forest challenges for engagement"""
     CHALLENGE_TYPES = [
@@ -7,7 +7,7 @@
     ForestCreature, WeatherEvent, ForestAchievement, UserForestAchievement,
     DailyChallenge, UserDailyChallenge
 )
-from habits.serializers import HabitSerializer
+from habits.serializers import HabitSerializer, HabitSummarySerializer
 
 
 class ForestLayoutSerializer(serializers.ModelSerializer):
@@ -41,6 +41,24 @@ class Meta:
         read_only_fields = ['created_at', 'updated_at']
 
 
+class TreeStateSerializer(serializers.ModelSerializer):
+    """Tree position and state referencing its habit by id (habits are synced separately)"""
+    
+    class Meta:
+        model = TreePosition
+        fields = [
+            'id', 'habit', 'x', 'y', 'z_index',
+            'size_multiplier', 'health_bonus', 'last_watered', 'last_pruned', 'last_fertilized',
+            'tree_type', 'custom_color', 'growth_stage', 'is_diseased', 'disease_cure_date',
+            'created_at', 'updated_at'
+        ]
+
+
+class TreeOverviewSerializer(TreeStateSerializer):
+    """Tree state with a lightweight habit projection for the forest overview"""
+    habit = HabitSummarySerializer(read_only=True)
+
+
 class ForestActionSerializer(serializers.ModelSerializer):
     """Serialize forest actions for tracking and history"""
     habit_title = serializers.CharField(source='habit.title', read_only=True)
@@ -76,10 +94,10 @@ class Meta:
         model = ForestCreature
         fields = [
             'id', 'creature_type', 'tree_position', 'tree_habit_title',
-            'visit_start', 'visit_duration', 'is_active',
+            'visit_start', 'visit_duration', 'expires_at', 'is_active',
             'animation_state', 'x_offset', 'y_offset'
         ]
-        read_only_fields = ['visit_start']
+        read_only_fields = ['visit_start', 'expires_at']
 
 
 class WeatherEventSerializer(serializers.ModelSerializer):
@@ -88,7 +106,7 @@ class WeatherEventSerializer(serializers.ModelSerializer):
     class Meta:
         model = WeatherEvent
         fields = [
-            'id', 'weather_type', 'start_time', 'duration_hours', 'is_active',
+            'id', 'weather_type', 'start_time', 'duration_hours', 'ends_at', 'is_active',
             'growth_multiplier', 'points_multiplier', 'special_effects'
         ]
         read_only_fields = ['start_time']
@@ -138,10 +156,10 @@ class Meta:
 class ForestOverviewSerializer(serializers.Serializer):
     """Combined forest data for efficient loading"""
     layout = ForestLayoutSerializer()
-    tree_positions = TreePositionSerializer(many=True)
+    tree_positions = TreeOverviewSerializer(many=True)
     decorations = ForestDecorationSerializer(many=True)
     active_creatures = ForestCreatureSerializer(many=True)
-    current_weather = WeatherEventSerializer()
-    daily_challenge = UserDailyChallengeSerializer()
+    current_weather = WeatherEventSerializer(allow_null=True)
+    daily_challenge = UserDailyChallengeSerializer(allow_null=True)
     recent_actions = ForestActionSerializer(many=True)
     achievements = UserForestAchievementSerializer(many=True)
\ No newline at end of file
@@ -0,0 +1,725 @@
+"""
+Service layer for forest game logic
+
+Keeps forest views thin, mirroring `habits.services`.
+"""
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Min, Q
+from django.utils import timezone
+
+from core.utils.cache import bump_user_version
+from forest import achievements
+from forest.models import (
+    DailyChallenge, ForestAction, ForestCreature, ForestDecoration, ForestLayout,
+    TreePosition, UserDailyChallenge, UserForestAchievement, WeatherEvent,
+)
+from habits import streaks
+from habits.streaks import live_streak_expression
+from habits.models import Habit, HabitEntry
+from habits.services import HabitService, RollupService
+
+
+class ForestService:
+    """Service for reading forest state"""
+
+    RECENT_ACTIONS = 10
+
+    @staticmethod
+    def get_overview(user, include_entries=False, since=None) -> dict:
+        """Assemble the complete forest state for `ForestOverviewSerializer`.
+
+        One query per section with every relation joined up front, so the
+        count is fixed regardless of how many trees, creatures or actions
+        the forest holds (plus one entries prefetch when `include_entries`).
+        Writes only happen on a user's first visit and on the first visit of
+        the day a daily challenge exists.
+        """
+        now = timezone.now()
+        layout, _ = ForestLayout.objects.select_related('weather_event').get_or_create(user=user)
+
+        tree_positions = TreePosition.objects.filter(user=user).select_related('habit')
+        if include_entries:
+            tree_positions = tree_positions.prefetch_related(
+                HabitService.get_entries_prefetch(since, lookup='habit__entries')
+            )
+
+        return {
+            'layout': layout,
+            'tree_positions': tree_positions,
+            'decorations': ForestDecoration.objects.filter(user=user),
+            'active_creatures': ForestCreature.objects.filter(
+                user=user,
+                expires_at__gt=now,
+                is_active=True,
+            ).select_related('tree_position__habit'),
+            'current_weather': WeatherService.current(layout, now),
+            'daily_challenge': ForestService.get_daily_challenge(user, now.date()),
+            'recent_actions': ForestAction.objects.filter(user=user)
+                .select_related('habit')
+                .order_by('-timestamp')[:ForestService.RECENT_ACTIONS],
+            'achievements': UserForestAchievement.objects.filter(user=user)
+            .select_related('achievement'),
+        }
+
+    @staticmethod
+    def get_daily_challenge(user, date):
+        """Return the user's progress on the day's challenge, joining it on first access"""
+        progress = (
+            UserDailyChallenge.objects.filter(user=user, challenge__date=date)
+            .select_related('challenge')
+            .first()
+        )
+        if progress is not None:
+            return progress
+
+        challenge = DailyChallenge.objects.filter(date=date).first()
+        if challenge is None:
+            return None
+        progress, _ = UserDailyChallenge.objects.get_or_create(user=user, challenge=challenge)
+        return progress
+
+
+class WeatherService:
+    """Per-user weather state.
+
+    The active event and its expiry are stored on `ForestLayout`, so reading
+    the weather only needs the layout (joined with `select_related`). Expiry
+    is resolved lazily on read; `archive_weather_events` deactivates expired
+    events and deletes old ones in bulk.
+    """
+
+    DEFAULT_WEATHER = 'sunny'
+    MAX_DURATION_HOURS = 72
+    EFFECTS = {
+        'rainy': {'growth_multiplier': 1.5, 'points_multiplier': 1.2},
+        'sunny': {'growth_multiplier': 1.0, 'points_multiplier': 1.0},
+        'stormy': {'growth_multiplier': 0.8, 'points_multiplier': 1.3},
+        'drought': {'growth_multiplier': 0.5, 'points_multiplier': 0.8},
+    }
+    ARCHIVE_BATCH_SIZE = 1000
+
+    @staticmethod
+    def current(layout, now=None):
+        """Return the layout's active weather event, or None once it has expired.
+
+        Read-only: an expired event is only reset in memory (weather_state
+        falls back to sunny) and left for `archive` to clean up.
+        """
+        if layout.weather_expires_at is None:
+            return None
+        if layout.weather_expires_at <= (now or timezone.now()):
+            layout.weather_state = WeatherService.DEFAULT_WEATHER
+            return None
+        return layout.weather_event
+
+    @staticmethod
+    def start(user, weather_type, duration_hours=6) -> WeatherEvent:
+        """End the user's current weather and start a new event.
+
+        Raises ValueError for unknown weather types and durations outside
+        1..MAX_DURATION_HOURS.
+        """
+        if weather_type not in dict(WeatherEvent.WEATHER_TYPES):
+            raise ValueError('Invalid weather_type')
+        try:
+            duration_hours = int(duration_hours)
+        except (TypeError, ValueError):
+            raise ValueError('duration_hours must be an integer')
+        if not 1 <= duration_hours <= WeatherService.MAX_DURATION_HOURS:
+            raise ValueError(
+                f'duration_hours must be between 1 and {WeatherService.MAX_DURATION_HOURS}'
+            )
+
+        now = timezone.now()
+        effects = WeatherService.EFFECTS.get(
+            weather_type, WeatherService.EFFECTS[WeatherService.DEFAULT_WEATHER]
+        )
+        with transaction.atomic():
+            WeatherEvent.objects.filter(user=user, is_active=True).update(is_active=False)
+            weather = WeatherEvent.objects.create(
+                user=user,
+                weather_type=weather_type,
+                duration_hours=duration_hours,
+                ends_at=now + timedelta(hours=duration_hours),
+                **effects
+            )
+            layout, _ = ForestLayout.objects.get_or_create(user=user)
+            layout.weather_state = weather_type
+            layout.weather_event = weather
+            layout.weather_expires_at = weather.ends_at
+            layout.save()
+            forest_action = ForestAction(
+                user=user,
+                action_type='weather_change',
+                points_earned=0,
+                metadata={'new_weather': weather_type, 'duration': duration_hours},
+                weather_at_time=weather_type,
+                season_at_time=layout.current_season,
+            )
+            achievements.record_actions(user.id, [forest_action])
+            forest_action.save()
+        return weather
+
+    @staticmethod
+    def expire(now=None) -> int:
+        """Deactivate ended events and reset the weather of their forests"""
+        now = now or timezone.now()
+        expired = WeatherEvent.objects.filter(is_active=True, ends_at__lte=now).update(
+            is_active=False
+        )
+        ForestLayout.objects.filter(weather_expires_at__lte=now).update(
+            weather_event=None,
+            weather_expires_at=None,
+            weather_state=WeatherService.DEFAULT_WEATHER,
+            updated_at=now,
+        )
+        return expired
+
+    @staticmethod
+    def archive(now=None) -> tuple:
+        """Deactivate expired events and delete inactive ones past the retention.
+
+        Returns (expired, deleted) counts. Works with set-based UPDATEs and
+        chunked DELETEs, so it can run against any number of users.
+        """
+        now = now or timezone.now()
+        expired = WeatherService.expire(now)
+
+        cutoff = now - timedelta(days=settings.WEATHER_EVENT_RETENTION_DAYS)
+        old_events = WeatherEvent.objects.filter(is_active=False, start_time__lt=cutoff)
+        deleted = 0
+        while True:
+            ids = list(old_events.values_list('id', flat=True)[:WeatherService.ARCHIVE_BATCH_SIZE])
+            if not ids:
+                break
+            chunk_deleted, _ = WeatherEvent.objects.filter(id__in=ids).delete()
+            deleted += chunk_deleted
+        return expired, deleted
+
+
+class ForestCareService:
+    """Apply tree care actions (water, prune, fertilize), one or many at a time"""
+
+    ACTION_TYPES = ('water', 'prune', 'fertilize')
+    WATER_POINTS = {'mist': 5, 'normal': 10, 'heavy': 15}
+    PRUNE_POINTS = 25
+    FERTILIZE_POINTS = 50
+    CREATURE_POINTS = 5
+    PRUNE_COOLDOWN_DAYS = 7
+    FERTILIZE_COOLDOWN_DAYS = 30
+    LAYOUT_COUNTERS = {
+        'water': 'total_waterings',
+        'prune': 'total_prunings',
+        'fertilize': 'total_fertilizations',
+        'plant': 'trees_planted',
+    }
+    TREE_FIELDS = [
+        'last_watered', 'last_pruned', 'last_fertilized', 'health_bonus', 'size_multiplier',
+        'updated_at',
+    ]
+
+    @staticmethod
+    def apply_actions(user, actions) -> list:
+        """Apply a list of care actions in one transaction.
+
+        `actions` are dicts with `type`, `habit_id` and, for water, an optional
+        `water_type` (mist, normal or heavy). Habits, trees and the weather are
+        loaded once; trees are written with one bulk update (plus one insert for
+        watered habits without a tree, recorded as planted), actions with one
+        bulk insert and the layout counters with a single UPDATE. Watering
+        completes the habit for today like the single water endpoint.
+        Achievement counters are updated through `forest.achievements`.
+
+        Returns one result per action, in order, with a `status` of `applied`,
+        `not_found`, `cooldown` or `invalid`.
+        """
+        results = []
+        pending = []
+        for index, action in enumerate(actions):
+            result = {
+                'index': index, 'type': action.get('type'), 'habit_id': action.get('habit_id')
+            }
+            results.append(result)
+            try:
+                habit_id = int(action.get('habit_id'))
+            except (TypeError, ValueError):
+                habit_id = None
+            water_type = action.get('water_type', 'normal')
+            if (
+                habit_id is None
+                or result['type'] not in ForestCareService.ACTION_TYPES
+                or (result['type'] == 'water' and not ForestCareService._valid_water(water_type))
+            ):
+                result['status'] = 'invalid'
+                continue
+            pending.append((result, habit_id, water_type))
+
+        if not pending:
+            return results
+
+        with transaction.atomic():
+            habit_ids = {habit_id for _, habit_id, _ in pending}
+            # Locked like HabitService._lock_habit, so watering cannot overwrite
+            # the streak a concurrent completion just saved
+            habits = (
+                Habit.objects.select_for_update().filter(user=user, id__in=habit_ids)
+                .order_by('pk').in_bulk()
+            )
+            locked = TreePosition.objects.select_for_update().filter(user=user, habit_id__in=habits)
+            trees = {tree.habit_id: tree for tree in locked}
+            layout, _ = ForestLayout.objects.select_related('weather_event').get_or_create(
+                user=user
+            )
+            weather = WeatherService.current(layout, timezone.now())
+            multiplier = weather.points_multiplier if weather else 1.0
+            weather_type = weather.weather_type if weather else 'sunny'
+            now = timezone.now()
+
+            new_trees, changed_trees, watered = [], {}, {}
+            forest_actions = []
+            counters = Counter()
+            for result, habit_id, water_type in pending:
+                habit = habits.get(habit_id)
+                tree = trees.get(habit_id)
+                if habit is None or (tree is None and result['type'] != 'water'):
+                    result['status'] = 'not_found'
+                    result['error'] = 'Habit not found' if habit is None else 'Tree not found'
+                    continue
+
+                if result['type'] == 'water':
+                    if tree is None:
+                        tree = trees[habit_id] = TreePosition(user=user, habit=habit, x=100, y=200)
+                        new_trees.append(tree)
+                    points = ForestCareService._water(tree, water_type, multiplier, now)
+                    metadata = {'water_type': water_type, 'weather_bonus': multiplier > 1}
+                    result.update({
+                        'tree_health': tree.health_bonus,
+                        'weather_bonus': multiplier > 1,
+                        'message': f'Tree watered with {water_type} watering! +{points} points',
+                    })
+                    watered.setdefault(habit_id, points)
+                else:
+                    error = ForestCareService._cooldown_error(tree, result['type'], now)
+                    if error:
+                        result['status'] = 'cooldown'
+                        result['error'] = error
+                        continue
+                    if result['type'] == 'prune':
+                        points, metadata = ForestCareService._prune(tree, now)
+                        result.update({
+                            'tree_health': tree.health_bonus,
+                            'message': 'Tree pruned successfully! Health improved.',
+                        })
+                    else:
+                        points, metadata = ForestCareService._fertilize(tree, now)
+                        result.update({
+                            'tree_size': tree.size_multiplier,
+                            'message': 'Tree fertilized! Growth speed increased.',
+                        })
+
+                result['status'] = 'applied'
+                result['points_earned'] = points
+                counters[result['type']] += 1
+                counters['points'] += points
+                changed_trees[habit_id] = tree
+                forest_actions.append(ForestAction(
+                    user=user,
+                    action_type=result['type'],
+                    habit=habit,
+                    tree_position=tree,
+                    points_earned=points,
+                    metadata=metadata,
+                    weather_at_time=weather_type if result['type'] == 'water' else '',
+                ))
+
+            if not counters:
+                return results
+
+            # bulk_update skips auto_now
+            for tree in changed_trees.values():
+                tree.updated_at = now
+            TreePosition.objects.bulk_create(new_trees)
+            TreePosition.objects.bulk_update(
+                [tree for tree in changed_trees.values() if tree not in new_trees],
+                ForestCareService.TREE_FIELDS,
+            )
+            forest_actions += [
+                ForestAction(user=user, action_type='plant', habit=tree.habit, tree_position=tree)
+                for tree in new_trees
+            ]
+            counters['plant'] = len(new_trees)
+            forest_actions += ForestCareService._spawn_creatures(
+                user, [trees[habit_id] for habit_id in watered]
+            )
+            for forest_action in forest_actions:
+                forest_action.season_at_time = layout.current_season
+            achievements.record_actions(user.id, forest_actions)
+            ForestAction.objects.bulk_create(forest_actions)
+            ForestCareService._add_layout_counters(layout, counters)
+            ForestCareService._complete_today(
+                user, {habits[habit_id]: points for habit_id, points in watered.items()}
+            )
+
+        # Bulk writes skip the post_save signals that invalidate cached responses
+        bump_user_version(user.id, 'habits', 'forest')
+        return results
+
+    @staticmethod
+    def move_tree(user, habit_id, x, y) -> TreePosition:
+        """Move the tree of one of the user's habits and record the action.
+
+        Raises TreePosition.DoesNotExist when the user has no tree for `habit_id`.
+        """
+        with transaction.atomic():
+            tree = TreePosition.objects.select_related('habit').get(
+                user=user, habit_id=habit_id
+            )
+            old_x, old_y = tree.x, tree.y
+            tree.x, tree.y = x, y
+            tree.save()
+            layout, _ = ForestLayout.objects.get_or_create(user=user)
+            forest_action = ForestAction(
+                user=user,
+                action_type='move',
+                habit=tree.habit,
+                tree_position=tree,
+                points_earned=0,
+                metadata={
+                    'old_position': {'x': old_x, 'y': old_y}, 'new_position': {'x': x, 'y': y},
+                },
+                season_at_time=layout.current_season,
+            )
+            achievements.record_actions(user.id, [forest_action])
+            forest_action.save()
+        return tree
+
+    @staticmethod
+    def _valid_water(water_type) -> bool:
+        return isinstance(water_type, str) and water_type in ForestCareService.WATER_POINTS
+
+    @staticmethod
+    def _water(tree, water_type, multiplier, now) -> int:
+        tree.last_watered = now
+        if water_type == 'heavy':
+            tree.health_bonus += 0.1
+        return int(ForestCareService.WATER_POINTS[water_type] * multiplier)
+
+    @staticmethod
+    def _prune(tree, now) -> tuple:
+        tree.last_pruned = now
+        tree.health_bonus += 0.2
+        return ForestCareService.PRUNE_POINTS, {'health_gained': 0.2}
+
+    @staticmethod
+    def _fertilize(tree, now) -> tuple:
+        tree.last_fertilized = now
+        tree.size_multiplier += 0.3
+        return ForestCareService.FERTILIZE_POINTS, {'growth_boost': 0.3}
+
+    @staticmethod
+    def _cooldown_error(tree, action_type, now):
+        """Return why the tree cannot be pruned/fertilized yet, or None"""
+        if action_type == 'prune':
+            last, cooldown, verb = tree.last_pruned, ForestCareService.PRUNE_COOLDOWN_DAYS, 'pruned'
+        else:
+            last, cooldown, verb = (
+                tree.last_fertilized, ForestCareService.FERTILIZE_COOLDOWN_DAYS, 'fertilized'
+            )
+        if last is None:
+            return None
+        elapsed = (now - last).days
+        if elapsed >= cooldown:
+            return None
+        return f'Tree can be {verb} again in {cooldown - elapsed} days'
+
+    @staticmethod
+    def _spawn_creatures(user, trees) -> list:
+        """Healthy watered trees may attract a creature; returns the visit actions to record"""
+        visited = [tree for tree in trees if tree.health_bonus > 0.5 and random.random() < 0.3]
+        if not visited:
+            return []
+        # Each tree hosts one creature at a time
+        ForestCreature.objects.filter(tree_position__in=visited, is_active=True).update(
+            is_active=False
+        )
+        creatures = ForestCreature.objects.bulk_create([
+            ForestCreature(
+                user=user,
+                creature_type=random.choice(['rabbit', 'bird', 'butterfly', 'squirrel']),
+                tree_position=tree,
+                visit_duration=random.randint(30, 300),  # 30 seconds to 5 minutes
+                x_offset=random.uniform(-20, 20),
+                y_offset=random.uniform(-20, 20),
+            )
+            for tree in visited
+        ])
+        return [
+            ForestAction(
+                user=user,
+                action_type='creature_visit',
+                tree_position=creature.tree_position,
+                points_earned=ForestCareService.CREATURE_POINTS,
+                metadata={'creature_type': creature.creature_type},
+            )
+            for creature in creatures
+        ]
+
+    @staticmethod
+    def _add_layout_counters(layout, counters):
+        """Apply action counts and points to the layout with a single UPDATE"""
+        updates = {
+            field: F(field) + counters[action_type]
+            for action_type, field in ForestCareService.LAYOUT_COUNTERS.items()
+            if counters[action_type]
+        }
+        ForestLayout.objects.filter(pk=layout.pk).update(
+            total_points=F('total_points') + counters['points'],
+            updated_at=timezone.now(),
+            **updates,
+        )
+
+    @staticmethod
+    def _complete_today(user, watered):
+        """Create today's entry for watered habits that have none.
+
+        Existing entries are left as they are.
+        """
+        if not watered:
+            return
+        today = timezone.now().date()
+        existing = set(
+            HabitEntry.objects.filter(habit__in=watered, date=today)
+            .values_list('habit_id', flat=True)
+        )
+        created = HabitEntry.objects.bulk_create([
+            HabitEntry(habit=habit, date=today, completed=True, points_earned=points)
+            for habit, points in watered.items()
+            if habit.id not in existing
+        ])
+        if not created:
+            return
+        # bulk_create skips post_save, so keep the daily rollups and streaks in step here.
+        # The habits were locked by apply_actions, so their streak state is current;
+        # record_completion only queries when a later (future-dated) day is completed.
+        RollupService.sync_entries(created)
+        now = timezone.now()
+        habits = [entry.habit for entry in created]
+        for habit in habits:
+            streaks.record_completion(habit, today)
+            habit.updated_at = now
+        Habit.objects.bulk_update(habits, streaks.STREAK_FIELDS + ['updated_at'])
+
+
+class ForestTickService:
+    """Advance forest state over time for every user.
+
+    Run by `manage.py forest_tick` on a schedule (every few minutes), so
+    request code only reads the simulated state. Every step is a set-based
+    UPDATE over primary-key ranges of BATCH_SIZE rows; only auto-weather
+    inserts rows (one bulk insert per batch of forests).
+
+    Rows are written with `update()`, which skips signals: cached forest
+    responses catch up within their TTL, and `updated_at` is set so delta
+    sync picks the changes up.
+    """
+
+    BATCH_SIZE = 1000
+
+    # Growth stage reached at a score of live streak days + health_bonus * HEALTH_BONUS_DAYS.
+    # Trees never shrink; neglect shows as disease instead.
+    GROWTH_STAGES = [('young', 7), ('mature', 30), ('ancient', 100)]
+    HEALTH_BONUS_DAYS = 10
+
+    # Trees neither watered nor completed for this long fall ill; care cures them on the next tick
+    NEGLECT_DAYS = 7
+
+    SEASONS = {
+        12: 'winter', 1: 'winter', 2: 'winter',
+        3: 'spring', 4: 'spring', 5: 'spring',
+        6: 'summer', 7: 'summer', 8: 'summer',
+        9: 'autumn', 10: 'autumn', 11: 'autumn',
+    }
+    NIGHT_HOURS = (20, 6)  # night from 20:00 until 06:00, server time
+
+    AUTO_WEATHER_HOURS = 6
+    SEASON_WEATHER = {
+        'spring': ['sunny', 'rainy', 'cloudy'],
+        'summer': ['sunny', 'sunny', 'stormy'],
+        'autumn': ['cloudy', 'rainy', 'stormy'],
+        'winter': ['cloudy', 'stormy', 'sunny'],
+    }
+
+    @staticmethod
+    def tick(now=None, batch_size=None) -> dict:
+        """Run every simulation step once; returns the number of rows changed per step"""
+        now = now or timezone.now()
+        batch_size = batch_size or ForestTickService.BATCH_SIZE
+        season = ForestTickService.SEASONS[timezone.localtime(now).month]
+        return {
+            'weather_expired': WeatherService.expire(now),
+            'seasons': ForestTickService.rotate_seasons(season, now, batch_size),
+            'day_night': ForestTickService.update_day_night(now, batch_size),
+            'auto_weather': ForestTickService.start_auto_weather(season, now, batch_size),
+            'infected': ForestTickService.infect_neglected_trees(now, batch_size),
+            'cured': ForestTickService.cure_tended_trees(now, batch_size),
+            'grown': ForestTickService.grow_trees(now, batch_size),
+            'creatures_expired': ForestTickService.expire_creatures(now, batch_size),
+        }
+
+    @staticmethod
+    def rotate_seasons(season, now, batch_size) -> int:
+        layouts = ForestLayout.objects.exclude(current_season=season)
+        return ForestTickService._update_in_batches(
+            layouts, batch_size, current_season=season, updated_at=now
+        )
+
+    @staticmethod
+    def update_day_night(now, batch_size) -> int:
+        dusk, dawn = ForestTickService.NIGHT_HOURS
+        hour = timezone.localtime(now).hour
+        night = hour >= dusk or hour < dawn
+        # Forests without the cycle always show day
+        changed = ForestTickService._update_in_batches(
+            ForestLayout.objects.filter(day_night_cycle=True).exclude(is_night=night),
+            batch_size, is_night=night, updated_at=now,
+        )
+        return changed + ForestTickService._update_in_batches(
+            ForestLayout.objects.filter(day_night_cycle=False, is_night=True),
+            batch_size, is_night=False, updated_at=now,
+        )
+
+    @staticmethod
+    def start_auto_weather(season, now, batch_size) -> int:
+        """Give every auto-weather forest without active weather a new seasonal event"""
+        layouts = ForestLayout.objects.filter(auto_weather=True, weather_expires_at__isnull=True)
+        started = 0
+        for start, end in ForestTickService._pk_ranges(layouts, batch_size):
+            batch = list(layouts.filter(pk__gte=start, pk__lt=end).only('id', 'user_id'))
+            if not batch:
+                continue
+            events = []
+            for layout in batch:
+                weather_type = random.choice(ForestTickService.SEASON_WEATHER[season])
+                events.append(WeatherEvent(
+                    user_id=layout.user_id,
+                    weather_type=weather_type,
+                    duration_hours=ForestTickService.AUTO_WEATHER_HOURS,
+                    ends_at=now + timedelta(hours=ForestTickService.AUTO_WEATHER_HOURS),
+                    **WeatherService.EFFECTS.get(
+                        weather_type, WeatherService.EFFECTS[WeatherService.DEFAULT_WEATHER]
+                    )
+                ))
+            with transaction.atomic():
+                WeatherEvent.objects.bulk_create(events)
+                for layout, event in zip(batch, events):
+                    layout.weather_event = event
+                    layout.weather_expires_at = event.ends_at
+                    layout.weather_state = event.weather_type
+                    layout.updated_at = now
+                ForestLayout.objects.bulk_update(
+                    batch, ['weather_event', 'weather_expires_at', 'weather_state', 'updated_at']
+                )
+            started += len(events)
+        return started
+
+    @staticmethod
+    def _neglect_cutoffs(now):
+        cutoff = now - timedelta(days=ForestTickService.NEGLECT_DAYS)
+        return cutoff, timezone.localtime(cutoff).date()
+
+    @staticmethod
+    def infect_neglected_trees(now, batch_size) -> int:
+        cutoff, cutoff_date = ForestTickService._neglect_cutoffs(now)
+        trees = TreePosition.objects.filter(is_diseased=False, created_at__lt=cutoff).filter(
+            Q(last_watered__isnull=True) | Q(last_watered__lt=cutoff),
+            Q(habit__last_completed__isnull=True) | Q(habit__last_completed__lt=cutoff_date),
+        )
+        return ForestTickService._update_in_batches(
+            trees, batch_size, is_diseased=True, disease_cure_date=None, updated_at=now
+        )
+
+    @staticmethod
+    def cure_tended_trees(now, batch_size) -> int:
+        cutoff, cutoff_date = ForestTickService._neglect_cutoffs(now)
+        trees = TreePosition.objects.filter(is_diseased=True).filter(
+            Q(last_watered__gte=cutoff) | Q(habit__last_completed__gte=cutoff_date)
+        )
+        return ForestTickService._update_in_batches(
+            trees, batch_size, is_diseased=False, disease_cure_date=now, updated_at=now
+        )
+
+    @staticmethod
+    def grow_trees(now, batch_size) -> int:
+        """Advance healthy trees to the highest stage their score has reached"""
+        score = live_streak_expression(timezone.localtime(now).date(), prefix='habit__') + (
+            F('health_bonus') * ForestTickService.HEALTH_BONUS_DAYS
+        )
+        trees = TreePosition.objects.filter(is_diseased=False).annotate(growth_score=score)
+
+        # Highest stage first, so each tree jumps straight to the stage it has reached
+        stages = ['seed', 'sapling'] + [stage for stage, _ in ForestTickService.GROWTH_STAGES]
+        grown = 0
+        for stage, threshold in reversed(ForestTickService.GROWTH_STAGES):
+            growing = trees.filter(
+                growth_score__gte=threshold, growth_stage__in=stages[:stages.index(stage)]
+            )
+            if stage == 'ancient':
+                grown += ForestTickService._grow_ancient(growing, now, batch_size)
+                continue
+            grown += ForestTickService._update_in_batches(
+                growing, batch_size, growth_stage=stage, updated_at=now,
+            )
+        return grown
+
+    @staticmethod
+    def _grow_ancient(trees, now, batch_size) -> int:
+        """Like the other stages, but also feeds the `ancient_trees` achievement counter"""
+        grown = 0
+        for start, end in ForestTickService._pk_ranges(trees, batch_size):
+            rows = list(trees.filter(pk__gte=start, pk__lt=end).values_list('pk', 'user_id'))
+            if not rows:
+                continue
+            with transaction.atomic():
+                grown += TreePosition.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+                    growth_stage='ancient', updated_at=now
+                )
+                for user_id, count in Counter(user_id for _, user_id in rows).items():
+                    achievements.record_counts(user_id, {'ancient_trees': count})
+        return grown
+
+    @staticmethod
+    def expire_creatures(now, batch_size) -> int:
+        creatures = ForestCreature.objects.filter(is_active=True, expires_at__lte=now)
+        return ForestTickService._update_in_batches(creatures, batch_size, is_active=False)
+
+    @staticmethod
+    def purge_creatures(now, batch_size) -> int:
+        """Delete visits that ended more than FOREST_CREATURE_RETENTION_DAYS ago"""
+        cutoff = now - timedelta(days=settings.FOREST_CREATURE_RETENTION_DAYS)
+        creatures = ForestCreature.objects.filter(is_active=False, expires_at__lt=cutoff)
+        deleted = 0
+        for start, end in ForestTickService._pk_ranges(creatures, batch_size):
+            chunk_deleted, _ = creatures.filter(pk__gte=start, pk__lt=end).delete()
+            deleted += chunk_deleted
+        return deleted
+
+    @staticmethod
+    def _pk_ranges(queryset, batch_size):
+        """Yield [start, end) primary key ranges covering the queryset"""
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            yield start, start + batch_size
+
+    @staticmethod
+    def _update_in_batches(queryset, batch_size, **fields) -> int:
+        return sum(
+            queryset.filter(pk__gte=start, pk__lt=end).update(**fields)
+            for start, end in ForestTickService._pk_ranges(queryset, batch_size)
+        )
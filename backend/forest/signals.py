@@ -0,0 +1,47 @@
+"""
+Forest app signals - Invalidate cached forest responses and the achievement index,
+and record sync tombstones
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.utils.cache import bump_user_version
+from forest import achievements
+from forest.models import (
+    ForestAchievement, ForestAction, ForestCreature, ForestDecoration, ForestLayout,
+    TreePosition, UserDailyChallenge, UserForestAchievement, WeatherEvent,
+)
+from habits.services import SyncService
+
+USER_FOREST_MODELS = [
+    ForestLayout, TreePosition, ForestAction, ForestDecoration, ForestCreature,
+    WeatherEvent, UserForestAchievement, UserDailyChallenge,
+]
+
+
+def invalidate_forest_responses(sender, instance, **kwargs):
+    bump_user_version(instance.user_id, 'forest')
+
+
+for model in USER_FOREST_MODELS:
+    post_save.connect(
+        invalidate_forest_responses, sender=model,
+        dispatch_uid=f'forest_cache_{model.__name__}_save',
+    )
+    post_delete.connect(
+        invalidate_forest_responses, sender=model,
+        dispatch_uid=f'forest_cache_{model.__name__}_delete',
+    )
+
+
+@receiver(post_delete, sender=TreePosition)
+def record_tree_tombstone(sender, instance, origin=None, **kwargs):
+    """Trees deleted along with their habit are dropped by clients with the habit"""
+    if isinstance(origin, TreePosition) or getattr(origin, 'model', None) is TreePosition:
+        SyncService.record_deletion(instance.user_id, 'tree_positions', instance.id)
+
+
+@receiver(post_save, sender=ForestAchievement)
+@receiver(post_delete, sender=ForestAchievement)
+def invalidate_achievement_index(sender, **kwargs):
+    achievements.invalidate_index()
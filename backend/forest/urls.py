@@ -14,6 +14,10 @@
     path('prune/', views.ForestGameViewSet.as_view({'post': 'prune_tree'}), name='forest-prune'),
     path('fertilize/', views.ForestGameViewSet.as_view({'post': 'fertilize_tree'}), name='forest-fertilize'),
     path('move/', views.ForestGameViewSet.as_view({'post': 'move_tree'}), name='forest-move'),
+    path(
+        'actions/batch/', views.ForestGameViewSet.as_view({'post': 'batch_actions'}),
+        name='forest-actions-batch',
+    ),
     
     # Environmental controls
     path('weather/', views.ForestGameViewSet.as_view({'post': 'change_weather'}), name='forest-weather'),
@@ -1,26 +1,20 @@
 """
 Forest Game Views - API endpoints for enhanced forest functionality
 """
-import random
-from datetime import datetime, timedelta
-from django.utils import timezone
+from datetime import datetime
 from django.db.models import Q, F
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from core.utils.cache import cache_user_response, conditional_user_response
 from .models import (
-    ForestLayout, TreePosition, ForestAction, ForestDecoration,
-    ForestCreature, WeatherEvent, ForestAchievement, UserForestAchievement,
-    DailyChallenge, UserDailyChallenge
+    ForestLayout, TreePosition, ForestAction,
+    ForestAchievement, UserForestAchievement,
 )
-from .serializers import (
-    ForestLayoutSerializer, TreePositionSerializer, ForestActionSerializer,
-    ForestDecorationSerializer, ForestCreatureSerializer, WeatherEventSerializer,
-    ForestAchievementSerializer, UserForestAchievementSerializer,
-    DailyChallengeSerializer, UserDailyChallengeSerializer, ForestOverviewSerializer
-)
-from habits.models import Habit
+from .serializers import ForestActionSerializer, WeatherEventSerializer, ForestOverviewSerializer
+from habits.services import HabitService
+from .services import ForestCareService, ForestService, WeatherService
 
 
 class ForestGameViewSet(viewsets.ViewSet):
@@ -35,68 +29,33 @@ class ForestGameViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     @action(detail=False, methods=['get'])
+    # Creatures and weather also expire with time, not only on writes, so the
+    # cached response and validators roll over every minute
+    @conditional_user_response('forest', period=60)
+    @cache_user_response('forest', ttl=60)
     def overview(self, request):
         """
         Get complete forest state in one request for efficient loading.
 
-        GET /api/v1/forest/overview/
+        GET /api/v1/forest/overview/?entries=none|recent|all&entries_since=YYYY-MM-DD
         Response: layout, tree_positions, decorations, active_creatures, current_weather,
         daily_challenge, recent_actions, achievements
+
+        Trees embed a lightweight habit projection; habit entries are only
+        embedded when `entries` or `entries_since` is given.
         """
-        user = request.user
-        
-        # Get or create forest layout
-        layout, created = ForestLayout.objects.get_or_create(user=user)
-        
-        # Get tree positions
-        tree_positions = TreePosition.objects.filter(user=user).select_related('habit')
-        
-        # Get decorations
-        decorations = ForestDecoration.objects.filter(user=user)
-        
-        # Get active creatures
-        active_creatures = ForestCreature.objects.filter(
-            user=user, 
-            is_active=True,
-            visit_start__gte=timezone.now() - timedelta(hours=1)
-        ).select_related('tree_position__habit')
-        
-        # Get current weather
-        current_weather = WeatherEvent.objects.filter(
-            user=user, 
-            is_active=True,
-            start_time__gte=timezone.now() - timedelta(hours=24)
-        ).first()
-        
-        # Get today's daily challenge
-        today = timezone.now().date()
-        daily_challenge = None
-        try:
-            daily_challenge_obj = DailyChallenge.objects.get(date=today)
-            daily_challenge = UserDailyChallenge.objects.get_or_create(
-                user=user, challenge=daily_challenge_obj
-            )[0]
-        except DailyChallenge.DoesNotExist:
-            pass
-        
-        # Get recent actions (last 10)
-        recent_actions = ForestAction.objects.filter(user=user)[:10]
-        
-        # Get user achievements
-        achievements = UserForestAchievement.objects.filter(user=user).select_related('achievement')
-        
-        data = {
-            'layout': ForestLayoutSerializer(layout).data,
-            'tree_positions': TreePositionSerializer(tree_positions, many=True).data,
-            'decorations': ForestDecorationSerializer(decorations, many=True).data,
-            'active_creatures': ForestCreatureSerializer(active_creatures, many=True).data,
-            'current_weather': WeatherEventSerializer(current_weather).data if current_weather else None,
-            'daily_challenge': UserDailyChallengeSerializer(daily_challenge).data if daily_challenge else None,
-            'recent_actions': ForestActionSerializer(recent_actions, many=True).data,
-            'achievements': UserForestAchievementSerializer(achievements, many=True).data,
-        }
-        
-        return Response(data)
+        params = request.query_params
+        include_entries, since = False, None
+        if 'entries' in params or 'entries_since' in params:
+            include_entries, since = HabitService.get_entries_window(params)
+
+        overview = ForestService.get_overview(request.user, include_entries, since)
+        serializer = ForestOverviewSerializer(
+            overview, context={'include_entries': include_entries}
+        )
+        return Response(serializer.data)
+
+    BATCH_MAX_ACTIONS = 100
 
     @action(detail=False, methods=['post'])
     def water_tree(self, request):
@@ -107,253 +66,100 @@ def water_tree(self, request):
         Body: { habit_id: int, water_type: 'mist'|'normal'|'heavy' }
         Response: points_earned, tree_health, weather_bonus, message
         """
-        user = request.user
-        habit_id = request.data.get('habit_id')
-        water_type = request.data.get('water_type', 'normal')  # normal, heavy, mist
-        
-        try:
-            habit = Habit.objects.get(id=habit_id, user=user)
-            tree_position, created = TreePosition.objects.get_or_create(
-                user=user, habit=habit,
-                defaults={'x': 100, 'y': 200}  # Default position if new
-            )
-            
-            # Calculate points based on water type and current conditions
-            base_points = {'mist': 5, 'normal': 10, 'heavy': 15}[water_type]
-            
-            # Weather multiplier
-            current_weather = WeatherEvent.objects.filter(
-                user=user, is_active=True
-            ).first()
-            weather_multiplier = current_weather.points_multiplier if current_weather else 1.0
-            
-            points_earned = int(base_points * weather_multiplier)
-            
-            # Update tree
-            tree_position.last_watered = timezone.now()
-            if water_type == 'heavy':
-                tree_position.health_bonus += 0.1
-            tree_position.save()
-            
-            # Update forest layout stats
-            layout, _ = ForestLayout.objects.get_or_create(user=user)
-            layout.total_waterings += 1
-            layout.total_points += points_earned
-            layout.save()
-            
-            # Record action
-            ForestAction.objects.create(
-                user=user,
-                action_type='water',
-                habit=habit,
-                tree_position=tree_position,
-                points_earned=points_earned,
-                metadata={'water_type': water_type, 'weather_bonus': weather_multiplier > 1},
-                weather_at_time=current_weather.weather_type if current_weather else 'sunny'
-            )
-            
-            # Check for creature visits (healthy trees attract creatures)
-            if tree_position.health_bonus > 0.5 and random.random() < 0.3:
-                self._spawn_creature(user, tree_position)
-            
-            # Mark habit as complete for today
-            from habits.models import HabitEntry
-            today = timezone.now().date()
-            entry, created = HabitEntry.objects.get_or_create(
-                habit=habit, date=today,
-                defaults={'completed': True, 'points_earned': points_earned}
-            )
-            
-            return Response({
-                'success': True,
-                'points_earned': points_earned,
-                'tree_health': tree_position.health_bonus,
-                'weather_bonus': weather_multiplier > 1,
-                'message': f'Tree watered with {water_type} watering! +{points_earned} points'
-            })
-            
-        except Habit.DoesNotExist:
-            return Response({'error': 'Habit not found'}, status=status.HTTP_404_NOT_FOUND)
+        return self._apply_single(
+            request, 'water', water_type=request.data.get('water_type', 'normal')
+        )
 
     @action(detail=False, methods=['post'])
     def prune_tree(self, request):
         """Prune a tree to improve its health"""
-        user = request.user
-        habit_id = request.data.get('habit_id')
-        
-        try:
-            habit = Habit.objects.get(id=habit_id, user=user)
-            tree_position = TreePosition.objects.get(user=user, habit=habit)
-            
-            # Check if tree can be pruned (once per week)
-            if tree_position.last_pruned:
-                time_since_prune = timezone.now() - tree_position.last_pruned
-                if time_since_prune.days < 7:
-                    return Response({
-                        'error': f'Tree can be pruned again in {7 - time_since_prune.days} days'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Prune the tree
-            tree_position.last_pruned = timezone.now()
-            tree_position.health_bonus += 0.2
-            tree_position.save()
-            
-            points_earned = 25
-            
-            # Update layout
-            layout, _ = ForestLayout.objects.get_or_create(user=user)
-            layout.total_prunings += 1
-            layout.total_points += points_earned
-            layout.save()
-            
-            # Record action
-            ForestAction.objects.create(
-                user=user,
-                action_type='prune',
-                habit=habit,
-                tree_position=tree_position,
-                points_earned=points_earned,
-                metadata={'health_gained': 0.2}
-            )
-            
-            return Response({
-                'success': True,
-                'points_earned': points_earned,
-                'tree_health': tree_position.health_bonus,
-                'message': 'Tree pruned successfully! Health improved.'
-            })
-            
-        except (Habit.DoesNotExist, TreePosition.DoesNotExist):
-            return Response({'error': 'Tree not found'}, status=status.HTTP_404_NOT_FOUND)
+        return self._apply_single(request, 'prune')
 
     @action(detail=False, methods=['post'])
     def fertilize_tree(self, request):
         """Fertilize a tree to boost growth speed"""
-        user = request.user
-        habit_id = request.data.get('habit_id')
-        
-        try:
-            habit = Habit.objects.get(id=habit_id, user=user)
-            tree_position = TreePosition.objects.get(user=user, habit=habit)
-            
-            # Check if tree can be fertilized (once per month)
-            if tree_position.last_fertilized:
-                time_since_fertilize = timezone.now() - tree_position.last_fertilized
-                if time_since_fertilize.days < 30:
-                    return Response({
-                        'error': f'Tree can be fertilized again in {30 - time_since_fertilize.days} days'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Fertilize the tree
-            tree_position.last_fertilized = timezone.now()
-            tree_position.size_multiplier += 0.3
-            tree_position.save()
-            
-            points_earned = 50
-            
-            # Update layout
-            layout, _ = ForestLayout.objects.get_or_create(user=user)
-            layout.total_fertilizations += 1
-            layout.total_points += points_earned
-            layout.save()
-            
-            # Record action
-            ForestAction.objects.create(
-                user=user,
-                action_type='fertilize',
-                habit=habit,
-                tree_position=tree_position,
-                points_earned=points_earned,
-                metadata={'growth_boost': 0.3}
+        return self._apply_single(request, 'fertilize')
+
+    @action(detail=False, methods=['post'])
+    def batch_actions(self, request):
+        """
+        Apply many care actions in one request and one transaction.
+
+        POST /api/v1/forest/actions/batch/
+        {
+            "actions": [
+                {"type": "water", "habit_id": 1, "water_type": "heavy"},
+                {"type": "prune", "habit_id": 2},
+                {"type": "fertilize", "habit_id": 3}
+            ]
+        }
+        Response: {"results": [{"index", "type", "habit_id", "status", "points_earned", ...}, ...],
+        "points_earned"} with status one of applied, not_found, cooldown, invalid
+        """
+        actions = request.data.get('actions', [])
+        if not isinstance(actions, list) or not all(isinstance(row, dict) for row in actions):
+            return Response(
+                {'error': 'actions must be a list of objects'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(actions) > self.BATCH_MAX_ACTIONS:
+            return Response(
+                {'error': f'At most {self.BATCH_MAX_ACTIONS} actions per request'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            return Response({
-                'success': True,
-                'points_earned': points_earned,
-                'tree_size': tree_position.size_multiplier,
-                'message': 'Tree fertilized! Growth speed increased.'
-            })
-            
-        except (Habit.DoesNotExist, TreePosition.DoesNotExist):
-            return Response({'error': 'Tree not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        results = ForestCareService.apply_actions(request.user, actions)
+        return Response({
+            'results': results,
+            'points_earned': sum(result.get('points_earned', 0) for result in results),
+        })
+
+    def _apply_single(self, request, action_type, **options):
+        """Run one care action through the batch service and shape the single-action response"""
+        action = {'type': action_type, 'habit_id': request.data.get('habit_id'), **options}
+        result = ForestCareService.apply_actions(request.user, [action])[0]
+        if result['status'] == 'not_found':
+            return Response({'error': result['error']}, status=status.HTTP_404_NOT_FOUND)
+        if result['status'] == 'cooldown':
+            return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
+        if result['status'] == 'invalid':
+            return Response(
+                {'error': 'Invalid habit_id or water_type'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = {'success': True}
+        data.update({
+            key: result[key]
+            for key in ('points_earned', 'tree_health', 'tree_size', 'weather_bonus', 'message')
+            if key in result
+        })
+        return Response(data)
 
     @action(detail=False, methods=['post'])
     def move_tree(self, request):
         """Move a tree to a new position"""
-        user = request.user
-        habit_id = request.data.get('habit_id')
-        new_x = request.data.get('x')
-        new_y = request.data.get('y')
-        
         try:
-            habit = Habit.objects.get(id=habit_id, user=user)
-            tree_position = TreePosition.objects.get(user=user, habit=habit)
-            
-            # Update position
-            old_x, old_y = tree_position.x, tree_position.y
-            tree_position.x = new_x
-            tree_position.y = new_y
-            tree_position.save()
-            
-            # Record action
-            ForestAction.objects.create(
-                user=user,
-                action_type='move',
-                habit=habit,
-                tree_position=tree_position,
-                points_earned=0,
-                metadata={'old_position': {'x': old_x, 'y': old_y}, 'new_position': {'x': new_x, 'y': new_y}}
+            ForestCareService.move_tree(
+                request.user, request.data.get('habit_id'),
+                request.data.get('x'), request.data.get('y'),
             )
-            
-            return Response({
-                'success': True,
-                'message': 'Tree moved successfully!'
-            })
-            
-        except (Habit.DoesNotExist, TreePosition.DoesNotExist):
+        except TreePosition.DoesNotExist:
             return Response({'error': 'Tree not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'success': True,
+            'message': 'Tree moved successfully!'
+        })
 
     @action(detail=False, methods=['post'])
     def change_weather(self, request):
         """Trigger weather change (for testing or premium feature)"""
-        user = request.user
         weather_type = request.data.get('weather_type')
-        duration_hours = request.data.get('duration_hours', 6)
-        
-        # End current weather
-        WeatherEvent.objects.filter(user=user, is_active=True).update(is_active=False)
-        
-        # Weather effects
-        weather_effects = {
-            'rainy': {'growth_multiplier': 1.5, 'points_multiplier': 1.2},
-            'sunny': {'growth_multiplier': 1.0, 'points_multiplier': 1.0},
-            'stormy': {'growth_multiplier': 0.8, 'points_multiplier': 1.3},
-            'drought': {'growth_multiplier': 0.5, 'points_multiplier': 0.8},
-        }
-        
-        effects = weather_effects.get(weather_type, weather_effects['sunny'])
-        
-        # Create new weather event
-        weather = WeatherEvent.objects.create(
-            user=user,
-            weather_type=weather_type,
-            duration_hours=duration_hours,
-            **effects
-        )
-        
-        # Update forest layout
-        layout, _ = ForestLayout.objects.get_or_create(user=user)
-        layout.weather_state = weather_type
-        layout.save()
-        
-        # Record action
-        ForestAction.objects.create(
-            user=user,
-            action_type='weather_change',
-            points_earned=0,
-            metadata={'new_weather': weather_type, 'duration': duration_hours},
-            weather_at_time=weather_type
-        )
+        try:
+            weather = WeatherService.start(
+                request.user, weather_type, request.data.get('duration_hours', 6)
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'success': True,
@@ -379,7 +185,11 @@ def statistics(self, request):
         mature_trees = TreePosition.objects.filter(user=user, growth_stage__in=['mature', 'ancient']).count()
         
         # Recent activity
-        recent_actions = ForestAction.objects.filter(user=user)[:20]
+        recent_actions = (
+            ForestAction.objects.filter(user=user)
+            .select_related('habit')
+            .order_by('-timestamp')[:20]
+        )
         
         # Achievement progress
         total_achievements = ForestAchievement.objects.count()
@@ -399,30 +209,3 @@ def statistics(self, request):
             'achievement_percentage': round((earned_achievements / total_achievements * 100) if total_achievements > 0 else 0, 1),
             'recent_actions': ForestActionSerializer(recent_actions, many=True).data
         })
-
-    def _spawn_creature(self, user, tree_position):
-        """Helper method to spawn a creature at a tree"""
-        creature_types = ['rabbit', 'bird', 'butterfly', 'squirrel']
-        creature_type = random.choice(creature_types)
-        
-        # Remove old creatures at this tree
-        ForestCreature.objects.filter(tree_position=tree_position, is_active=True).update(is_active=False)
-        
-        # Spawn new creature
-        ForestCreature.objects.create(
-            user=user,
-            creature_type=creature_type,
-            tree_position=tree_position,
-            visit_duration=random.randint(30, 300),  # 30 seconds to 5 minutes
-            x_offset=random.uniform(-20, 20),
-            y_offset=random.uniform(-20, 20)
-        )
-        
-        # Record action
-        ForestAction.objects.create(
-            user=user,
-            action_type='creature_visit',
-            tree_position=tree_position,
-            points_earned=5,
-            metadata={'creature_type': creature_type}
-        )
\ No newline at end of file
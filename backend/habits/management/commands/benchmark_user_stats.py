@@ -0,0 +1,78 @@
+"""
+Management command to benchmark user statistics at large history sizes
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from habits.models import Habit, HabitEntry
+from habits.services import AnalyticsService, RollupService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure query count and latency of AnalyticsService.get_user_stats for a synthetic '
+        'user with the given number of entries. All data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entries', type=int, nargs='+', default=[10_000, 100_000],
+            help='History sizes (entries per user) to benchmark'
+        )
+        parser.add_argument('--days', type=int, default=1000, help='Days of history per habit')
+        parser.add_argument('--runs', type=int, default=5, help='Timed runs per size')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'entries':>10} {'queries':>8} {'median ms':>10} {'max ms':>8}")
+        for size in options['entries']:
+            queries, timings = self._benchmark(size, options['days'], options['runs'])
+            self.stdout.write(
+                f'{size:>10} {queries:>8} {statistics.median(timings):>10.1f} {max(timings):>8.1f}'
+            )
+
+    def _benchmark(self, size, days, runs):
+        with transaction.atomic():
+            user = self._create_history(size, days)
+            with CaptureQueriesContext(connection) as captured:
+                AnalyticsService.get_user_stats(user)
+
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                AnalyticsService.get_user_stats(user)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            transaction.set_rollback(True)
+        return len(captured), timings
+
+    def _create_history(self, size, days):
+        """Create a user whose habits hold `size` entries spread over `days` days"""
+        user = User.objects.create_user(
+            username=f'benchmark-{size}', email=f'benchmark-{size}@example.com'
+        )
+        today = timezone.now().date()
+        habit_count = max(1, -(-size // days))
+        habits = Habit.objects.bulk_create(
+            [Habit(user=user, title=f'Benchmark habit {i}') for i in range(habit_count)]
+        )
+        entries = (
+            HabitEntry(
+                habit=habits[i // days],
+                date=today - timedelta(days=i % days),
+                completed=i % 4 != 0,
+            )
+            for i in range(size)
+        )
+        HabitEntry.objects.bulk_create(entries, batch_size=5000)
+        # bulk_create bypasses the rollup signals
+        RollupService.rebuild(user=user)
+        return user
@@ -0,0 +1,17 @@
+"""
+Management command to delete sync tombstones past their retention
+"""
+from django.core.management.base import BaseCommand
+
+from habits.services import SyncService
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS. '
+        'Clients with older cursors receive a full snapshot instead of a delta.'
+    )
+
+    def handle(self, *args, **options):
+        deleted = SyncService.prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones'))
@@ -0,0 +1,64 @@
+"""
+Management command to verify stored habit streaks against a full recompute
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from habits import streaks
+from habits.models import Habit, HabitEntry
+
+
+class Command(BaseCommand):
+    help = 'Check incrementally maintained streaks against a full recompute of every habit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only verify habits of this username')
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Overwrite mismatched habits with the recomputed values'
+        )
+
+    def handle(self, *args, **options):
+        habits = Habit.objects.all()
+        entries = HabitEntry.objects.all()
+        if options['user']:
+            habits = habits.filter(user__username=options['user'])
+            entries = entries.filter(habit__user__username=options['user'])
+
+        # Recompute every habit from a single query over completed dates
+        expected = streaks.batch_streaks(streaks.completed_dates(entries))
+
+        mismatched = []
+        checked = 0
+        for habit in habits.only('id', 'title', *streaks.STREAK_FIELDS).iterator():
+            checked += 1
+            current, best, last = expected.get(habit.id, streaks.EMPTY_RESULT)
+            # best_streak never decreases, so it only has to cover the recomputed best
+            if (
+                habit.current_streak == current
+                and habit.last_completed == last
+                and habit.best_streak >= best
+            ):
+                continue
+
+            self.stdout.write(self.style.WARNING(
+                f'Habit {habit.id} ({habit.title}): stored '
+                f'current={habit.current_streak} best={habit.best_streak} '
+                f'last={habit.last_completed}, '
+                f'expected current={current} best>={best} last={last}'
+            ))
+            habit.current_streak = current
+            habit.best_streak = max(habit.best_streak, best)
+            habit.last_completed = last
+            habit.updated_at = timezone.now()
+            mismatched.append(habit)
+
+        if mismatched and options['fix']:
+            Habit.objects.bulk_update(
+                mismatched, streaks.STREAK_FIELDS + ['updated_at'], batch_size=500
+            )
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(mismatched)} of {checked} habits'))
+        elif mismatched:
+            raise CommandError(f'{len(mismatched)} of {checked} habits have mismatched streaks')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'All {checked} habits have consistent streaks'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0005_alter_bookmark_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='habitentry',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+    ]
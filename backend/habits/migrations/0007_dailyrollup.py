@@ -0,0 +1,53 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    """Populate the rollup table from existing entries"""
+    HabitEntry = apps.get_model('habits', 'HabitEntry')
+    DailyRollup = apps.get_model('habits', 'DailyRollup')
+    rows = HabitEntry.objects.values_list(
+        'habit__user_id', 'habit_id', 'date', 'completed', 'points_earned'
+    ).iterator(chunk_size=5000)
+    batch = []
+    for user_id, habit_id, date, completed, points in rows:
+        batch.append(DailyRollup(
+            user_id=user_id, habit_id=habit_id, date=date,
+            completed=int(completed), total=1, points=points,
+        ))
+        if len(batch) == 5000:
+            DailyRollup.objects.bulk_create(batch)
+            batch = []
+    DailyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0006_habitentry_date_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='habits.habit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'habits_daily_rollup',
+                'indexes': [models.Index(fields=['user', 'date'], name='habits_dail_user_id_f80293_idx'), models.Index(fields=['date'], name='habits_dail_date_5d3fff_idx')],
+                'unique_together': {('user', 'habit', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_inboxes(apps, schema_editor):
+    """Deliver existing feed items to their author and the author's followers"""
+    FeedItem = apps.get_model('habits', 'FeedItem')
+    FeedInbox = apps.get_model('habits', 'FeedInbox')
+    Follow = apps.get_model('users', 'Follow')
+    followers = {}
+    for follower_id, following_id in Follow.objects.values_list('follower_id', 'following_id').iterator():
+        followers.setdefault(following_id, []).append(follower_id)
+
+    batch = []
+    for item_id, user_id, created_at in FeedItem.objects.values_list('id', 'user_id', 'created_at').iterator():
+        for owner_id in [user_id, *followers.get(user_id, [])]:
+            batch.append(FeedInbox(owner_id=owner_id, feed_item_id=item_id, created_at=created_at))
+        if len(batch) >= 5000:
+            FeedInbox.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedInbox.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0007_dailyrollup'),
+        ('users', '0005_userprofile_followers_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('feed_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='habits.feeditem')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_inbox', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'habits_feed_inbox',
+                'indexes': [models.Index(fields=['owner', '-created_at'], name='habits_feed_owner_i_67372a_idx')],
+                'unique_together': {('owner', 'feed_item')},
+            },
+        ),
+        migrations.RunPython(fill_inboxes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0008_feedinbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('habits', 'Habit'), ('entries', 'Habit entry'), ('stacks', 'Habit stack'), ('badges', 'User badge'), ('tree_positions', 'Tree position')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'habits_tombstone',
+            },
+        ),
+        migrations.AddField(
+            model_name='habitentry',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='habitstack',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', 'updated_at'], name='habits_habi_user_id_bbc18b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habitentry',
+            index=models.Index(fields=['habit', 'updated_at'], name='habits_entr_habit_i_925c31_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habitstack',
+            index=models.Index(fields=['user', 'updated_at'], name='habits_stac_user_id_bd8fe2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbadge',
+            index=models.Index(fields=['user', 'awarded_at'], name='habits_user_user_id_f64f60_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='habits_tomb_user_id_14d642_idx'),
+        ),
+    ]
@@ -6,6 +6,8 @@
 from django.conf import settings
 from django.utils import timezone
 
+from habits import streaks
+
 
 class Habit(models.Model):
     """Track a user's habit with streaks, categories, and simple analytics."""
@@ -64,6 +66,7 @@ class Meta:
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['user', 'is_active']),
             models.Index(fields=['user', 'category']),
+            models.Index(fields=['user', 'updated_at']),
         ]
         unique_together = ['user', 'title']  # Prevent duplicate habit names per user
     
@@ -83,30 +86,12 @@ def total_completions(self) -> int:
         return self.entries.filter(completed=True).count()
     
     def update_streak(self):
-        """Update habit streak based on completion entries."""
-        entries = self.entries.filter(completed=True).order_by('-date')
-        
-        if not entries.exists():
-            self.current_streak = 0
-            self.last_completed = None
-            return
-        
-        streak = 1
-        last_date = entries.first().date
-        self.last_completed = last_date
-        
-        # Count consecutive days
-        for entry in entries[1:]:
-            expected_date = last_date - timezone.timedelta(days=1)
-            if entry.date == expected_date:
-                streak += 1
-                last_date = entry.date
-            else:
-                break
-        
-        self.current_streak = streak
-        if streak > self.best_streak:
-            self.best_streak = streak
+        """Recompute streak fields from every completed entry.
+
+        Check-ins use the incremental engine in ``habits.streaks`` instead;
+        this full scan is kept as the reference implementation.
+        """
+        streaks.recompute(self)
 
 
 class HabitEntry(models.Model):
@@ -116,10 +101,11 @@ class HabitEntry(models.Model):
     Enables tracking of daily completions and analytics.
     """
     habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='entries')
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=timezone.localdate)
     completed = models.BooleanField(default=True)
     note = models.TextField(blank=True, max_length=500)
     completed_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     # For gamification/analytics
     points_earned = models.IntegerField(default=0)
@@ -132,6 +118,7 @@ class Meta:
         indexes = [
             models.Index(fields=['habit', '-date']),
             models.Index(fields=['habit', 'completed']),
+            models.Index(fields=['habit', 'updated_at']),
         ]
     
     def __str__(self):
@@ -139,6 +126,35 @@ def __str__(self):
         return f"{status} {self.habit.title} - {self.date}"
 
 
+class DailyRollup(models.Model):
+    """
+    Completion totals per user, habit and day.
+
+    Denormalized from HabitEntry so analytics can aggregate by user and date
+    without joining entries to habits. Kept in sync by `habits.signals` and
+    `RollupService`; `manage.py rebuild_rollups` recreates it from history.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_rollups'
+    )
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    completed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    points = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'habits_daily_rollup'
+        unique_together = ['user', 'habit', 'date']
+        indexes = [
+            models.Index(fields=['user', 'date']),
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.habit_id} {self.date}: {self.completed}/{self.total}"
+
+
 class HabitStack(models.Model):
     """
     Habit stacking - linking habits together for behavioral chaining.
@@ -153,10 +169,12 @@ class HabitStack(models.Model):
     position = models.PositiveIntegerField(default=0)  # Order in the stack
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'habits_stack'
         unique_together = ['habit', 'anchor_habit']
+        indexes = [models.Index(fields=['user', 'updated_at'])]
     
     def __str__(self):
         return f"{self.anchor_habit.title} -> {self.habit.title}"
@@ -186,6 +204,33 @@ class UserBadge(models.Model):
     class Meta:
         db_table = 'habits_user_badge'
         unique_together = ('user', 'badge')
+        indexes = [models.Index(fields=['user', 'awarded_at'])]
+
+
+class Tombstone(models.Model):
+    """
+    Marks a deleted object for delta sync (see `SyncService`).
+
+    Only direct deletes are recorded: clients drop the entries, stacks and
+    trees of a deleted habit along with it.
+    """
+    KIND_CHOICES = [
+        ('habits', 'Habit'),
+        ('entries', 'Habit entry'),
+        ('stacks', 'Habit stack'),
+        ('badges', 'User badge'),
+        ('tree_positions', 'Tree position'),
+    ]
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tombstones'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'habits_tombstone'
+        indexes = [models.Index(fields=['user', 'deleted_at'])]
 
 
 class PointsTransaction(models.Model):
@@ -268,6 +313,25 @@ class Meta:
         indexes = [models.Index(fields=['user', '-created_at'])]
 
 
+class FeedInbox(models.Model):
+    """
+    A feed item delivered to one reader's feed (fan-out-on-write).
+
+    `created_at` is copied from the feed item so a feed page is a single
+    range scan on (owner, -created_at).
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='feed_inbox'
+    )
+    feed_item = models.ForeignKey(FeedItem, on_delete=models.CASCADE, related_name='inbox_entries')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'habits_feed_inbox'
+        unique_together = ('owner', 'feed_item')
+        indexes = [models.Index(fields=['owner', '-created_at'])]
+
+
 class Comment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     feed_item = models.ForeignKey(FeedItem, on_delete=models.CASCADE, related_name='comments')
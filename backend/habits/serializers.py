@@ -2,6 +2,7 @@
 Serializers for Habit API endpoints
 """
 from rest_framework import serializers
+from habits import streaks
 from habits.models import Habit, HabitEntry, HabitStack, Badge, UserBadge, PointsTransaction, Challenge, ChallengeParticipant, FeedItem, Comment, Reaction
 
 
@@ -14,11 +15,23 @@ class Meta:
         read_only_fields = ['completed_at', 'id']
 
 
+class SyncEntrySerializer(HabitEntrySerializer):
+    """Entry as returned by delta sync, outside of its habit"""
+    
+    class Meta(HabitEntrySerializer.Meta):
+        fields = HabitEntrySerializer.Meta.fields + ['habit', 'updated_at']
+
+
 class HabitSerializer(serializers.ModelSerializer):
     """Main serializer for habits.
     Includes nested entries (read-only) and computed fields for analytics.
+    Computed fields read `total_entries_count`/`completed_entries_count` when the
+    queryset annotates them (see HabitViewSet.get_queryset).
+    Nested entries are dropped when the context sets `include_entries` to False.
+    `current_streak` is the live streak, 0 once a day has been missed.
     """
     entries = HabitEntrySerializer(many=True, read_only=True)
+    current_streak = serializers.SerializerMethodField()
     completion_rate = serializers.SerializerMethodField()
     total_completions = serializers.SerializerMethodField()
     
@@ -30,14 +43,56 @@ class Meta:
             'is_active', 'is_micro_habit', 'reminder_enabled', 'reminder_time',
             'completion_rate', 'total_completions', 'entries', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'public_id', 'current_streak', 'best_streak', 
+        read_only_fields = ['id', 'public_id', 'best_streak', 
                            'last_completed', 'created_at', 'updated_at']
     
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.context.get('include_entries') is False:
+            fields.pop('entries')
+        return fields
+    
+    def get_current_streak(self, obj):
+        return streaks.live_streak(obj.current_streak, obj.last_completed)
+    
     def get_completion_rate(self, obj):
-        return obj.completion_rate
+        # Prefer counts annotated by the queryset to avoid two COUNT queries per habit
+        total = getattr(obj, 'total_entries_count', None)
+        if total is None:
+            return obj.completion_rate
+        return (obj.completed_entries_count / total * 100) if total > 0 else 0
     
     def get_total_completions(self, obj):
-        return obj.total_completions
+        completed = getattr(obj, 'completed_entries_count', None)
+        return obj.total_completions if completed is None else completed
+
+
+class HabitSummarySerializer(serializers.ModelSerializer):
+    """Lightweight habit projection for embedding in other resources.
+    Reads only habit columns (no per-habit COUNTs). Entries are embedded only
+    when the context sets `include_entries` to True and should be prefetched.
+    `current_streak` is the live streak, as in HabitSerializer.
+    """
+    entries = HabitEntrySerializer(many=True, read_only=True)
+    current_streak = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Habit
+        fields = [
+            'id', 'public_id', 'title', 'category', 'color_code', 'icon',
+            'current_streak', 'best_streak', 'last_completed', 'is_active', 'is_micro_habit',
+            'entries',
+        ]
+        read_only_fields = fields
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('include_entries'):
+            fields.pop('entries')
+        return fields
+    
+    def get_current_streak(self, obj):
+        return streaks.live_streak(obj.current_streak, obj.last_completed)
 
 
 class HabitCreateUpdateSerializer(serializers.ModelSerializer):
@@ -135,13 +190,19 @@ class Meta:
 
 
 class FeedItemSerializer(serializers.ModelSerializer):
-    """Community feed item with embedded comments and reactions (read-only).
+    """Community feed item with a summary of its comments and reactions (read-only).
+    Expects items prepared by FeedService.load_summaries: `comments` holds only the
+    latest few comments and `reaction_counts` maps each emoji to its count.
     Write endpoints should operate on related models directly to avoid nested writes.
     """
-    comments = CommentSerializer(many=True, read_only=True)
-    reactions = ReactionSerializer(many=True, read_only=True)
+    comments = CommentSerializer(source='latest_comments', many=True, read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+    reaction_counts = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     
     class Meta:
         model = FeedItem
-        fields = ['id', 'type', 'message', 'habit', 'badge', 'challenge', 'entry', 'created_at', 'comments', 'reactions']
-        read_only_fields = ['id', 'created_at', 'comments', 'reactions']
\ No newline at end of file
+        fields = [
+            'id', 'type', 'message', 'habit', 'badge', 'challenge', 'entry', 'created_at',
+            'comments', 'comments_count', 'reaction_counts',
+        ]
+        read_only_fields = ['id', 'created_at', 'comments', 'comments_count', 'reaction_counts']
\ No newline at end of file
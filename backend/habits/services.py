@@ -4,10 +4,22 @@
 This layer encapsulates all business logic and keeps views/APIs thin.
 Follows domain-driven design principles.
 """
-from datetime import timedelta
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Count
-from habits.models import Habit, HabitEntry, HabitStack, PointsTransaction, FeedItem, Badge, UserBadge
+from django.utils.dateparse import parse_date
+from django.db import transaction
+from django.db.models import Q, Avg, Count, Max, Prefetch, Sum, prefetch_related_objects
+from rest_framework.exceptions import ValidationError
+from core.utils.cache import bump_user_version
+from habits import streaks
+from habits.models import (
+    Habit, HabitEntry, HabitStack, PointsTransaction, FeedItem, FeedInbox, Comment, Reaction,
+    Badge, UserBadge, DailyRollup, Tombstone,
+)
+from users import leaderboard
+from users.models import Follow, UserProfile
 
 
 class HabitService:
@@ -21,160 +33,306 @@ def create_habit(user, **kwargs):
     
     @staticmethod
     def mark_complete(habit: Habit, date=None, note='') -> HabitEntry:
-        """Mark a habit as complete for a given date"""
+        """Mark a habit as complete for a given date.
+
+        The critical writes (entry, streak, points and profile counters) run in
+        one transaction while holding a lock on the habit row, so concurrent
+        taps cannot award points twice. Feed and badge fan-out is deferred
+        until the transaction commits (see `publish_completion`).
+        """
         if date is None:
             date = timezone.now().date()
         
-        entry, created = HabitEntry.objects.get_or_create(
-            habit=habit,
-            date=date,
-            defaults={'completed': True, 'note': note}
-        )
+        # Award points (micro habits less points)
+        base_points = 5 if habit.is_micro_habit else 10
         
-        if created or not entry.completed:
-            entry.completed = True
-            entry.note = note
-            entry.save()
+        with transaction.atomic():
+            HabitService._lock_habit(habit)
+            entry, created = HabitEntry.objects.get_or_create(
+                habit=habit,
+                date=date,
+                defaults={'completed': True, 'note': note, 'points_earned': base_points}
+            )
+            if not created and entry.completed:
+                return entry
+            
+            if not created:
+                entry.completed = True
+                entry.note = note
+                entry.points_earned += base_points
+                entry.save(update_fields=['completed', 'note', 'points_earned', 'updated_at'])
             
-            # Update streak
-            habit.update_streak()
-            habit.save()
+            # Update streak incrementally from the changed date
+            streaks.record_completion(habit, date)
+            habit.save(update_fields=streaks.STREAK_FIELDS + ['updated_at'])
 
-            # Award points (micro habits less points)
-            base_points = 5 if habit.is_micro_habit else 10
             PointsTransaction.objects.create(
-                user=habit.user,
+                user_id=habit.user_id,
                 amount=base_points,
                 reason=f"Completed habit: {habit.title}",
                 habit=habit,
                 entry=entry,
             )
-            # Update profile totals and level
-            profile = habit.user.profile
-            profile.total_points += base_points
-            profile.total_completions += 1
-            # Simple level formula: 100 pts per level
-            profile.level = max(1, (profile.total_points // 100) + 1)
-            profile.current_streak = max(profile.current_streak, habit.current_streak)
-            profile.best_streak = max(profile.best_streak, habit.best_streak)
-            profile.save()
-
-            # Create feed item
-            FeedItem.objects.create(
-                user=habit.user,
-                type='completion',
-                message=f"completed {habit.title}",
-                habit=habit,
-                entry=entry,
+            # Update profile totals and level with a single atomic UPDATE
+            UserProfile.add_counters(
+                habit.user_id,
+                points=base_points,
+                completions=1,
+                current_streak=habit.current_streak,
+                best_streak=habit.best_streak,
             )
 
-            # Check simple badge awards for streaks
-            for code, days, name in [
-                ("streak_7", 7, "7 Day Streak"),
-                ("streak_30", 30, "30 Day Streak"),
-            ]:
-                if habit.current_streak >= days:
-                    badge, _ = Badge.objects.get_or_create(code=code, defaults={
-                        'name': name,
-                        'description': f"Achieved a {days}-day streak",
-                        'points': days,
-                    })
-                    UserBadge.objects.get_or_create(user=habit.user, badge=badge)
+            transaction.on_commit(
+                lambda: HabitService.publish_completion(habit, entry), robust=True
+            )
         
         return entry
     
+    @staticmethod
+    def publish_completion(habit: Habit, entry: HabitEntry):
+        """Non-critical fan-out for a completion, run after the write has committed"""
+        leaderboard.record_completions(
+            habit.user_id, [(entry.date, habit.category)], points=5 if habit.is_micro_habit else 10,
+            streak=streaks.live_streak(habit.current_streak, habit.last_completed),
+        )
+        
+        # Create feed item and deliver it to follower inboxes
+        item = FeedItem.objects.create(
+            user_id=habit.user_id,
+            type='completion',
+            message=f"completed {habit.title}",
+            habit=habit,
+            entry=entry,
+        )
+        FeedService.publish(item)
+
+        # Check simple badge awards for streaks
+        for code, days, name in [
+            ("streak_7", 7, "7 Day Streak"),
+            ("streak_30", 30, "30 Day Streak"),
+        ]:
+            if habit.current_streak >= days:
+                badge, _ = Badge.objects.get_or_create(code=code, defaults={
+                    'name': name,
+                    'description': f"Achieved a {days}-day streak",
+                    'points': days,
+                })
+                UserBadge.objects.get_or_create(user_id=habit.user_id, badge=badge)
+    
     @staticmethod
     def mark_incomplete(habit: Habit, date=None) -> HabitEntry:
         """Mark a habit as incomplete for a given date"""
         if date is None:
             date = timezone.now().date()
         
-        entry, created = HabitEntry.objects.get_or_create(
-            habit=habit,
-            date=date,
-            defaults={'completed': False}
-        )
-        
-        if not created:
-            entry.completed = False
-            entry.save()
+        with transaction.atomic():
+            HabitService._lock_habit(habit)
+            entry, created = HabitEntry.objects.get_or_create(
+                habit=habit,
+                date=date,
+                defaults={'completed': False}
+            )
             
-            # Update streak
-            habit.update_streak()
-            habit.save()
+            if not created and entry.completed:
+                entry.completed = False
+                entry.save(update_fields=['completed', 'updated_at'])
+                
+                # Update streak incrementally from the changed date
+                streaks.record_miss(habit, date)
+                habit.save(update_fields=streaks.STREAK_FIELDS + ['updated_at'])
+                
+                transaction.on_commit(
+                    lambda: leaderboard.record_uncompletions(
+                        habit.user_id, [(date, habit.category)]
+                    ),
+                    robust=True,
+                )
         
         return entry
     
     @staticmethod
-    def calculate_streak(habit: Habit) -> int:
-        """Calculate current streak for a habit"""
-        entries = habit.entries.filter(completed=True).order_by('-date')
-        
-        if not entries.exists():
-            return 0
+    def _lock_habit(habit: Habit):
+        """Lock the habit row for the current transaction and refresh its streak state.
+
+        Concurrent writers for the same habit queue up here, and each one sees
+        the streak left behind by the previous writer.
+        """
+        locked = Habit.objects.select_for_update().only(*streaks.STREAK_FIELDS).get(pk=habit.pk)
+        for field in streaks.STREAK_FIELDS:
+            setattr(habit, field, getattr(locked, field))
+    
+    @staticmethod
+    def bulk_upsert_entries(user, rows) -> list:
+        """Create or update many entries at once (offline client sync).
+
+        `rows` are dicts with `habit_id`, `date`, and optional `completed`
+        (default True) and `note`. Ownership is checked with one `IN` query,
+        entries are written with a single upsert on (habit, date), and each
+        affected habit's streak, daily rollup and the profile totals are
+        updated once.
+        Completions award points like `mark_complete`; feed items are not
+        published for synced history.
+
+        Returns one result per input row, in order, with a `status` of
+        `created`, `updated`, `unchanged`, `duplicate` (superseded by a later
+        row for the same habit and date), `not_found` or `invalid`.
+        """
+        results = []
+        pending = {}
+        for index, row in enumerate(rows):
+            result = {'index': index, 'habit_id': row.get('habit_id'), 'date': row.get('date')}
+            results.append(result)
+            try:
+                habit_id = int(row.get('habit_id'))
+                date = parse_date(str(row.get('date')))
+            except (TypeError, ValueError):
+                habit_id = date = None
+            completed = row.get('completed', True)
+            note = row.get('note')
+            if note is None:
+                note = ''
+            if (habit_id is None or date is None or not isinstance(completed, bool)
+                    or not isinstance(note, str) or len(note) > 500):
+                result['status'] = 'invalid'
+                continue
+            key = (habit_id, date)
+            if key in pending:
+                pending[key][0]['status'] = 'duplicate'
+            pending[key] = (result, completed, note)
         
-        streak = 1
-        last_date = entries.first().date
+        if not pending:
+            return results
         
-        for entry in entries[1:]:
-            expected_date = last_date - timedelta(days=1)
-            if entry.date == expected_date:
-                streak += 1
-                last_date = entry.date
-            else:
-                break
+        habit_ids = {habit_id for habit_id, _ in pending}
+        with transaction.atomic():
+            habits = {
+                habit.id: habit
+                for habit in Habit.objects.select_for_update().filter(user=user, id__in=habit_ids)
+            }
+            existing = {
+                (entry.habit_id, entry.date): entry
+                for entry in HabitEntry.objects.filter(
+                    habit_id__in=habits, date__in={date for _, date in pending}
+                )
+            }
+            
+            to_write = []
+            newly_completed = []
+            uncompleted = []
+            for (habit_id, date), (result, completed, note) in pending.items():
+                if habit_id not in habits:
+                    result['status'] = 'not_found'
+                    continue
+                current = existing.get((habit_id, date))
+                if current is None:
+                    result['status'] = 'created'
+                elif (current.completed, current.note) == (completed, note):
+                    result['status'] = 'unchanged'
+                    result['entry_id'] = current.id
+                    continue
+                else:
+                    result['status'] = 'updated'
+                habit = habits[habit_id]
+                entry = HabitEntry(
+                    habit=habit, date=date, completed=completed, note=note,
+                    points_earned=current.points_earned if current else 0,
+                )
+                if completed and (current is None or not current.completed):
+                    entry.points_earned += 5 if habit.is_micro_habit else 10
+                    newly_completed.append(entry)
+                elif not completed and current is not None and current.completed:
+                    uncompleted.append((date, habit.category))
+                to_write.append((result, entry))
+            
+            if not to_write:
+                return results
+            
+            HabitEntry.objects.bulk_create(
+                [entry for _, entry in to_write],
+                update_conflicts=True,
+                unique_fields=['habit', 'date'],
+                update_fields=['completed', 'note', 'points_earned', 'updated_at'],
+            )
+            for result, entry in to_write:
+                result['entry_id'] = entry.pk
+            # bulk_create skips post_save, so keep the daily rollups and caches in step here
+            RollupService.sync_entries([entry for _, entry in to_write])
+            bump_user_version(user.id, 'habits', 'forest')
+            
+            # Recompute streaks once per affected habit from a single query
+            affected = [habits[habit_id] for habit_id in {entry.habit_id for _, entry in to_write}]
+            changed = StreakService.recompute_streaks(affected)
+            Habit.objects.bulk_update(changed, streaks.STREAK_FIELDS + ['updated_at'])
+            
+            if newly_completed:
+                points = []
+                for entry in newly_completed:
+                    habit = habits[entry.habit_id]
+                    points.append(PointsTransaction(
+                        user=user,
+                        amount=5 if habit.is_micro_habit else 10,
+                        reason=f"Completed habit: {habit.title}",
+                        habit=habit,
+                        entry=entry if entry.pk else None,
+                    ))
+                PointsTransaction.objects.bulk_create(points)
+                UserProfile.add_counters(
+                    user.id,
+                    points=sum(p.amount for p in points),
+                    completions=len(points),
+                    current_streak=max(h.current_streak for h in affected),
+                    best_streak=max(h.best_streak for h in affected),
+                )
+                completions = [
+                    (entry.date, habits[entry.habit_id].category) for entry in newly_completed
+                ]
+                total = sum(p.amount for p in points)
+                streak = max(
+                    streaks.live_streak(h.current_streak, h.last_completed) for h in affected
+                )
+                transaction.on_commit(
+                    lambda: leaderboard.record_completions(
+                        user.id, completions, points=total, streak=streak
+                    ),
+                    robust=True,
+                )
+            
+            if uncompleted:
+                transaction.on_commit(
+                    lambda: leaderboard.record_uncompletions(user.id, uncompleted), robust=True
+                )
         
-        return streak
+        return results
+    
+    @staticmethod
+    def calculate_streak(habit: Habit) -> int:
+        """Calculate current (live) streak for a habit"""
+        return streaks.live_streak(habit.current_streak, habit.last_completed)
     
     @staticmethod
     def get_user_stats(user) -> dict:
         """Get comprehensive stats for a user"""
-        habits = user.habits.all()
-        entries = HabitEntry.objects.filter(habit__user=user)
-        
-        # Calculate week/month boundaries
-        now = timezone.now()
-        week_ago = (now - timedelta(days=7)).date()
-        month_ago = (now - timedelta(days=30)).date()
-        
-        week_entries = entries.filter(date__gte=week_ago, completed=True).count()
-        month_entries = entries.filter(date__gte=month_ago, completed=True).count()
-        
-        total_completions = entries.filter(completed=True).count()
-        total_habits = habits.count()
-        active_habits = habits.filter(is_active=True).count()
-        
-        # Average streak
-        average_streak = 0
-        if total_habits > 0:
-            total_streak = sum(h.current_streak for h in habits)
-            average_streak = total_streak / total_habits
-        
-        completion_rate = 0
-        if entries.exists():
-            completion_rate = (total_completions / entries.count()) * 100
-        
-        return {
-            'total_habits': total_habits,
-            'active_habits': active_habits,
-            'total_completions': total_completions,
-            'average_streak': average_streak,
-            'completion_rate': completion_rate,
-            'this_week_completions': week_entries,
-            'this_month_completions': month_entries,
-        }
+        return AnalyticsService.get_user_stats(user)
     
     @staticmethod
     def get_habits_for_date(user, date=None):
-        """Get all habits with entries for a specific date"""
+        """Get all active habits with their entry for a specific date.
+
+        Resolved with two queries (habits + one filtered prefetch of that day's
+        entries) regardless of how many habits the user has.
+        """
         if date is None:
             date = timezone.now().date()
         
-        habits = user.habits.filter(is_active=True)
+        habits = user.habits.filter(is_active=True).prefetch_related(
+            Prefetch(
+                'entries', queryset=HabitEntry.objects.filter(date=date), to_attr='date_entries'
+            )
+        )
         habits_with_entries = []
         
         for habit in habits:
-            entry = habit.entries.filter(date=date).first()
+            entry = habit.date_entries[0] if habit.date_entries else None
             habits_with_entries.append({
                 'habit': habit,
                 'entry': entry,
@@ -182,6 +340,46 @@ def get_habits_for_date(user, date=None):
             })
         
         return habits_with_entries
+    
+    ENTRY_WINDOWS = ('none', 'recent', 'all')
+    
+    @staticmethod
+    def get_entries_window(query_params) -> tuple:
+        """Resolve which nested entries a habit response should embed.
+
+        Accepts `?entries=none|recent|all` (default `recent`, i.e. the last
+        HABIT_ENTRIES_RECENT_DAYS days) or an explicit `?entries_since=YYYY-MM-DD`.
+        Returns `(include_entries, since)`; `since` is None for the full history.
+        """
+        since_param = query_params.get('entries_since')
+        if since_param:
+            try:
+                since = parse_date(since_param)
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError({'entries_since': 'Must be a valid YYYY-MM-DD date.'})
+            return True, since
+        
+        window = query_params.get('entries', 'recent')
+        if window not in HabitService.ENTRY_WINDOWS:
+            raise ValidationError(
+                {'entries': f"Must be one of: {', '.join(HabitService.ENTRY_WINDOWS)}."}
+            )
+        if window == 'none':
+            return False, None
+        if window == 'all':
+            return True, None
+        days = getattr(settings, 'HABIT_ENTRIES_RECENT_DAYS', 30)
+        return True, timezone.now().date() - timedelta(days=days - 1)
+    
+    @staticmethod
+    def get_entries_prefetch(since=None, lookup='entries') -> Prefetch:
+        """Prefetch a habit's entries, limited to dates on or after `since`"""
+        queryset = HabitEntry.objects.all()
+        if since is not None:
+            queryset = queryset.filter(date__gte=since)
+        return Prefetch(lookup, queryset=queryset)
 
 
 class StreakService:
@@ -191,14 +389,19 @@ class StreakService:
     def get_all_user_streaks(user) -> dict:
         """Get all streak information for user"""
         habits = user.habits.all()
+        today = timezone.now().date()
         return {
-            'current_total': sum(h.current_streak for h in habits),
+            'current_total': sum(
+                streaks.live_streak(h.current_streak, h.last_completed, today) for h in habits
+            ),
             'best_total': sum(h.best_streak for h in habits),
             'habits': [
                 {
                     'id': h.id,
                     'title': h.title,
-                    'current_streak': h.current_streak,
+                    'current_streak': streaks.live_streak(
+                        h.current_streak, h.last_completed, today
+                    ),
                     'best_streak': h.best_streak,
                     'last_completed': h.last_completed,
                 }
@@ -222,77 +425,447 @@ def check_never_miss_twice(habit: Habit) -> bool:
 
     @staticmethod
     def calculate_streak(habit: Habit):
-        """Calculate current streak for a habit"""
-        today = timezone.now().date()
-        entries = habit.entries.filter(completed=True).order_by('-date')
+        """Calculate current (live) streak for a habit"""
+        return streaks.live_streak(habit.current_streak, habit.last_completed)
+
+    @staticmethod
+    def recompute_streaks(habits) -> list:
+        """Recompute stored streaks for many habits with a single entries query.
+
+        Returns the habits whose streak fields changed, ready for bulk_update
+        (which skips auto_now, so `updated_at` is set here).
+        """
+        habits = list(habits)
+        results = streaks.streaks_for_habits([h.id for h in habits])
+        now = timezone.now()
+        changed = []
+        for habit in habits:
+            current, best, last = results[habit.id]
+            best = max(habit.best_streak or 0, best)
+            stored = (habit.current_streak, habit.best_streak, habit.last_completed)
+            if stored != (current, best, last):
+                habit.current_streak, habit.best_streak, habit.last_completed = current, best, last
+                habit.updated_at = now
+                changed.append(habit)
+        return changed
+
+
+class RollupService:
+    """Maintain the DailyRollup table from habit entries.
+
+    A rollup row mirrors exactly one entry (one entry per habit per day), so
+    syncing is an upsert of the new values rather than a delta and can be
+    repeated safely.
+    """
+    
+    @staticmethod
+    def to_rollup(entry: HabitEntry) -> DailyRollup:
+        """Build the rollup row for an entry (its habit should already be loaded)"""
+        return DailyRollup(
+            user_id=entry.habit.user_id,
+            habit_id=entry.habit_id,
+            date=entry.date,
+            completed=int(entry.completed),
+            total=1,
+            points=entry.points_earned,
+        )
+    
+    @staticmethod
+    def sync_entries(entries):
+        """Upsert the rollup rows for the given entries with one query"""
+        DailyRollup.objects.bulk_create(
+            [RollupService.to_rollup(entry) for entry in entries],
+            update_conflicts=True,
+            unique_fields=['user', 'habit', 'date'],
+            update_fields=['completed', 'total', 'points'],
+        )
+    
+    @staticmethod
+    def remove_entry(entry: HabitEntry):
+        """Drop the rollup row of a deleted entry"""
+        RollupService.remove_day(entry.habit_id, entry.date)
+    
+    @staticmethod
+    def remove_day(habit_id, date):
+        """Drop a habit's rollup row for one day (its entry was deleted or moved)"""
+        DailyRollup.objects.filter(habit_id=habit_id, date=date).delete()
+    
+    @staticmethod
+    def rebuild(user=None, batch_size=5000) -> int:
+        """Recreate rollup rows from the full entry history, optionally for one user.
+
+        Entries are streamed and inserted in batches; returns the number of rows written.
+        """
+        entries = HabitEntry.objects.all()
+        rollups = DailyRollup.objects.all()
+        if user is not None:
+            entries = entries.filter(habit__user=user)
+            rollups = rollups.filter(user=user)
         
-        if not entries.exists():
-            return 0
-            
-        streak = 0
-        current_date = today
-        
-        for entry in entries:
-            if entry.date == current_date:
-                streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
-                
-        return streak
+        rows = entries.values_list(
+            'habit__user_id', 'habit_id', 'date', 'completed', 'points_earned'
+        ).iterator(chunk_size=batch_size)
+        written = 0
+        with transaction.atomic():
+            rollups.delete()
+            batch = []
+            for user_id, habit_id, date, completed, points in rows:
+                batch.append(DailyRollup(
+                    user_id=user_id, habit_id=habit_id, date=date,
+                    completed=int(completed), total=1, points=points,
+                ))
+                if len(batch) == batch_size:
+                    DailyRollup.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            DailyRollup.objects.bulk_create(batch)
+            written += len(batch)
+        return written
+
+
+class SyncService:
+    """Delta sync for offline-first clients.
+
+    A cursor is the server time at which a sync read started. The next sync
+    returns what was updated or deleted since then, re-reading a short overlap
+    so that writes committed just after the previous read (with slightly older
+    timestamps) are not missed; clients apply rows idempotently. A missing
+    cursor, or one older than the tombstone retention, gets a full snapshot.
+    """
+    CURSOR_OVERLAP = timedelta(seconds=30)
+    
+    @staticmethod
+    def encode_cursor(moment) -> str:
+        return urlsafe_b64encode(moment.isoformat().encode()).decode()
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            moment = datetime.fromisoformat(urlsafe_b64decode(cursor.encode()).decode())
+        except ValueError:
+            raise ValidationError({'since': 'Invalid cursor.'})
+        if timezone.is_naive(moment):
+            raise ValidationError({'since': 'Invalid cursor.'})
+        return moment
+    
+    @staticmethod
+    def get_changes(user, since=None) -> dict:
+        """Collect the user's rows changed since `since` and the ids deleted since then.
+
+        One indexed range query per synced table (plus one for tombstones).
+        """
+        from forest.models import ForestLayout, TreePosition
+        
+        now = timezone.now()
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        full = since is None or since < now - retention
+        changed_since = None if full else since - SyncService.CURSOR_OVERLAP
+        
+        def changed(queryset, field='updated_at'):
+            return queryset if full else queryset.filter(**{f'{field}__gte': changed_since})
+        
+        habits = changed(Habit.objects.filter(user=user)).annotate(
+            total_entries_count=Count('entries'),
+            completed_entries_count=Count('entries', filter=Q(entries__completed=True)),
+        )
+        deleted = {kind: [] for kind, _ in Tombstone.KIND_CHOICES}
+        if not full:
+            tombstones = Tombstone.objects.filter(user=user, deleted_at__gte=changed_since)
+            for kind, object_id in tombstones.values_list('kind', 'object_id'):
+                deleted[kind].append(object_id)
+        
+        return {
+            'cursor': SyncService.encode_cursor(now),
+            'full': full,
+            'habits': habits,
+            'entries': changed(HabitEntry.objects.filter(habit__user=user)),
+            'stacks': changed(HabitStack.objects.filter(user=user))
+            .select_related('habit', 'anchor_habit'),
+            'badges': changed(UserBadge.objects.filter(user=user), 'awarded_at')
+            .select_related('badge'),
+            'forest_layout': changed(ForestLayout.objects.filter(user=user)).first(),
+            'tree_positions': changed(TreePosition.objects.filter(user=user)),
+            'deleted': deleted,
+        }
+    
+    @staticmethod
+    def record_deletion(user_id, kind, object_id):
+        Tombstone.objects.create(user_id=user_id, kind=kind, object_id=object_id)
+    
+    @staticmethod
+    def prune_tombstones() -> int:
+        """Delete tombstones older than the retention; their cursors resync in full"""
+        cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        return deleted
+
+
+class FeedService:
+    """Per-user feed inboxes.
+
+    Feed items are fanned out on write: publishing copies the item into the
+    inbox of its author and of every follower. Accounts with more than
+    FEED_FANOUT_MAX_FOLLOWERS followers only write their own inbox row, and
+    their followers fan them in at read time instead.
+    """
+    
+    # Recent items copied into a new follower's inbox
+    FOLLOW_BACKFILL_ITEMS = 50
+    PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    # Comments embedded per feed item; the rest are only counted
+    LATEST_COMMENTS = 3
+    
+    @staticmethod
+    def fans_out(user_id) -> bool:
+        """Whether the user's items are written to follower inboxes"""
+        followers_count = (
+            UserProfile.objects.filter(user_id=user_id)
+            .values_list('followers_count', flat=True)
+            .first()
+        )
+        return (followers_count or 0) <= settings.FEED_FANOUT_MAX_FOLLOWERS
+    
+    @staticmethod
+    def publish(item: FeedItem):
+        """Deliver a new feed item to its author's inbox and, if fanned out, to followers"""
+        owner_ids = [item.user_id]
+        if FeedService.fans_out(item.user_id):
+            owner_ids += Follow.objects.filter(following_id=item.user_id).values_list(
+                'follower_id', flat=True
+            )
+        FeedInbox.objects.bulk_create(
+            [
+                FeedInbox(owner_id=owner_id, feed_item=item, created_at=item.created_at)
+                for owner_id in owner_ids
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    
+    @staticmethod
+    def backfill_follow(follower_id, following_id):
+        """Copy the followed account's recent items into the new follower's inbox"""
+        if not FeedService.fans_out(following_id):
+            return
+        items = FeedItem.objects.filter(user_id=following_id).order_by('-created_at')
+        recent = items.values_list('id', 'created_at')[:FeedService.FOLLOW_BACKFILL_ITEMS]
+        FeedInbox.objects.bulk_create(
+            [
+                FeedInbox(owner_id=follower_id, feed_item_id=item_id, created_at=created_at)
+                for item_id, created_at in recent
+            ],
+            ignore_conflicts=True,
+        )
+    
+    @staticmethod
+    def remove_follow(follower_id, following_id):
+        """Drop the unfollowed account's items from the former follower's inbox"""
+        FeedInbox.objects.filter(owner_id=follower_id, feed_item__user_id=following_id).delete()
+    
+    @staticmethod
+    def get_feed(user, limit=200, before=None) -> list:
+        """Newest feed items for a user, optionally only those older than `before`.
+
+        `before` is a `(created_at, id)` position; items are ordered by that
+        pair descending. One range scan of the user's inbox on
+        (owner, -created_at), plus one query for the recent items of followed
+        high-follower accounts, merged by position.
+        """
+        related = ('habit', 'badge', 'challenge')
+        inbox = FeedInbox.objects.filter(owner=user)
+        if before is not None:
+            created_at, item_id = before
+            inbox = inbox.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, feed_item_id__lt=item_id)
+            )
+        items = [
+            entry.feed_item
+            for entry in inbox.select_related(*(f'feed_item__{field}' for field in related))
+            .order_by('-created_at', '-feed_item_id')[:limit]
+        ]
+        
+        fanned_in = Follow.objects.filter(
+            follower=user,
+            following__profile__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        ).values('following_id')
+        pulled = FeedItem.objects.filter(user_id__in=fanned_in)
+        if before is not None:
+            pulled = pulled.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=item_id)
+            )
+        pulled = list(pulled.select_related(*related).order_by('-created_at', '-id')[:limit])
+        if not pulled:
+            return items
+        
+        # Accounts that crossed the threshold may still have older items in the inbox
+        merged = {item.id: item for item in items + pulled}
+        merged = sorted(merged.values(), key=lambda item: (item.created_at, item.id), reverse=True)
+        return merged[:limit]
+    
+    @staticmethod
+    def get_feed_page(user, page_size=PAGE_SIZE, cursor=None) -> tuple:
+        """Return `(items, next_cursor)` for one page of the feed.
+
+        Items come with their summaries loaded (see `load_summaries`);
+        `next_cursor` is None on the last page.
+        """
+        before = FeedService.decode_cursor(cursor) if cursor else None
+        items = FeedService.get_feed(user, limit=page_size + 1, before=before)
+        next_cursor = None
+        if len(items) > page_size:
+            next_cursor = FeedService.encode_cursor(items[page_size - 1])
+        items = items[:page_size]
+        FeedService.load_summaries(items)
+        return items, next_cursor
+    
+    @staticmethod
+    def encode_cursor(item: FeedItem) -> str:
+        """Opaque cursor for the position right after `item`"""
+        position = f'{item.created_at.isoformat()}|{item.id}'
+        return urlsafe_b64encode(position.encode()).decode()
+    
+    @staticmethod
+    def decode_cursor(cursor) -> tuple:
+        """Parse a cursor back into a `(created_at, id)` position"""
+        try:
+            created_at, item_id = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(item_id)
+        except ValueError:
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+    
+    @staticmethod
+    def load_summaries(items, comments_limit=LATEST_COMMENTS):
+        """Attach reaction counts per emoji, comment counts and the latest comments.
+
+        Three queries for the whole page regardless of its size: two grouped
+        counts and one windowed prefetch of the newest `comments_limit`
+        comments per item.
+        """
+        ids = [item.id for item in items]
+        if not ids:
+            return
+        
+        reaction_counts = {}
+        reactions = (
+            Reaction.objects.filter(feed_item_id__in=ids)
+            .values('feed_item_id', 'emoji')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for row in reactions:
+            reaction_counts.setdefault(row['feed_item_id'], {})[row['emoji']] = row['count']
+        
+        comment_counts = dict(
+            Comment.objects.filter(feed_item_id__in=ids)
+            .values('feed_item_id')
+            .annotate(count=Count('id'))
+            .order_by()
+            .values_list('feed_item_id', 'count')
+        )
+        
+        # A sliced prefetch queryset is limited per item with ROW_NUMBER() OVER (PARTITION BY ...)
+        latest = Comment.objects.select_related('user').order_by('-created_at', '-id')
+        prefetch_related_objects(
+            items, Prefetch('comments', queryset=latest[:comments_limit], to_attr='latest_comments')
+        )
+        
+        for item in items:
+            item.reaction_counts = reaction_counts.get(item.id, {})
+            item.comments_count = comment_counts.get(item.id, 0)
 
 
 class AnalyticsService:
-    """Service for analytics and reporting"""
+    """Service for analytics and reporting
+
+    Aggregates read the DailyRollup table rather than raw entries.
+    """
     
     @staticmethod
     def get_user_stats(user):
-        """Get comprehensive user statistics"""
-        habits = Habit.objects.filter(user=user)
-        entries = HabitEntry.objects.filter(habit__user=user)
-        completed_entries = entries.filter(completed=True)
-        
+        """Get comprehensive user statistics.
+
+        Two aggregate queries regardless of history size: one conditional
+        aggregate over the user's daily rollups and one over the user row joined to
+        their habits and profile.
+        """
         now = timezone.now().date()
         week_ago = now - timedelta(days=7)
         month_ago = now - timedelta(days=30)
         
+        entry_stats = DailyRollup.objects.filter(user=user).aggregate(
+            total_entries=Sum('total'),
+            total_completions=Sum('completed'),
+            this_week_completions=Sum('completed', filter=Q(date__gte=week_ago)),
+            this_month_completions=Sum('completed', filter=Q(date__gte=month_ago)),
+        )
+        
+        live_streak = streaks.live_streak_expression(now, prefix='habits__')
+        user_stats = type(user).objects.filter(pk=user.pk).aggregate(
+            total_habits=Count('habits'),
+            active_habits=Count('habits', filter=Q(habits__is_active=True)),
+            average_streak=Avg(live_streak),
+            current_streak=Max(live_streak),
+            best_streak=Max('habits__best_streak'),
+            # One-to-one, so Max simply carries the profile value through the join
+            total_points=Max('profile__total_points'),
+            profile_current_streak=Max('profile__current_streak'),
+            profile_best_streak=Max('profile__best_streak'),
+        )
+        
         # Initialize stats with safe defaults for new users
-        stats = {
-            'total_habits': habits.count(),
-            'active_habits': habits.filter(is_active=True).count(),
-            'total_completions': completed_entries.count(),
-            'completion_rate': 0,
-            'average_streak': 0,
-            'this_week_completions': completed_entries.filter(date__gte=week_ago).count(),
-            'this_month_completions': completed_entries.filter(date__gte=month_ago).count(),
-            'current_streak': 0,
-            'best_streak': 0,
-            'total_points': 0
+        total_entries = entry_stats['total_entries'] or 0
+        total_completions = entry_stats['total_completions'] or 0
+        return {
+            'total_habits': user_stats['total_habits'],
+            'active_habits': user_stats['active_habits'],
+            'total_completions': total_completions,
+            'completion_rate': (total_completions / total_entries * 100) if total_entries else 0,
+            'average_streak': user_stats['average_streak'] or 0,
+            'this_week_completions': entry_stats['this_week_completions'] or 0,
+            'this_month_completions': entry_stats['this_month_completions'] or 0,
+            'current_streak': max(
+                user_stats['current_streak'] or 0, user_stats['profile_current_streak'] or 0
+            ),
+            'best_streak': max(
+                user_stats['best_streak'] or 0, user_stats['profile_best_streak'] or 0
+            ),
+            'total_points': user_stats['total_points'] or 0,
         }
+
+    SERIES_BUCKETS = ('day', 'week', 'month')
+    
+    @staticmethod
+    def bucket_start(day, bucket):
+        """Return the first day of the bucket containing `day` (weeks start on Monday)"""
+        if bucket == 'week':
+            return day - timedelta(days=day.weekday())
+        if bucket == 'month':
+            return day.replace(day=1)
+        return day
+    
+    @staticmethod
+    def get_completion_series(user, start, end, bucket='day'):
+        """Completions per day/week/month between `start` and `end` (inclusive).
+
+        One GROUP BY date query; days without completions are zero-filled and
+        buckets are labelled by their first day (clamped to `start`).
+        """
+        per_day = dict(
+            DailyRollup.objects.filter(user=user, completed__gt=0, date__range=(start, end))
+            .values('date')
+            .annotate(completions=Sum('completed'))
+            .values_list('date', 'completions')
+        )
         
-        # Calculate completion rate safely
-        if entries.count() > 0:
-            stats['completion_rate'] = (completed_entries.count() / entries.count()) * 100
-            
-        # Calculate streak data safely for users with habits
-        if habits.exists():
-            streaks = [h.current_streak for h in habits if h.current_streak is not None]
-            best_streaks = [h.best_streak for h in habits if h.best_streak is not None]
-            
-            if streaks:
-                stats['average_streak'] = sum(streaks) / len(streaks)
-                stats['current_streak'] = max(streaks)
-            if best_streaks:
-                stats['best_streak'] = max(best_streaks)
-            
-        # Get data from user profile (created by signals)
-        if hasattr(user, 'profile'):
-            profile = user.profile
-            stats['total_points'] = profile.total_points or 0
-            stats['current_streak'] = max(stats['current_streak'], profile.current_streak or 0)
-            stats['best_streak'] = max(stats['best_streak'], profile.best_streak or 0)
-            
-        return stats
+        series = {}
+        day = start
+        while day <= end:
+            key = max(start, AnalyticsService.bucket_start(day, bucket))
+            series[key] = series.get(key, 0) + per_day.get(day, 0)
+            day += timedelta(days=1)
+        
+        return [{'date': key.isoformat(), 'completions': count} for key, count in series.items()]
 
     @staticmethod
     def get_weekly_data(user):
@@ -300,19 +873,9 @@ def get_weekly_data(user):
         now = timezone.now().date()
         week_ago = now - timedelta(days=6)
         
-        data = []
-        for i in range(7):
-            day = week_ago + timedelta(days=i)
-            count = HabitEntry.objects.filter(
-                habit__user=user, 
-                completed=True, 
-                date=day
-            ).count()
-            data.append({
-                'date': day.isoformat(),
-                'completions': count,
-                'day_name': day.strftime('%a')
-            })
+        data = AnalyticsService.get_completion_series(user, week_ago, now)
+        for offset, point in enumerate(data):
+            point['day_name'] = (week_ago + timedelta(days=offset)).strftime('%a')
         
         return data
 
@@ -322,20 +885,7 @@ def get_monthly_data(user):
         now = timezone.now().date()
         month_ago = now - timedelta(days=29)
         
-        data = []
-        for i in range(30):
-            day = month_ago + timedelta(days=i)
-            count = HabitEntry.objects.filter(
-                habit__user=user,
-                completed=True,
-                date=day
-            ).count()
-            data.append({
-                'date': day.isoformat(),
-                'completions': count
-            })
-            
-        return data
+        return AnalyticsService.get_completion_series(user, month_ago, now)
 
 
 class BadgeService:
@@ -405,20 +955,15 @@ def check_and_award_badges(cls, user, habit, entry):
             cls._award_badge_if_not_owned(user, 'STREAK_100')
             
         # Completion badges
-        total_completions = HabitEntry.objects.filter(
-            habit__user=user, 
-            completed=True
-        ).count()
-        if total_completions == 100:
+        completions = DailyRollup.objects.filter(user=user).aggregate(
+            all_habits=Sum('completed'),
+            micro=Sum('completed', filter=Q(habit__is_micro_habit=True)),
+        )
+        if completions['all_habits'] == 100:
             cls._award_badge_if_not_owned(user, 'COMPLETIONS_100')
             
         # Micro habit badge
-        micro_completions = HabitEntry.objects.filter(
-            habit__user=user,
-            habit__is_micro_habit=True,
-            completed=True
-        ).count()
-        if micro_completions == 50:
+        if completions['micro'] == 50:
             cls._award_badge_if_not_owned(user, 'MICRO_MASTER')
     
     @classmethod
@@ -440,10 +985,10 @@ def _award_badge_if_not_owned(cls, user, badge_code):
                 )
                 
                 # Update user total points
-                profile = getattr(user, 'profile', None)
-                if profile:
-                    profile.total_points += badge.points
-                    profile.save()
+                UserProfile.add_counters(user.id, points=badge.points)
+                transaction.on_commit(
+                    lambda: leaderboard.add_points(user.id, badge.points), robust=True
+                )
                     
                 return user_badge
         except Badge.DoesNotExist:
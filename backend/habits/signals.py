@@ -0,0 +1,102 @@
+"""
+Habits app signals - Keep daily rollups, feed inboxes, cached responses and sync tombstones in sync
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.utils.cache import bump_user_version
+from habits.models import Habit, HabitEntry, HabitStack, UserBadge
+from habits.services import FeedService, RollupService, SyncService
+from users.models import Follow
+
+
+@receiver(pre_save, sender=HabitEntry)
+def remember_entry_date(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the stored date of an updated entry so a date change can move its rollup row"""
+    instance._previous_date = None
+    if raw or instance.pk is None or (update_fields is not None and 'date' not in update_fields):
+        return
+    instance._previous_date = (
+        HabitEntry.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=HabitEntry)
+def sync_daily_rollup(sender, instance, raw=False, **kwargs):
+    """Mirror every saved entry into its daily rollup row (skipped for fixture loading)"""
+    if raw:
+        return
+    previous_date = getattr(instance, '_previous_date', None)
+    if previous_date is not None and previous_date != instance.date:
+        RollupService.remove_day(instance.habit_id, previous_date)
+    RollupService.sync_entries([instance])
+
+
+@receiver(post_delete, sender=HabitEntry)
+def remove_daily_rollup(sender, instance, origin=None, **kwargs):
+    """
+    Drop the rollup row of a deleted entry.
+
+    When the deletion cascades from a habit or user, their rollup rows are
+    removed by the same cascade, so there is nothing to do per entry.
+    """
+    if isinstance(origin, HabitEntry) or getattr(origin, 'model', None) is HabitEntry:
+        RollupService.remove_entry(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed_inbox(sender, instance, created, raw=False, **kwargs):
+    """Give a new follower the followed account's recent feed items"""
+    if created and not raw:
+        FeedService.backfill_follow(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_feed_inbox(sender, instance, origin=None, **kwargs):
+    """Remove an unfollowed account's items (inboxes of deleted users cascade on their own)"""
+    if isinstance(origin, Follow) or getattr(origin, 'model', None) is Follow:
+        FeedService.remove_follow(instance.follower_id, instance.following_id)
+
+
+@receiver([post_save, post_delete], sender=Habit)
+def invalidate_habit_responses(sender, instance, **kwargs):
+    """Habits feed both the habit dashboards and the forest overview"""
+    bump_user_version(instance.user_id, 'habits', 'forest')
+
+
+@receiver(post_save, sender=HabitEntry)
+@receiver(post_delete, sender=HabitEntry)
+def invalidate_entry_responses(sender, instance, origin=None, **kwargs):
+    """Cascaded entry deletes are covered by the habit's own signal"""
+    if (origin is None or isinstance(origin, HabitEntry)
+            or getattr(origin, 'model', None) is HabitEntry):
+        bump_user_version(instance.habit.user_id, 'habits', 'forest')
+
+
+def _is_direct_delete(instance, origin):
+    model = type(instance)
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(post_delete, sender=Habit)
+def record_habit_tombstone(sender, instance, origin=None, **kwargs):
+    if _is_direct_delete(instance, origin):
+        SyncService.record_deletion(instance.user_id, 'habits', instance.id)
+
+
+@receiver(post_delete, sender=HabitEntry)
+def record_entry_tombstone(sender, instance, origin=None, **kwargs):
+    if _is_direct_delete(instance, origin):
+        SyncService.record_deletion(instance.habit.user_id, 'entries', instance.id)
+
+
+@receiver(post_delete, sender=HabitStack)
+def record_stack_tombstone(sender, instance, origin=None, **kwargs):
+    if _is_direct_delete(instance, origin):
+        SyncService.record_deletion(instance.user_id, 'stacks', instance.id)
+
+
+@receiver(post_delete, sender=UserBadge)
+def record_badge_tombstone(sender, instance, origin=None, **kwargs):
+    if _is_direct_delete(instance, origin):
+        SyncService.record_deletion(instance.user_id, 'badges', instance.id)
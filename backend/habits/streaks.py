@@ -0,0 +1,203 @@
+"""
+Streak engine for habits
+
+Single source of truth for streak numbers. Every other module (services,
+analytics, leaderboards, management commands) goes through these functions.
+
+Definitions:
+- ``last_completed`` is the most recent completed date (or None)
+- ``current_streak`` is the length of the run of consecutive completed days
+  ending at ``last_completed``
+- ``best_streak`` is the longest run ever reached (it never decreases)
+- the *live* streak is ``current_streak`` while the run is still alive, i.e.
+  ``last_completed`` is today or yesterday, and 0 once a day has been missed
+
+``record_completion``/``record_miss`` keep the stored fields up to date from
+the previous state and the single date that changed. ``batch_streaks``
+recomputes many habits at once from raw completed dates.
+
+Functions mutate the habit in memory; callers are responsible for saving it.
+"""
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+ONE_DAY = timedelta(days=1)
+
+# Initial window (in days) fetched when walking a run of completed dates.
+# The window doubles on every pass, so a run of length n costs O(log n) queries.
+RUN_WINDOW_DAYS = 32
+
+STREAK_FIELDS = ['current_streak', 'best_streak', 'last_completed']
+
+
+class StreakResult(NamedTuple):
+    current_streak: int
+    best_streak: int
+    last_completed: Optional[date]
+
+
+EMPTY_RESULT = StreakResult(0, 0, None)
+
+
+def live_streak(current_streak, last_completed, today=None):
+    """Return the streak as seen today: 0 once the run has been broken."""
+    if not current_streak or last_completed is None:
+        return 0
+    today = today or timezone.now().date()
+    return current_streak if (today - last_completed).days <= 1 else 0
+
+
+def live_streak_expression(today=None, prefix=''):
+    """SQL counterpart of `live_streak` for use in annotations and aggregates.
+
+    `prefix` is the lookup path to the habit, e.g. ``'habits__'`` from User.
+    """
+    today = today or timezone.now().date()
+    return Case(
+        When(**{
+            f'{prefix}last_completed__gte': today - ONE_DAY,
+            'then': F(f'{prefix}current_streak'),
+        }),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def batch_streaks(rows):
+    """Compute streaks for many habits in one pass over day ordinals.
+
+    ``rows`` is an iterable of ``(habit_id, date)`` pairs for completed entries,
+    in any order and possibly with duplicates. The pairs are turned into sorted
+    ``(habit_id, ordinal)`` keys and run lengths are measured on a single scan,
+    a new run starting wherever the habit changes or two ordinals are not
+    adjacent. Returns ``{habit_id: StreakResult}``; habits without rows are absent.
+    """
+    keys = sorted({(habit_id, day.toordinal()) for habit_id, day in rows})
+    results = {}
+    habit_id = previous = None
+    run = best = 0
+    for key, ordinal in keys:
+        if key != habit_id:
+            if habit_id is not None:
+                results[habit_id] = StreakResult(run, best, date.fromordinal(previous))
+            habit_id, run, best = key, 1, 1
+        elif ordinal - previous == 1:
+            run += 1
+            best = max(best, run)
+        else:
+            run = 1
+        previous = ordinal
+    if habit_id is not None:
+        results[habit_id] = StreakResult(run, best, date.fromordinal(previous))
+    return results
+
+
+def completed_dates(entries):
+    """Fetch ``(habit_id, date)`` pairs of completed entries in a single query."""
+    return entries.filter(completed=True).values_list('habit_id', 'date').iterator()
+
+
+def streaks_for_habits(habit_ids):
+    """Compute streaks for the given habits with one query, keyed by habit id."""
+    from habits.models import HabitEntry
+
+    results = batch_streaks(completed_dates(HabitEntry.objects.filter(habit_id__in=habit_ids)))
+    return {habit_id: results.get(habit_id, EMPTY_RESULT) for habit_id in habit_ids}
+
+
+def streaks_from_dates(dates):
+    """Compute a StreakResult for a single habit from its completed dates."""
+    return batch_streaks((0, day) for day in dates).get(0, EMPTY_RESULT)
+
+
+def recompute(habit):
+    """Full recompute from every completed entry. Used as the reference result."""
+    dates = habit.entries.filter(completed=True).values_list('date', flat=True)
+    current, best, last = streaks_from_dates(dates)
+    habit.current_streak = current
+    habit.best_streak = max(habit.best_streak or 0, best)
+    habit.last_completed = last
+
+
+def record_completion(habit, day):
+    """Update streak state after ``day`` became completed."""
+    last = habit.last_completed
+
+    if last is None or day > last:
+        # Extending or restarting the current run needs no query at all
+        if last is not None and day - last == ONE_DAY:
+            habit.current_streak = (habit.current_streak or 0) + 1
+        else:
+            habit.current_streak = 1
+        habit.last_completed = day
+    elif day < last:
+        # Backfill: the new day may join the runs on either side of it
+        before = _run_length(habit, day - ONE_DAY, -1)
+        after = _run_length(habit, day + ONE_DAY, 1)
+        run = before + 1 + after
+        if day + timedelta(days=after) == last:
+            habit.current_streak = run
+        habit.best_streak = max(habit.best_streak or 0, run)
+        return
+
+    habit.best_streak = max(habit.best_streak or 0, habit.current_streak)
+
+
+def record_miss(habit, day):
+    """Update streak state after ``day`` stopped being completed."""
+    last = habit.last_completed
+    current = habit.current_streak or 0
+    if last is None or day > last or current == 0:
+        return
+
+    run_start = last - timedelta(days=current - 1)
+    if day < run_start:
+        # Older runs do not affect the current streak, and best never decreases
+        return
+
+    if day < last:
+        # The current run is split; only the days after ``day`` remain
+        habit.current_streak = (last - day).days
+        return
+
+    if current > 1:
+        habit.last_completed = day - ONE_DAY
+        habit.current_streak = current - 1
+        return
+
+    previous = (
+        habit.entries.filter(completed=True, date__lt=day)
+        .order_by('-date')
+        .values_list('date', flat=True)
+        .first()
+    )
+    habit.last_completed = previous
+    habit.current_streak = _run_length(habit, previous, -1) if previous else 0
+
+
+def _run_length(habit, start, step):
+    """Count consecutive completed days from ``start`` walking ``step`` days at a time.
+
+    Only the dates of the run itself (plus one window of slack) are fetched.
+    """
+    count = 0
+    cursor = start
+    window = RUN_WINDOW_DAYS
+    while True:
+        far_end = cursor + timedelta(days=step * (window - 1))
+        low, high = min(cursor, far_end), max(cursor, far_end)
+        completed = set(
+            habit.entries.filter(completed=True, date__range=(low, high))
+            .values_list('date', flat=True)
+        )
+        found = 0
+        while cursor in completed:
+            found += 1
+            cursor += timedelta(days=step)
+        count += found
+        if found < window:
+            return count
+        window *= 2
@@ -15,6 +15,10 @@
   path('feed/', views.FeedView.as_view(), name='feed'),
   path('analytics/weekly/', views.WeeklyAnalyticsView.as_view(), name='weekly-analytics'),
   path('analytics/monthly/', views.MonthlyAnalyticsView.as_view(), name='monthly-analytics'),
+  path(
+    'analytics/timeseries/', views.TimeSeriesAnalyticsView.as_view(),
+    name='timeseries-analytics',
+  ),
   
   # Challenges
   path('challenges/', views.ChallengeViewSet.as_view({'get': 'list', 'post': 'create'}), name='challenge-list'),
@@ -9,11 +9,13 @@
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.utils.dateparse import parse_date
+from django.db.models import Count, Q, Sum
 from datetime import timedelta
-from users.models import Follow
 
-from habits.models import Habit, HabitEntry, HabitStack, Badge, UserBadge, PointsTransaction, Challenge, ChallengeParticipant, FeedItem, Comment, Reaction
+from core.utils.cache import cache_user_response, conditional_user_response
+from habits import streaks
+from habits.models import Habit, HabitEntry, HabitStack, Badge, UserBadge, PointsTransaction, Challenge, ChallengeParticipant, Comment, Reaction, DailyRollup
 from habits.serializers import (
     HabitSerializer,
     HabitCreateUpdateSerializer,
@@ -28,8 +30,25 @@
     FeedItemSerializer,
     CommentSerializer,
     ReactionSerializer,
+    SyncEntrySerializer,
 )
-from habits.services import HabitService, StreakService, AnalyticsService, BadgeService
+from forest.serializers import ForestLayoutSerializer, TreeStateSerializer
+from habits.services import (
+    HabitService, StreakService, AnalyticsService, BadgeService, FeedService, SyncService,
+)
+from users import leaderboard
+
+
+def parse_date_param(value):
+    """Parse an optional YYYY-MM-DD request value, defaulting to today.
+    Returns None when the value is present but invalid.
+    """
+    if not value:
+        return timezone.now().date()
+    try:
+        return parse_date(str(value))
+    except ValueError:
+        return None
 
 
 # ===================== HABITS =====================
@@ -50,6 +69,10 @@ class HabitViewSet(viewsets.ModelViewSet):
     - search_fields: title, description
     - ordering_fields: created_at, current_streak, title
 
+    Nested entries (list/retrieve):
+    - entries: none | recent (default, last HABIT_ENTRIES_RECENT_DAYS days) | all
+    - entries_since: YYYY-MM-DD, embeds entries on or after that date
+
     Responses:
     - 200 OK on reads and successful actions
     - 201 Created on new habit
@@ -63,8 +86,30 @@ class HabitViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        """Return habits filtered by current user"""
-        return Habit.objects.filter(user=self.request.user).prefetch_related('entries')
+        """Return habits filtered by current user; reads are annotated with entry counts"""
+        queryset = Habit.objects.filter(user=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.annotate(
+                total_entries_count=Count('entries'),
+                completed_entries_count=Count('entries', filter=Q(entries__completed=True)),
+            )
+            # Only embed the requested window of entries (see get_entries_window)
+            include_entries, since = self.entries_window
+            if include_entries:
+                queryset = queryset.prefetch_related(HabitService.get_entries_prefetch(since))
+        return queryset
+    
+    @property
+    def entries_window(self):
+        if not hasattr(self, '_entries_window'):
+            self._entries_window = HabitService.get_entries_window(self.request.query_params)
+        return self._entries_window
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['include_entries'] = self.entries_window[0]
+        return context
     
     def get_serializer_class(self):
         """Use different serializers for different actions"""
@@ -72,6 +117,11 @@ def get_serializer_class(self):
             return HabitCreateUpdateSerializer
         return HabitSerializer
     
+    @conditional_user_response('habits')
+    def list(self, request, *args, **kwargs):
+        """List habits; unchanged lists are answered with 304 Not Modified"""
+        return super().list(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         """Automatically assign habit to current user"""
         serializer.save(user=self.request.user)
@@ -107,7 +157,12 @@ def mark_incomplete(self, request, pk=None):
         POST /api/v1/habits/{id}/mark_incomplete/
         """
         habit = self.get_object()
-        date = request.data.get('date', timezone.now().date())
+        date = parse_date_param(request.data.get('date'))
+        if date is None:
+            return Response(
+                {'error': 'date must be a valid YYYY-MM-DD date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
             entry = HabitService.mark_incomplete(habit, date)
@@ -152,27 +207,22 @@ def analytics(self, request, pk=None):
         """
         habit = self.get_object()
         
-        entries = habit.entries.all()
-        completed = entries.filter(completed=True).count()
-        total = entries.count()
-        
         # Streak data
         current_streak = StreakService.calculate_streak(habit)
         
-        # Weekly and monthly data
+        # Totals, weekly and monthly data in one aggregate over the daily rollups
         now = timezone.now().date()
         week_ago = now - timedelta(days=7)
         month_ago = now - timedelta(days=30)
         
-        week_completed = entries.filter(
-            completed=True,
-            date__gte=week_ago
-        ).count()
-        
-        month_completed = entries.filter(
-            completed=True,
-            date__gte=month_ago
-        ).count()
+        totals = DailyRollup.objects.filter(habit=habit).aggregate(
+            completions=Sum('completed'),
+            entries=Sum('total'),
+            week_completions=Sum('completed', filter=Q(date__gte=week_ago)),
+            month_completions=Sum('completed', filter=Q(date__gte=month_ago)),
+        )
+        completed = totals['completions'] or 0
+        total = totals['entries'] or 0
         
         return Response({
             'habit_id': habit.id,
@@ -182,37 +232,45 @@ def analytics(self, request, pk=None):
             'best_streak': habit.best_streak,
             'total_completions': completed,
             'total_entries': total,
-            'week_completions': week_completed,
-            'month_completions': month_completed,
+            'week_completions': totals['week_completions'] or 0,
+            'month_completions': totals['month_completions'] or 0,
         })
     
     @action(detail=False, methods=['get'])
+    @conditional_user_response('habits')
+    @cache_user_response('habits')
     def today(self, request):
         """
-        Get today's habits with completion status.
+        Get the active habits with completion status for a day (today by default).
 
-        GET /api/v1/habits/today/
+        GET /api/v1/habits/today/?date=YYYY-MM-DD
         Response: simplified list with completion flags for quick rendering
         """
-        today = timezone.now().date()
-        habits = self.get_queryset().filter(is_active=True)
+        date = parse_date_param(request.query_params.get('date'))
+        if date is None:
+            return Response(
+                {'error': 'date must be a valid YYYY-MM-DD date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         result = []
-        for habit in habits:
-            entry = habit.entries.filter(date=today).first()
+        for item in HabitService.get_habits_for_date(request.user, date):
+            habit = item['habit']
             result.append({
                 'id': habit.id,
                 'public_id': habit.public_id,
                 'title': habit.title,
                 'category': habit.category,
                 'color_code': habit.color_code,
-                'current_streak': habit.current_streak,
-                'completed_today': entry.completed if entry else False,
+                'current_streak': streaks.live_streak(habit.current_streak, habit.last_completed),
+                'completed_today': item['completed'],
             })
         
         return Response(result)
     
     @action(detail=False, methods=['get'])
+    @conditional_user_response('habits')
+    @cache_user_response('habits')
     def statistics(self, request):
         """
         Get user-wide habit statistics.
@@ -233,6 +291,7 @@ class HabitEntryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filterset_fields = ['date', 'completed']
     ordering = ['-date']
+    BULK_MAX_ENTRIES = 1000
     
     def get_queryset(self):
         """Return entries only for user's habits"""
@@ -243,38 +302,34 @@ def get_queryset(self):
     @action(detail=False, methods=['post'])
     def bulk_create(self, request):
         """
-        Bulk create multiple habit entries.
+        Bulk create or update habit entries (offline sync).
         
-        POST /api/v1/habit-entries/bulk_create/
+        POST /api/v1/habits/entries/bulk_create/
         {
             "entries": [
                 {"habit_id": 1, "date": "2025-11-01", "completed": true},
                 {"habit_id": 2, "date": "2025-11-01", "completed": false}
             ]
         }
+        Response: {"results": [{"index", "habit_id", "date", "status", "entry_id"}, ...]}
+        with status one of created, updated, unchanged, duplicate, not_found, invalid
         """
         entries_data = request.data.get('entries', [])
-        created_entries = []
-        
-        for entry_data in entries_data:
-            try:
-                habit_id = entry_data.get('habit_id')
-                habit = Habit.objects.get(id=habit_id, user=request.user)
-                
-                entry = HabitEntry.objects.get_or_create(
-                    habit=habit,
-                    date=entry_data.get('date'),
-                    defaults={
-                        'completed': entry_data.get('completed', True),
-                        'note': entry_data.get('note', '')
-                    }
-                )[0]
-                
-                created_entries.append(HabitEntrySerializer(entry).data)
-            except Habit.DoesNotExist:
-                continue
+        if not isinstance(entries_data, list) or not all(
+            isinstance(row, dict) for row in entries_data
+        ):
+            return Response(
+                {'error': 'entries must be a list of objects'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(entries_data) > self.BULK_MAX_ENTRIES:
+            return Response(
+                {'error': f'At most {self.BULK_MAX_ENTRIES} entries per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response(created_entries, status=status.HTTP_201_CREATED)
+        results = HabitService.bulk_upsert_entries(request.user, entries_data)
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
 
 # ===================== STACKS =====================
@@ -317,20 +372,44 @@ def perform_create(self, serializer):
     @action(detail=True, methods=['post'])
     def join(self, request, pk=None):
         challenge = self.get_object()
-        ChallengeParticipant.objects.get_or_create(challenge=challenge, user=request.user)
+        _, created = ChallengeParticipant.objects.get_or_create(
+            challenge=challenge, user=request.user
+        )
+        if created:
+            leaderboard.join_challenge(challenge, request.user.id)
         return Response({'message': 'Joined challenge'})
 
 
 # ===================== SOCIAL FEED =====================
 class FeedView(views.APIView):
+    """
+    Own and followed users' feed items, newest first.
+
+    GET /api/v1/habits/feed/?page_size=20&cursor=<next_cursor>
+    Keyset pagination on (created_at, id): each page costs the same number of
+    queries however deep the client scrolls.
+    Response: {"results": [...], "next_cursor": "..." or null}
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Get followed users and self
-        followed_ids = list(Follow.objects.filter(follower=request.user).values_list('following_id', flat=True))
-        user_ids = followed_ids + [request.user.id]
-        items = FeedItem.objects.filter(user_id__in=user_ids).select_related('habit', 'badge', 'challenge').order_by('-created_at')[:200]
-        return Response(FeedItemSerializer(items, many=True).data)
+        try:
+            page_size = int(request.query_params.get('page_size', FeedService.PAGE_SIZE))
+        except ValueError:
+            page_size = 0
+        if not 1 <= page_size <= FeedService.MAX_PAGE_SIZE:
+            return Response(
+                {'error': f'page_size must be between 1 and {FeedService.MAX_PAGE_SIZE}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        items, next_cursor = FeedService.get_feed_page(
+            request.user, page_size, request.query_params.get('cursor')
+        )
+        return Response({
+            'results': FeedItemSerializer(items, many=True).data,
+            'next_cursor': next_cursor,
+        })
 
 
 # ===================== ANALYTICS =====================
@@ -347,4 +426,87 @@ class MonthlyAnalyticsView(views.APIView):
 
     def get(self, request):
         data = AnalyticsService.get_monthly_data(request.user)
-        return Response({'range': 'monthly', 'data': data})
\ No newline at end of file
+        return Response({'range': 'monthly', 'data': data})
+
+
+class TimeSeriesAnalyticsView(views.APIView):
+    """
+    Completions per bucket over an arbitrary date range.
+
+    GET /api/v1/habits/analytics/timeseries/?from=2025-01-01&to=2025-12-31&bucket=day|week|month
+    Defaults: the last 30 days, bucketed by day. Ranges are limited to MAX_RANGE_DAYS.
+    """
+    permission_classes = [IsAuthenticated]
+    DEFAULT_RANGE_DAYS = 30
+    MAX_RANGE_DAYS = 3 * 366
+
+    def get(self, request):
+        end = parse_date_param(request.query_params.get('to'))
+        if end is None:
+            return Response(
+                {'error': 'to must be a valid YYYY-MM-DD date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start_param = request.query_params.get('from')
+        if start_param:
+            start = parse_date_param(start_param)
+        else:
+            start = end - timedelta(days=self.DEFAULT_RANGE_DAYS - 1)
+        if start is None:
+            return Response(
+                {'error': 'from must be a valid YYYY-MM-DD date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {'error': 'from must not be after to'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if (end - start).days + 1 > self.MAX_RANGE_DAYS:
+            return Response(
+                {'error': f'Range is limited to {self.MAX_RANGE_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in AnalyticsService.SERIES_BUCKETS:
+            return Response(
+                {'error': f"bucket must be one of: {', '.join(AnalyticsService.SERIES_BUCKETS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = AnalyticsService.get_completion_series(request.user, start, end, bucket)
+        return Response({'from': start, 'to': end, 'bucket': bucket, 'data': data})
+
+
+# ===================== SYNC =====================
+class SyncView(views.APIView):
+    """
+    Delta sync for offline-first clients.
+
+    GET /api/v1/sync/?since=<cursor>
+    Response: habits, entries, stacks, badges and forest state changed since the
+    cursor, ids deleted since then, and the `cursor` to send next time. Without
+    a cursor (or with one older than the tombstone retention) `full` is true and
+    the response is a complete snapshot that replaces the client's state.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        cursor = SyncService.decode_cursor(since) if since else None
+        changes = SyncService.get_changes(request.user, cursor)
+        layout = changes['forest_layout']
+        return Response({
+            'cursor': changes['cursor'],
+            'full': changes['full'],
+            'habits': HabitSerializer(
+                changes['habits'], many=True, context={'include_entries': False}
+            ).data,
+            'entries': SyncEntrySerializer(changes['entries'], many=True).data,
+            'stacks': HabitStackSerializer(changes['stacks'], many=True).data,
+            'badges': UserBadgeSerializer(changes['badges'], many=True).data,
+            'forest': {
+                'layout': ForestLayoutSerializer(layout).data if layout else None,
+                'tree_positions': TreeStateSerializer(changes['tree_positions'], many=True).data,
+            },
+            'deleted': changes['deleted'],
+        })
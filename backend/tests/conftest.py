@@ -1,3 +1,64 @@
 """
 Fixtures and utilities for testing
 """
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from habits.models import Habit
+from users import leaderboard
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def leaderboard_backend(monkeypatch):
+    """Give every test its own empty in-memory leaderboard"""
+    backend = leaderboard.MemoryBackend()
+    monkeypatch.setattr(leaderboard, '_backend', backend)
+    return backend
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Keep cached values from leaking between tests"""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def api_client():
+    """Create API client"""
+    return APIClient()
+
+
+@pytest.fixture
+def user(db):
+    """Create test user"""
+    return User.objects.create_user(
+        username='testuser',
+        email='test@example.com',
+        password='testpass123'
+    )
+
+
+@pytest.fixture
+def authenticated_client(api_client, user):
+    """Create authenticated API client"""
+    api_client.force_authenticate(user=user)
+    return api_client
+
+
+@pytest.fixture
+def habit(db, user):
+    """Create test habit"""
+    return Habit.objects.create(
+        user=user,
+        title='Running',
+        description='Morning run',
+        category='fitness',
+        frequency='daily',
+        color_code='#FF0000'
+    )
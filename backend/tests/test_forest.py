@@ -0,0 +1,527 @@
+"""
+Tests for the forest app
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+
+from forest import achievements
+from forest.models import (
+    DailyChallenge, ForestAchievement, ForestAction, ForestActionCounter, ForestCreature,
+    ForestLayout, TreePosition, UserForestAchievement, WeatherEvent,
+)
+from forest.services import ForestTickService, WeatherService
+from habits.models import Habit, HabitEntry
+from habits.services import HabitService
+
+OVERVIEW_URL = '/api/v1/forest/overview/'
+
+
+def _plant(user, count):
+    """Create `count` habits with trees, completions, creatures and actions"""
+    start = Habit.objects.filter(user=user).count()
+    for i in range(start, start + count):
+        habit = Habit.objects.create(user=user, title=f'Tree habit {i}')
+        HabitService.mark_complete(habit)
+        tree = TreePosition.objects.create(user=user, habit=habit, x=i * 10, y=50)
+        ForestCreature.objects.create(user=user, creature_type='bird', tree_position=tree)
+        ForestAction.objects.create(user=user, action_type='water', habit=habit, tree_position=tree)
+
+
+class TestForestOverview:
+    """Test the forest overview assembly"""
+
+    # layout (joined with its weather), trees, decorations, creatures, actions,
+    # achievements and up to two for the daily challenge (the user's progress,
+    # else the challenge)
+    QUERY_BUDGET = 8
+
+    def _overview_queries(self, client, **params):
+        client.get(OVERVIEW_URL, params)  # first visit creates the layout and joins the challenge
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(OVERVIEW_URL, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response, len(queries)
+
+    def test_query_count_is_fixed_regardless_of_tree_count(self, authenticated_client, user):
+        DailyChallenge.objects.create(
+            date=timezone.now().date(), challenge_type='water_trees',
+            title='Water three trees', description='', target_value=3,
+        )
+        _plant(user, 1)
+        _, few = self._overview_queries(authenticated_client)
+
+        _plant(user, 9)
+        response, many = self._overview_queries(authenticated_client)
+
+        assert few == many == self.QUERY_BUDGET - 1
+        assert len(response.data['tree_positions']) == 10
+        assert response.data['daily_challenge']['challenge']['title'] == 'Water three trees'
+
+    def test_trees_embed_habit_projection(self, authenticated_client, user):
+        _plant(user, 1)
+
+        tree = authenticated_client.get(OVERVIEW_URL).data['tree_positions'][0]
+
+        assert tree['habit']['title'] == 'Tree habit 0'
+        assert tree['habit']['current_streak'] == 1
+        assert 'entries' not in tree['habit']
+        assert 'completion_rate' not in tree['habit']
+
+    def test_entries_are_embedded_on_request(self, authenticated_client, user):
+        _plant(user, 2)
+
+        response, queries = self._overview_queries(authenticated_client, entries='recent')
+
+        assert queries == self.QUERY_BUDGET + 1  # plus the entries prefetch
+        assert all(len(tree['habit']['entries']) == 1 for tree in response.data['tree_positions'])
+
+
+class TestCareActions:
+    """Test single and batched tree care actions"""
+
+    BATCH_URL = '/api/v1/forest/actions/batch/'
+
+    def test_water_creates_tree_and_completes_habit(self, authenticated_client, user, habit):
+        response = authenticated_client.post(
+            '/api/v1/forest/water/', {'habit_id': habit.id, 'water_type': 'heavy'}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['points_earned'] == 15
+        assert TreePosition.objects.get(habit=habit).last_watered is not None
+        assert HabitEntry.objects.get(habit=habit).completed
+        habit.refresh_from_db()
+        assert habit.current_streak == 1
+
+    def test_prune_cooldown(self, authenticated_client, user, habit):
+        TreePosition.objects.create(
+            user=user, habit=habit, x=1, y=1, last_pruned=timezone.now() - timedelta(days=2)
+        )
+
+        response = authenticated_client.post('/api/v1/forest/prune/', {'habit_id': habit.id})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['error'] == 'Tree can be pruned again in 5 days'
+
+    def test_missing_tree_is_not_found(self, authenticated_client, habit):
+        response = authenticated_client.post('/api/v1/forest/fertilize/', {'habit_id': habit.id})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_batch_applies_mixed_actions(self, authenticated_client, user, habit):
+        other = Habit.objects.create(user=user, title='Reading')
+        TreePosition.objects.create(user=user, habit=other, x=1, y=1)
+
+        response = authenticated_client.post(self.BATCH_URL, {'actions': [
+            {'type': 'water', 'habit_id': habit.id},
+            {'type': 'prune', 'habit_id': other.id},
+            {'type': 'prune', 'habit_id': other.id},
+            {'type': 'fertilize', 'habit_id': other.id},
+            {'type': 'fertilize', 'habit_id': 0},
+            {'type': 'dance', 'habit_id': habit.id},
+        ]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        statuses = [row['status'] for row in response.data['results']]
+        assert statuses == ['applied', 'applied', 'cooldown', 'applied', 'not_found', 'invalid']
+        assert response.data['points_earned'] == 10 + 25 + 50
+
+        layout = ForestLayout.objects.get(user=user)
+        totals = (layout.total_waterings, layout.total_prunings, layout.total_fertilizations)
+        assert totals == (1, 1, 1)
+        assert layout.total_points == 85
+        care_types = ['water', 'prune', 'fertilize']
+        assert ForestAction.objects.filter(user=user, action_type__in=care_types).count() == 3
+        tree = TreePosition.objects.get(habit=other)
+        assert tree.health_bonus == 0.2
+        assert tree.size_multiplier == 1.3
+
+    def test_batch_query_count_is_constant(self, authenticated_client, user):
+        habits = [Habit.objects.create(user=user, title=f'Habit {i}') for i in range(10)]
+        for habit in habits[:5]:
+            TreePosition.objects.create(user=user, habit=habit, x=1, y=1)
+
+        def batch(count):
+            actions = [{'type': 'water', 'habit_id': h.id} for h in habits[:count]]
+            actions += [{'type': 'prune', 'habit_id': h.id} for h in habits[:min(count, 5)]]
+            with CaptureQueriesContext(connection) as queries:
+                response = authenticated_client.post(
+                    self.BATCH_URL, {'actions': actions}, format='json'
+                )
+            assert {row['status'] for row in response.data['results']} == {'applied'}
+            return len(queries)
+
+        few = batch(1)
+        TreePosition.objects.update(last_pruned=None)
+        HabitEntry.objects.all().delete()
+        assert batch(10) <= few + 1  # plus the insert of the new trees
+
+    def test_batch_rejects_oversized_and_malformed_input(self, authenticated_client):
+        too_many = [{'type': 'water', 'habit_id': 1}] * 101
+        for actions in (too_many, 'water'):
+            response = authenticated_client.post(
+                self.BATCH_URL, {'actions': actions}, format='json'
+            )
+            assert response.status_code == 400
+
+    @pytest.mark.parametrize('water_type', [['heavy'], {'kind': 'heavy'}, 'flood'])
+    def test_malformed_water_type_is_invalid(self, authenticated_client, habit, water_type):
+        actions = [
+            {'type': 'water', 'habit_id': habit.id, 'water_type': water_type},
+            {'type': 'water', 'habit_id': habit.id},
+        ]
+        response = authenticated_client.post(self.BATCH_URL, {'actions': actions}, format='json')
+        assert [row['status'] for row in response.data['results']] == ['invalid', 'applied']
+
+        response = authenticated_client.post(
+            '/api/v1/forest/water/', {'habit_id': habit.id, 'water_type': water_type},
+            format='json',
+        )
+        assert response.status_code == 400
+
+    def test_watering_joins_runs_around_a_future_entry(self, authenticated_client, habit):
+        today = timezone.now().date()
+        HabitService.mark_complete(habit, date=today - timedelta(days=1))
+        HabitService.mark_complete(habit, date=today + timedelta(days=1))
+
+        authenticated_client.post('/api/v1/forest/water/', {'habit_id': habit.id})
+
+        habit.refresh_from_db()
+        assert (habit.current_streak, habit.last_completed) == (3, today + timedelta(days=1))
+
+
+class TestWeather:
+    """Test the weather state stored on the forest layout"""
+
+    WEATHER_URL = '/api/v1/forest/weather/'
+
+    def test_change_weather_stores_active_event_on_layout(self, authenticated_client, user):
+        authenticated_client.post(self.WEATHER_URL, {'weather_type': 'stormy'})
+        response = authenticated_client.post(
+            self.WEATHER_URL, {'weather_type': 'rainy', 'duration_hours': 3}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        layout = ForestLayout.objects.get(user=user)
+        assert layout.weather_state == 'rainy'
+        assert layout.weather_event_id == response.data['weather']['id']
+        assert layout.weather_expires_at == layout.weather_event.ends_at
+        active = WeatherEvent.objects.filter(user=user, is_active=True)
+        assert list(active) == [layout.weather_event]
+
+    def test_invalid_weather_is_rejected(self, authenticated_client):
+        response = authenticated_client.post(self.WEATHER_URL, {'weather_type': 'lava'})
+        assert response.status_code == 400
+        response = authenticated_client.post(
+            self.WEATHER_URL, {'weather_type': 'rainy', 'duration_hours': 0}
+        )
+        assert response.status_code == 400
+
+    def test_care_actions_read_weather_from_layout(self, authenticated_client, user, habit):
+        WeatherService.start(user, 'rainy', 6)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.post('/api/v1/forest/water/', {'habit_id': habit.id})
+
+        assert response.data['points_earned'] == 12
+        assert not any(
+            'FROM "forest_weather"' in query['sql'] for query in queries.captured_queries
+        )
+
+    def test_expired_weather_resolves_lazily_on_read(self, authenticated_client, user, habit):
+        WeatherService.start(user, 'rainy', 6)
+        ForestLayout.objects.filter(user=user).update(
+            weather_expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        response = authenticated_client.get(OVERVIEW_URL)
+        assert response.data['current_weather'] is None
+        assert response.data['layout']['weather_state'] == 'sunny'
+
+        water = authenticated_client.post('/api/v1/forest/water/', {'habit_id': habit.id})
+        assert water.data['points_earned'] == 10
+        # Reads leave the cleanup to the archive job
+        assert WeatherEvent.objects.get(user=user).is_active
+
+    def test_archive_expires_and_deletes_old_events(self, user):
+        now = timezone.now()
+        current = WeatherService.start(user, 'rainy', 6)
+        old = WeatherEvent.objects.create(user=user, weather_type='stormy', is_active=False)
+        WeatherEvent.objects.filter(pk=old.pk).update(start_time=now - timedelta(days=60))
+
+        call_command('archive_weather_events')
+        assert WeatherEvent.objects.filter(pk=old.pk).exists() is False
+        assert WeatherEvent.objects.get(pk=current.pk).is_active
+
+        expired, deleted = WeatherService.archive(now=now + timedelta(hours=7))
+        assert (expired, deleted) == (1, 0)
+        layout = ForestLayout.objects.get(user=user)
+        weather = (layout.weather_event, layout.weather_expires_at, layout.weather_state)
+        assert weather == (None, None, 'sunny')
+
+
+class TestForestTick:
+    """Test the scheduled forest simulation"""
+
+    def _tree(self, user, title, streak=0, completed_days_ago=None, **fields):
+        today = timezone.now().date()
+        habit = Habit.objects.create(
+            user=user, title=title, current_streak=streak,
+            last_completed=(
+                None if completed_days_ago is None else today - timedelta(days=completed_days_ago)
+            ),
+        )
+        return TreePosition.objects.create(user=user, habit=habit, x=1, y=1, **fields)
+
+    def test_trees_grow_from_live_streaks_and_health(self, user):
+        young = self._tree(user, 'Young', streak=10, completed_days_ago=0)
+        mature = self._tree(user, 'Mature', streak=25, completed_days_ago=1, health_bonus=0.5)
+        ancient = self._tree(user, 'Ancient', health_bonus=10, last_watered=timezone.now())
+        broken = self._tree(user, 'Broken', streak=200, completed_days_ago=3)
+        kept = self._tree(user, 'Kept', growth_stage='ancient')
+
+        changes = ForestTickService.tick(batch_size=2)
+
+        stages = dict(TreePosition.objects.values_list('id', 'growth_stage'))
+        assert stages == {
+            young.id: 'young', mature.id: 'mature', ancient.id: 'ancient',
+            broken.id: 'sapling', kept.id: 'ancient',
+        }
+        assert changes['grown'] == 3
+        assert ForestTickService.tick()['grown'] == 0
+
+    def test_neglected_trees_fall_ill_and_recover_with_care(self, user):
+        neglected = self._tree(user, 'Neglected', streak=50, completed_days_ago=10)
+        tended = self._tree(user, 'Tended', completed_days_ago=2)
+        TreePosition.objects.update(created_at=timezone.now() - timedelta(days=30))
+
+        ForestTickService.tick()
+        neglected.refresh_from_db()
+        assert neglected.is_diseased and neglected.growth_stage == 'sapling'
+        assert not TreePosition.objects.get(pk=tended.pk).is_diseased
+
+        TreePosition.objects.filter(pk=neglected.pk).update(last_watered=timezone.now())
+        assert ForestTickService.tick()['cured'] == 1
+        neglected.refresh_from_db()
+        assert not neglected.is_diseased
+        assert neglected.disease_cure_date is not None
+
+    def test_layouts_follow_season_night_and_auto_weather(self, user, admin_user):
+        ForestLayout.objects.create(user=user, current_season='winter')
+        ForestLayout.objects.create(
+            user=admin_user, auto_weather=False, day_night_cycle=False, is_night=True
+        )
+        july_night = datetime(2026, 7, 1, 23, 0, tzinfo=dt_timezone.utc)
+
+        changes = ForestTickService.tick(now=july_night)
+
+        layout = ForestLayout.objects.get(user=user)
+        assert (layout.current_season, layout.is_night) == ('summer', True)
+        assert layout.weather_event.user == user
+        assert layout.weather_state == layout.weather_event.weather_type
+        assert layout.weather_expires_at == july_night + timedelta(
+            hours=ForestTickService.AUTO_WEATHER_HOURS
+        )
+        manual = ForestLayout.objects.get(user=admin_user)
+        assert (manual.weather_event, manual.is_night) == (None, False)
+        assert changes['auto_weather'] == 1
+
+        # The running event is kept until it ends
+        assert ForestTickService.tick(now=july_night + timedelta(hours=1))['auto_weather'] == 0
+        later = ForestTickService.tick(now=july_night + timedelta(hours=7))
+        assert (later['weather_expired'], later['auto_weather']) == (1, 1)
+        assert WeatherEvent.objects.filter(user=user, is_active=True).count() == 1
+
+    def test_creatures_leave_after_their_visit(self, user, habit):
+        tree = TreePosition.objects.create(user=user, habit=habit, x=1, y=1)
+        gone = ForestCreature.objects.create(user=user, creature_type='bird', tree_position=tree)
+        ForestCreature.objects.filter(pk=gone.pk).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        staying = ForestCreature.objects.create(user=user, creature_type='deer', tree_position=tree)
+
+        call_command('forest_tick', batch_size=1)
+
+        assert not ForestCreature.objects.get(pk=gone.pk).is_active
+        assert ForestCreature.objects.get(pk=staying.pk).is_active
+
+
+class TestCreatureSweep:
+    """Test creature visit expiry and retention"""
+
+    def test_overview_only_shows_creatures_still_visiting(self, authenticated_client, user, habit):
+        tree = TreePosition.objects.create(user=user, habit=habit, x=1, y=1)
+        visiting = ForestCreature.objects.create(
+            user=user, creature_type='bird', tree_position=tree
+        )
+        left = ForestCreature.objects.create(user=user, creature_type='owl', tree_position=tree)
+        ForestCreature.objects.filter(pk=left.pk).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        response = authenticated_client.get(OVERVIEW_URL)
+
+        assert [creature['id'] for creature in response.data['active_creatures']] == [visiting.id]
+        assert visiting.expires_at > visiting.visit_start
+
+    def test_sweep_expires_and_deletes_old_visits(self, user, habit):
+        tree = TreePosition.objects.create(user=user, habit=habit, x=1, y=1)
+        now = timezone.now()
+        for days_ago in (0, 2, 30, 40):
+            creature = ForestCreature.objects.create(
+                user=user, creature_type='bee', tree_position=tree
+            )
+            ForestCreature.objects.filter(pk=creature.pk).update(
+                expires_at=now - timedelta(days=days_ago, minutes=1), is_active=days_ago < 30,
+            )
+        visiting = ForestCreature.objects.create(
+            user=user, creature_type='deer', tree_position=tree
+        )
+
+        call_command('sweep_creatures', batch_size=2)
+
+        assert ForestCreature.objects.count() == 3
+        assert list(ForestCreature.objects.filter(is_active=True)) == [visiting]
+
+
+class TestForestAchievements:
+    """Test counter-driven forest achievements"""
+
+    @pytest.fixture(autouse=True)
+    def seed_achievements(self, db):
+        call_command('create_forest_achievements')
+
+    def _earned(self, user):
+        earned = UserForestAchievement.objects.filter(user=user)
+        return dict(earned.values_list('achievement__code', 'progress'))
+
+    def test_first_watering_plants_a_tree_and_awards_it(self, authenticated_client, user, habit):
+        authenticated_client.post('/api/v1/forest/water/', {'habit_id': habit.id})
+        authenticated_client.post('/api/v1/forest/water/', {'habit_id': habit.id})
+
+        assert self._earned(user) == {'first_tree': {'plant': 1}}
+        layout = ForestLayout.objects.get(user=user)
+        assert layout.trees_planted == 1
+        assert layout.total_points == 10 + 10 + 50
+        assert ForestAction.objects.filter(user=user, action_type='achievement').count() == 1
+
+    def test_water_streak_counts_consecutive_days(self, authenticated_client, user, habit):
+        ForestActionCounter.objects.create(
+            user=user, key='water_streak', value=6,
+            last_date=timezone.localdate() - timedelta(days=1),
+        )
+        authenticated_client.post('/api/v1/forest/water/', {'habit_id': habit.id})
+        authenticated_client.post('/api/v1/forest/water/', {'habit_id': habit.id})
+
+        assert ForestActionCounter.objects.get(user=user, key='water_streak').value == 7
+        assert self._earned(user)['water_streak_7'] == {'water_streak': 7}
+
+        # A missed day restarts the streak
+        achievements.record_actions(
+            user.id, [ForestAction(user=user, action_type='water')],
+            today=timezone.localdate() + timedelta(days=2),
+        )
+        assert ForestActionCounter.objects.get(user=user, key='water_streak').value == 1
+
+    def test_distinct_counters_ignore_repeats(self, user):
+        for weather_type in ['rainy', 'rainy', 'stormy', 'sunny']:
+            WeatherService.start(user, weather_type)
+        assert ForestActionCounter.objects.get(user=user, key='weather_types').value == 3
+
+        WeatherService.start(user, 'drought')
+        assert self._earned(user)['weather_master'] == {'weather_types': 4}
+        counters = dict(ForestActionCounter.objects.filter(user=user).values_list('key', 'value'))
+        assert counters['spring_days'] == 1
+
+    def test_moving_a_tree_is_counted(self, authenticated_client, user, habit, admin_user):
+        TreePosition.objects.create(user=user, habit=habit, x=1, y=1)
+
+        response = authenticated_client.post(
+            '/api/v1/forest/move/', {'habit_id': habit.id, 'x': 4, 'y': 2}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        move = ForestAction.objects.get(user=user, action_type='move')
+        assert move.season_at_time == 'spring'
+        assert move.metadata['new_position'] == {'x': 4, 'y': 2}
+        assert ForestActionCounter.objects.get(user=user, key='spring_days').value == 1
+
+        authenticated_client.force_authenticate(admin_user)
+        response = authenticated_client.post(
+            '/api/v1/forest/move/', {'habit_id': habit.id, 'x': 0, 'y': 0}, format='json'
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert TreePosition.objects.get(habit=habit).x == 4
+
+    def test_only_affected_achievements_are_evaluated(self, user):
+        achievements.achievement_index()
+
+        with CaptureQueriesContext(connection) as queries:
+            assert achievements.record_counts(user.id, {'unknown_key': 3}) == []
+        assert len(queries) == 2  # counter insert and increment, no achievement reads
+
+        with CaptureQueriesContext(connection) as queries:
+            awarded = achievements.record_counts(user.id, {'fertilize_count': 5})
+            assert awarded == ['fertilizer_expert']
+        assert not any('forest_achievement"' in query['sql'] for query in queries.captured_queries)
+
+    def test_index_follows_achievement_changes(self, user):
+        assert 'moves' not in achievements.achievement_index()
+        ForestAchievement.objects.create(
+            code='mover', achievement_type='decorator', name='Mover', description='', icon='',
+            required_actions={'moves': 1},
+        )
+        assert [a['code'] for a in achievements.achievement_index()['moves']] == ['mover']
+
+    def test_tick_feeds_ancient_trees(self, user, habit):
+        TreePosition.objects.create(
+            user=user, habit=habit, x=1, y=1, health_bonus=10, last_watered=timezone.now()
+        )
+
+        ForestTickService.tick()
+
+        assert self._earned(user) == {'ancient_tree': {'ancient_trees': 1}}
+
+    def test_rebuild_derives_counters_from_history(self, user):
+        now = timezone.now()
+        for days_ago in [5, 2, 1, 1, 0]:
+            action = ForestAction.objects.create(
+                user=user, action_type='water', season_at_time='spring'
+            )
+            ForestAction.objects.filter(pk=action.pk).update(
+                timestamp=now - timedelta(days=days_ago)
+            )
+        for weather_type in ['rainy', 'rainy', 'sunny']:
+            ForestAction.objects.create(
+                user=user, action_type='weather_change', metadata={'new_weather': weather_type}
+            )
+        for _ in range(5):
+            ForestAction.objects.create(user=user, action_type='fertilize')
+
+        call_command('rebuild_forest_counters')
+
+        today = timezone.localdate()
+        counters = {
+            counter.key: (counter.value, counter.last_date)
+            for counter in ForestActionCounter.objects.filter(user=user)
+        }
+        assert counters == {
+            'water_streak': (3, today),
+            'spring_days': (4, today),
+            'weather_types': (2, None),
+            'fertilize_count': (5, None),
+        }
+        assert self._earned(user) == {'fertilizer_expert': {'fertilize_count': 5}}
+
+    def test_seeding_achievements_drops_a_stale_index(self):
+        cache.set(achievements.INDEX_CACHE_KEY, {})
+        call_command('create_forest_achievements')
+        assert 'plant' in achievements.achievement_index()
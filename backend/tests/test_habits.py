@@ -5,51 +5,16 @@
 """
 import pytest
 from datetime import timedelta
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
-from django.contrib.auth import get_user_model
-from rest_framework.test import APIClient
 from rest_framework import status
 
-from habits.models import Habit, HabitEntry
-from habits.services import HabitService
-
-User = get_user_model()
-
-
-@pytest.fixture
-def api_client():
-    """Create API client"""
-    return APIClient()
-
-
-@pytest.fixture
-def user(db):
-    """Create test user"""
-    return User.objects.create_user(
-        username='testuser',
-        email='test@example.com',
-        password='testpass123'
-    )
-
-
-@pytest.fixture
-def authenticated_client(api_client, user):
-    """Create authenticated API client"""
-    api_client.force_authenticate(user=user)
-    return api_client
-
-
-@pytest.fixture
-def habit(db, user):
-    """Create test habit"""
-    return Habit.objects.create(
-        user=user,
-        title='Running',
-        description='Morning run',
-        category='fitness',
-        frequency='daily',
-        color_code='#FF0000'
-    )
+from core.utils import cache as cache_utils
+from habits.models import Comment, DailyRollup, FeedInbox, FeedItem, Habit, HabitEntry, Reaction
+from habits.services import FeedService, HabitService, SyncService
+from users.models import Follow, User
 
 
 class TestHabitCreation:
@@ -100,6 +65,40 @@ def test_mark_habit_complete(self, authenticated_client, habit):
             completed=True
         ).exists()
     
+    def test_completion_awards_points_once(
+        self, db, user, habit, django_capture_on_commit_callbacks
+    ):
+        """Repeated completion of the same day awards points and feed items once"""
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_complete(habit)
+            HabitService.mark_complete(habit)
+
+        user.profile.refresh_from_db()
+        assert user.profile.total_points == 10
+        assert user.profile.total_completions == 1
+        assert user.profile.current_streak == 1
+        assert FeedItem.objects.filter(user=user, habit=habit).count() == 1
+
+    def test_fan_out_waits_for_commit(self, db, user, habit, django_capture_on_commit_callbacks):
+        """Feed items are only written once the completion has committed"""
+        with django_capture_on_commit_callbacks() as callbacks:
+            HabitService.mark_complete(habit)
+            assert not FeedItem.objects.filter(user=user).exists()
+
+        assert not FeedItem.objects.filter(user=user).exists()
+        for callback in callbacks:
+            callback()
+        assert FeedItem.objects.filter(user=user).exists()
+
+    def test_completion_updates_level(self, db, user, habit):
+        today = timezone.now().date()
+        for i in range(10):
+            HabitService.mark_complete(habit, date=today - timedelta(days=i))
+
+        user.profile.refresh_from_db()
+        assert user.profile.total_points == 100
+        assert user.profile.level == 2
+
     def test_streak_calculation(self, db, habit):
         """Test streak is calculated correctly"""
         today = timezone.now().date()
@@ -132,6 +131,79 @@ def test_streak_breaks_on_miss(self, db, habit):
         assert habit.current_streak == 1
 
 
+class TestBulkEntries:
+    """Test bulk entry upsert for offline sync"""
+
+    URL = '/api/v1/habits/entries/bulk_create/'
+
+    def test_bulk_upsert_statuses(self, authenticated_client, user, habit):
+        today = timezone.now().date()
+        other_user_habit = Habit.objects.create(
+            user=User.objects.create_user(
+                username='other', email='o@example.com', password='x' * 10
+            ),
+            title='Other',
+        )
+        HabitEntry.objects.create(habit=habit, date=today, completed=False)
+        HabitEntry.objects.create(habit=habit, date=today - timedelta(days=3), completed=True)
+
+        yesterday = (today - timedelta(days=1)).isoformat()
+        response = authenticated_client.post(self.URL, {'entries': [
+            {'habit_id': habit.id, 'date': today.isoformat(), 'completed': True},
+            {'habit_id': habit.id, 'date': yesterday, 'completed': False},
+            {'habit_id': habit.id, 'date': yesterday},
+            {'habit_id': habit.id, 'date': (today - timedelta(days=3)).isoformat()},
+            {'habit_id': other_user_habit.id, 'date': today.isoformat()},
+            {'habit_id': habit.id, 'date': 'not-a-date'},
+        ]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        statuses = [row['status'] for row in response.data['results']]
+        assert statuses == ['updated', 'duplicate', 'created', 'unchanged', 'not_found', 'invalid']
+        written = [
+            r for r in response.data['results']
+            if r['status'] in ('created', 'updated', 'unchanged')
+        ]
+        assert all(row['entry_id'] for row in written)
+        assert not HabitEntry.objects.filter(habit=other_user_habit).exists()
+
+        habit.refresh_from_db()
+        assert habit.current_streak == 2
+        user.profile.refresh_from_db()
+        assert user.profile.total_points == 20
+        assert user.profile.total_completions == 2
+
+    @pytest.mark.parametrize('note', [5, ['x'], {'text': 'x'}, 'x' * 501])
+    def test_malformed_note_is_invalid(self, authenticated_client, habit, note):
+        today = timezone.now().date()
+
+        response = authenticated_client.post(self.URL, {'entries': [
+            {'habit_id': habit.id, 'date': today.isoformat(), 'note': note},
+            {'habit_id': habit.id, 'date': (today - timedelta(days=1)).isoformat(), 'note': None},
+        ]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        statuses = [row['status'] for row in response.data['results']]
+        assert statuses == ['invalid', 'created']
+        assert habit.entries.get().note == ''
+
+    def test_bulk_upsert_query_count_is_constant(self, authenticated_client, user):
+        today = timezone.now().date()
+        habits = [Habit.objects.create(user=user, title=f'Habit {i}') for i in range(10)]
+        rows = [
+            {'habit_id': h.id, 'date': (today - timedelta(days=d)).isoformat()}
+            for h in habits for d in range(30)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.post(self.URL, {'entries': rows}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert HabitEntry.objects.filter(habit__user=user).count() == 300
+        assert len(queries) < 20
+        assert all(h.current_streak == 30 for h in Habit.objects.filter(user=user))
+
+
 class TestHabitAnalytics:
     """Test analytics and statistics"""
     
@@ -151,6 +223,26 @@ def test_get_user_stats(self, db, user, habit):
         assert stats['active_habits'] == 1
         assert stats['total_completions'] == 5  # Half completed
     
+    def test_statistics_endpoint_uses_two_queries(self, authenticated_client, user, habit):
+        today = timezone.now().date()
+        for i in range(3):
+            HabitService.mark_complete(habit, date=today - timedelta(days=i))
+        HabitEntry.objects.create(habit=habit, date=today - timedelta(days=20), completed=False)
+        Habit.objects.create(user=user, title='Paused', is_active=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get('/api/v1/habits/statistics/')
+
+        assert len(queries) == 2
+        assert response.data['total_habits'] == 2
+        assert response.data['active_habits'] == 1
+        assert response.data['total_completions'] == 3
+        assert response.data['completion_rate'] == 75.0
+        assert response.data['this_week_completions'] == 3
+        assert response.data['current_streak'] == 3
+        assert response.data['average_streak'] == 1.5
+        assert response.data['total_points'] == 30
+
     def test_completion_rate(self, db, habit):
         """Test completion rate calculation"""
         today = timezone.now().date()
@@ -165,10 +257,619 @@ def test_completion_rate(self, db, habit):
         assert rate == 70.0
 
 
+class TestDailyRollup:
+    """Test the daily rollup table and the analytics reading it"""
+    
+    def _rollups(self, habit):
+        return list(
+            DailyRollup.objects.filter(habit=habit)
+            .order_by('date')
+            .values_list('date', 'completed', 'total', 'points')
+        )
+    
+    def test_follows_completion_and_undo(self, db, user, habit):
+        today = timezone.now().date()
+        HabitService.mark_complete(habit, date=today)
+        assert self._rollups(habit) == [(today, 1, 1, 10)]
+        
+        HabitService.mark_incomplete(habit, date=today)
+        assert self._rollups(habit) == [(today, 0, 1, 10)]
+        
+        HabitEntry.objects.get(habit=habit, date=today).delete()
+        assert self._rollups(habit) == []
+    
+    def test_follows_bulk_upsert(self, db, user, habit):
+        today = timezone.now().date()
+        HabitService.bulk_upsert_entries(user, [
+            {'habit_id': habit.id, 'date': today.isoformat()},
+            {
+                'habit_id': habit.id,
+                'date': (today - timedelta(days=1)).isoformat(),
+                'completed': False,
+            },
+        ])
+        
+        assert self._rollups(habit) == [
+            (today - timedelta(days=1), 0, 1, 0),
+            (today, 1, 1, 10),
+        ]
+    
+    def test_changing_entry_date_moves_rollup(self, authenticated_client, habit):
+        today = timezone.now().date()
+        yesterday = today - timedelta(days=1)
+        entry = HabitService.mark_complete(habit, date=today)
+        
+        response = authenticated_client.patch(
+            f'/api/v1/habits/entries/{entry.id}/', {'date': yesterday.isoformat()}, format='json'
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert self._rollups(habit) == [(yesterday, 1, 1, 10)]
+    
+    def test_rebuild_command_restores_rollups(self, db, user, habit):
+        today = timezone.now().date()
+        for i in range(3):
+            HabitService.mark_complete(habit, date=today - timedelta(days=i))
+        expected = self._rollups(habit)
+        DailyRollup.objects.all().delete()
+        
+        call_command('rebuild_rollups')
+        
+        assert self._rollups(habit) == expected
+    
+    def test_analytics_do_not_scan_entries(self, authenticated_client, habit):
+        HabitService.mark_complete(habit)
+        
+        with CaptureQueriesContext(connection) as queries:
+            authenticated_client.get('/api/v1/habits/statistics/')
+            authenticated_client.get('/api/v1/habits/analytics/weekly/')
+            response = authenticated_client.get(f'/api/v1/habits/{habit.id}/analytics/')
+        
+        assert response.data['total_completions'] == 1
+        assert not any('habits_entry' in query['sql'] for query in queries)
+    
+    def test_deleting_habit_removes_rollups(self, db, habit):
+        HabitService.mark_complete(habit)
+        habit.delete()
+        assert not DailyRollup.objects.exists()
+
+
+class TestHabitListQueries:
+    """Query-count regressions for the habit list endpoint"""
+
+    @staticmethod
+    def _create_habits(user, count, start=0):
+        today = timezone.now().date()
+        for i in range(start, start + count):
+            habit = Habit.objects.create(user=user, title=f'Habit {i}')
+            HabitEntry.objects.bulk_create([
+                HabitEntry(habit=habit, date=today - timedelta(days=d), completed=d % 3 != 0)
+                for d in range(6)
+            ])
+
+    def _count_list_queries(self, client):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/habits/')
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries)
+
+    def test_list_query_count_is_constant(self, authenticated_client, user):
+        """Listing 50 habits costs the same number of queries as listing 2"""
+        self._create_habits(user, 2)
+        small = self._count_list_queries(authenticated_client)
+
+        self._create_habits(user, 48, start=2)
+        large = self._count_list_queries(authenticated_client)
+
+        assert large == small
+
+    def test_list_uses_annotated_counts(self, authenticated_client, user):
+        self._create_habits(user, 1)
+        response = authenticated_client.get('/api/v1/habits/')
+
+        habit_data = response.data['results'][0]
+        assert habit_data['total_completions'] == 4
+        assert habit_data['completion_rate'] == pytest.approx(4 / 6 * 100)
+
+
+class TestHabitEntriesWindow:
+    """Test the nested entries window on habit responses"""
+
+    @pytest.fixture
+    def habit_with_history(self, habit):
+        today = timezone.now().date()
+        HabitEntry.objects.bulk_create([
+            HabitEntry(habit=habit, date=today - timedelta(days=d), completed=True)
+            for d in (0, 1, 100, 400)
+        ])
+        return habit
+
+    def _entries(self, client, **params):
+        response = client.get('/api/v1/habits/', params)
+        assert response.status_code == status.HTTP_200_OK
+        return response.data['results'][0].get('entries')
+
+    def test_default_embeds_recent_entries(self, authenticated_client, habit_with_history):
+        assert len(self._entries(authenticated_client)) == 2
+
+    def test_all_and_none(self, authenticated_client, habit_with_history):
+        assert len(self._entries(authenticated_client, entries='all')) == 4
+        assert self._entries(authenticated_client, entries='none') is None
+
+    def test_entries_since(self, authenticated_client, habit_with_history):
+        since = timezone.now().date() - timedelta(days=200)
+        assert len(self._entries(authenticated_client, entries_since=since.isoformat())) == 3
+
+    def test_invalid_window_is_rejected(self, authenticated_client, habit_with_history):
+        response = authenticated_client.get('/api/v1/habits/', {'entries': 'everything'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestTodayEndpoint:
+    """Test the daily checklist endpoint"""
+
+    def test_today_query_count_is_constant(self, authenticated_client, user):
+        today = timezone.now().date()
+        for i in range(10):
+            habit = Habit.objects.create(user=user, title=f'Habit {i}')
+            HabitEntry.objects.create(habit=habit, date=today, completed=i % 2 == 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get('/api/v1/habits/today/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(queries) == 2
+        assert sum(item['completed_today'] for item in response.data) == 5
+
+    def test_checklist_for_another_date(self, authenticated_client, habit):
+        yesterday = timezone.now().date() - timedelta(days=1)
+        HabitEntry.objects.create(habit=habit, date=yesterday, completed=True)
+
+        response = authenticated_client.get(
+            '/api/v1/habits/today/', {'date': yesterday.isoformat()}
+        )
+        assert response.data[0]['completed_today'] is True
+
+        response = authenticated_client.get('/api/v1/habits/today/')
+        assert response.data[0]['completed_today'] is False
+
+    def test_invalid_date_is_rejected(self, authenticated_client, habit):
+        response = authenticated_client.get('/api/v1/habits/today/', {'date': '2025-02-30'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_broken_streak_is_reported_as_zero(self, authenticated_client, habit):
+        # A stored streak whose last completion is two days old has been broken
+        Habit.objects.filter(pk=habit.pk).update(
+            current_streak=4, best_streak=4,
+            last_completed=timezone.now().date() - timedelta(days=2),
+        )
+
+        checklist = authenticated_client.get('/api/v1/habits/today/').data
+        listed = authenticated_client.get('/api/v1/habits/').data['results']
+        detail = authenticated_client.get(f'/api/v1/habits/{habit.id}/').data
+
+        assert checklist[0]['current_streak'] == 0
+        assert listed[0]['current_streak'] == 0
+        assert detail['current_streak'] == 0
+        assert detail['best_streak'] == 4
+
+
+class TestUserResponseCache:
+    """Test per-user cached dashboard responses and their invalidation"""
+
+    def test_statistics_are_cached_until_a_completion(
+        self, authenticated_client, habit, django_assert_num_queries,
+        django_capture_on_commit_callbacks,
+    ):
+        first = authenticated_client.get('/api/v1/habits/statistics/')
+        with django_assert_num_queries(0):
+            assert authenticated_client.get('/api/v1/habits/statistics/').data == first.data
+
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_complete(habit)
+
+        response = authenticated_client.get('/api/v1/habits/statistics/')
+        assert response.data['total_completions'] == first.data['total_completions'] + 1
+        assert response.data['total_points'] == first.data['total_points'] + 10
+
+    def test_today_is_invalidated_by_bulk_upsert(
+        self, authenticated_client, habit, django_capture_on_commit_callbacks
+    ):
+        assert authenticated_client.get('/api/v1/habits/today/').data[0]['completed_today'] is False
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post('/api/v1/habits/entries/bulk_create/', {'entries': [
+                {'habit_id': habit.id, 'date': timezone.now().date().isoformat()},
+            ]}, format='json')
+
+        assert authenticated_client.get('/api/v1/habits/today/').data[0]['completed_today'] is True
+
+    def test_cache_is_per_user(self, api_client, user, habit):
+        other = User.objects.create_user(username='other', email='o@example.com', password='x' * 10)
+        api_client.force_authenticate(user=user)
+        assert len(api_client.get('/api/v1/habits/today/').data) == 1
+
+        api_client.force_authenticate(user=other)
+        assert api_client.get('/api/v1/habits/today/').data == []
+
+    def test_forest_overview_is_invalidated_by_forest_writes(
+        self, authenticated_client, habit, django_assert_num_queries,
+        django_capture_on_commit_callbacks,
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.get('/api/v1/forest/overview/')
+        first = authenticated_client.get('/api/v1/forest/overview/')
+        with django_assert_num_queries(0):
+            authenticated_client.get('/api/v1/forest/overview/')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(
+                '/api/v1/forest/water/', {'habit_id': habit.id}, format='json'
+            )
+
+        response = authenticated_client.get('/api/v1/forest/overview/')
+        # The first watering also plants the habit's tree
+        assert len(response.data['recent_actions']) == len(first.data['recent_actions']) + 2
+
+    def test_versions_are_bumped_after_commit(
+        self, user, habit, django_capture_on_commit_callbacks
+    ):
+        version = cache_utils.user_version('habits', user.id)
+        with django_capture_on_commit_callbacks() as callbacks:
+            HabitService.mark_complete(habit)
+            assert cache_utils.user_version('habits', user.id) == version
+
+        for callback in callbacks:
+            callback()
+        assert cache_utils.user_version('habits', user.id) != version
+
+
+class TestConditionalRequests:
+    """Test ETag/Last-Modified validators on polled endpoints"""
+
+    @pytest.fixture(autouse=True)
+    def shared_cache(self, monkeypatch):
+        """The test cache is process-local; validators are only sent for shared caches"""
+        monkeypatch.setattr(cache_utils, 'cache_is_shared', lambda: True)
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/habits/', '/api/v1/habits/today/', '/api/v1/habits/statistics/',
+        '/api/v1/forest/overview/',
+    ])
+    def test_unchanged_response_is_not_modified(self, authenticated_client, habit, url,
+                                                django_assert_num_queries):
+        authenticated_client.get(url)  # the first forest visit creates the layout
+        etag = authenticated_client.get(url)['ETag']
+
+        with django_assert_num_queries(0):
+            response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+
+    def test_write_changes_etag(
+        self, authenticated_client, habit, django_capture_on_commit_callbacks
+    ):
+        first = authenticated_client.get('/api/v1/habits/')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_complete(habit)
+
+        response = authenticated_client.get('/api/v1/habits/', HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != first['ETag']
+
+    def test_etag_depends_on_query(self, authenticated_client, habit):
+        etag = authenticated_client.get('/api/v1/habits/')['ETag']
+
+        response = authenticated_client.get(
+            '/api/v1/habits/', {'entries': 'none'}, HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_modified_since_alone_is_not_trusted(self, authenticated_client, habit):
+        first = authenticated_client.get('/api/v1/habits/statistics/')
+        # Last-Modified has one second resolution, so it cannot tell this write apart
+        HabitService.mark_complete(habit)
+
+        response = authenticated_client.get(
+            '/api/v1/habits/statistics/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_no_validators_without_shared_cache(self, authenticated_client, habit, monkeypatch):
+        monkeypatch.setattr(cache_utils, 'cache_is_shared', lambda: False)
+        etag = authenticated_client.get('/api/v1/habits/').get('ETag')
+
+        response = authenticated_client.get('/api/v1/habits/', HTTP_IF_NONE_MATCH='"anything"')
+
+        assert etag is None
+        assert response.status_code == status.HTTP_200_OK
+        assert 'ETag' not in response
+
+
+class TestDeltaSync:
+    """Test the delta sync endpoint"""
+
+    URL = '/api/v1/sync/'
+
+    def _sync(self, client, cursor=None):
+        response = client.get(self.URL, {'since': cursor} if cursor else {})
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+
+    def _age(self, *querysets, seconds=120):
+        earlier = timezone.now() - timedelta(seconds=seconds)
+        for queryset in querysets:
+            queryset.update(updated_at=earlier)
+
+    def test_initial_sync_is_full_snapshot(self, authenticated_client, habit):
+        HabitService.mark_complete(habit)
+
+        data = self._sync(authenticated_client)
+
+        assert data['full'] is True
+        assert [h['id'] for h in data['habits']] == [habit.id]
+        assert 'entries' not in data['habits'][0]
+        assert data['entries'][0]['habit'] == habit.id
+        assert data['cursor']
+
+    def test_delta_returns_only_changes(self, authenticated_client, user, habit):
+        other = Habit.objects.create(user=user, title='Reading')
+        HabitService.mark_complete(habit)
+        cursor = self._sync(authenticated_client)['cursor']
+        self._age(Habit.objects.all(), HabitEntry.objects.all())
+
+        HabitService.mark_complete(other)
+        data = self._sync(authenticated_client, cursor)
+
+        assert data['full'] is False
+        assert [h['id'] for h in data['habits']] == [other.id]
+        assert [e['habit'] for e in data['entries']] == [other.id]
+
+    def test_deletes_are_returned_as_tombstones(self, authenticated_client, user, habit):
+        other = Habit.objects.create(user=user, title='Reading')
+        entry = HabitService.mark_complete(other)
+        kept = HabitService.mark_complete(habit)
+        cursor = self._sync(authenticated_client)['cursor']
+
+        authenticated_client.delete(f'/api/v1/habits/entries/{kept.id}/')
+        authenticated_client.delete(f'/api/v1/habits/{other.id}/')
+        data = self._sync(authenticated_client, cursor)
+
+        assert data['deleted']['habits'] == [other.id]
+        # Entries of a deleted habit go with it; only the direct delete is recorded
+        assert data['deleted']['entries'] == [kept.id]
+        assert entry.id not in data['deleted']['entries']
+
+    def test_delta_uses_constant_queries(
+        self, authenticated_client, user, django_assert_max_num_queries
+    ):
+        for i in range(5):
+            HabitService.mark_complete(Habit.objects.create(user=user, title=f'Habit {i}'))
+        cursor = self._sync(authenticated_client)['cursor']
+
+        with django_assert_max_num_queries(8):
+            self._sync(authenticated_client, cursor)
+
+    def test_expired_cursor_gets_full_snapshot(self, authenticated_client, habit, settings):
+        cursor = SyncService.encode_cursor(
+            timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+        )
+
+        assert self._sync(authenticated_client, cursor)['full'] is True
+
+    def test_invalid_cursor_is_rejected(self, authenticated_client):
+        response = authenticated_client.get(self.URL, {'since': 'garbage'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestTimeSeriesAnalytics:
+    """Test completion time series"""
+
+    URL = '/api/v1/habits/analytics/timeseries/'
+
+    def test_daily_series_is_zero_filled(self, authenticated_client, habit):
+        today = timezone.now().date()
+        for d in (0, 2):
+            HabitEntry.objects.create(habit=habit, date=today - timedelta(days=d), completed=True)
+        HabitEntry.objects.create(habit=habit, date=today - timedelta(days=1), completed=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(self.URL, {
+                'from': (today - timedelta(days=3)).isoformat(), 'to': today.isoformat(),
+            })
+
+        assert len(queries) == 1
+        assert [point['completions'] for point in response.data['data']] == [0, 1, 0, 1]
+
+    def test_monthly_buckets(self, authenticated_client, habit):
+        for day in ('2025-01-05', '2025-01-20', '2025-03-01'):
+            HabitEntry.objects.create(habit=habit, date=day, completed=True)
+
+        response = authenticated_client.get(self.URL, {
+            'from': '2025-01-10', 'to': '2025-03-31', 'bucket': 'month',
+        })
+
+        assert response.data['data'] == [
+            {'date': '2025-01-10', 'completions': 1},
+            {'date': '2025-02-01', 'completions': 0},
+            {'date': '2025-03-01', 'completions': 1},
+        ]
+
+    def test_weekly_endpoint_keeps_shape(self, authenticated_client, habit):
+        HabitEntry.objects.create(habit=habit, completed=True)
+
+        response = authenticated_client.get('/api/v1/habits/analytics/weekly/')
+
+        assert len(response.data['data']) == 7
+        assert response.data['data'][-1]['completions'] == 1
+        assert response.data['data'][-1]['day_name'] == timezone.now().date().strftime('%a')
+
+    @pytest.mark.parametrize('params', [
+        {'bucket': 'hour'},
+        {'from': '2025-02-01', 'to': '2025-01-01'},
+        {'from': '2015-01-01', 'to': '2025-01-01'},
+        {'to': 'yesterday'},
+    ])
+    def test_invalid_parameters(self, authenticated_client, params):
+        assert authenticated_client.get(self.URL, params).status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestFeedInbox:
+    """Test fan-out of feed items into follower inboxes"""
+    
+    @pytest.fixture
+    def follower(self, db, user):
+        follower = User.objects.create_user(
+            username='follower', email='follower@example.com', password='pass12345'
+        )
+        Follow.objects.create(follower=follower, following=user)
+        return follower
+    
+    def _complete(self, habit, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_complete(habit)
+        return FeedItem.objects.get(habit=habit)
+    
+    def test_completion_is_fanned_out(
+        self, user, habit, follower, django_capture_on_commit_callbacks
+    ):
+        item = self._complete(habit, django_capture_on_commit_callbacks)
+        
+        owners = FeedInbox.objects.filter(feed_item=item).values_list('owner_id', flat=True)
+        assert set(owners) == {user.id, follower.id}
+        with CaptureQueriesContext(connection) as queries:
+            feed = FeedService.get_feed(follower)
+        assert feed == [item]
+        assert len(queries) == 2
+    
+    def test_high_follower_account_is_read_on_demand(
+        self, settings, user, habit, follower, django_capture_on_commit_callbacks
+    ):
+        settings.FEED_FANOUT_MAX_FOLLOWERS = 0
+        item = self._complete(habit, django_capture_on_commit_callbacks)
+        
+        assert not FeedInbox.objects.filter(owner=follower).exists()
+        assert FeedService.get_feed(follower) == [item]
+        assert FeedService.get_feed(user) == [item]
+    
+    def test_follow_backfills_and_unfollow_clears(
+        self, user, habit, django_capture_on_commit_callbacks
+    ):
+        item = self._complete(habit, django_capture_on_commit_callbacks)
+        reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass12345'
+        )
+        
+        follow = Follow.objects.create(follower=reader, following=user)
+        assert FeedService.get_feed(reader) == [item]
+        
+        follow.delete()
+        assert FeedService.get_feed(reader) == []
+    
+    def test_feed_endpoint_reads_inbox(
+        self, api_client, habit, follower, django_capture_on_commit_callbacks
+    ):
+        item = self._complete(habit, django_capture_on_commit_callbacks)
+        api_client.force_authenticate(user=follower)
+        
+        response = api_client.get('/api/v1/habits/feed/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['id'] for row in response.data['results']] == [item.id]
+        assert response.data['next_cursor'] is None
+
+
+class TestFeedPagination:
+    """Test keyset pagination and comment/reaction summaries of the feed"""
+    
+    @pytest.fixture
+    def items(self, user):
+        created_at = timezone.now()
+        items = FeedItem.objects.bulk_create([
+            FeedItem(user=user, type='completion', message=f'item {i}') for i in range(7)
+        ])
+        # Share one timestamp so ordering falls back to the id tie-breaker
+        FeedItem.objects.update(created_at=created_at)
+        FeedInbox.objects.bulk_create([
+            FeedInbox(owner=user, feed_item=item, created_at=created_at) for item in items
+        ])
+        return sorted(items, key=lambda item: item.id, reverse=True)
+    
+    def _page(self, client, **params):
+        response = client.get('/api/v1/habits/feed/', params)
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+    
+    def _walk(self, client):
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 3}
+            if cursor:
+                params['cursor'] = cursor
+            with CaptureQueriesContext(connection) as queries:
+                page = self._page(client, **params)
+            assert len(queries) <= 5
+            seen += [row['id'] for row in page['results']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                return seen
+    
+    def test_pages_walk_the_whole_feed(self, authenticated_client, items):
+        assert self._walk(authenticated_client) == [item.id for item in items]
+    
+    def test_items_in_follower_inboxes_are_not_repeated(self, authenticated_client, user):
+        now = timezone.now()
+        items = FeedItem.objects.bulk_create([
+            FeedItem(user=user, type='completion', message=f'item {i}') for i in range(7)
+        ])
+        followers = [
+            User.objects.create_user(
+                username=f'follower{i}', email=f'follower{i}@example.com', password='pass12345'
+            )
+            for i in range(3)
+        ]
+        for i, item in enumerate(items):
+            item.created_at = now - timedelta(minutes=i)
+            FeedItem.objects.filter(pk=item.pk).update(created_at=item.created_at)
+            FeedInbox.objects.bulk_create([
+                FeedInbox(owner=owner, feed_item=item, created_at=item.created_at)
+                for owner in [user] + followers
+            ])
+        
+        assert self._walk(authenticated_client) == [item.id for item in items]
+    
+    def test_summaries_are_bounded(self, authenticated_client, user, items):
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass12345'
+        )
+        newest = items[0]
+        for i in range(5):
+            Comment.objects.create(user=other, feed_item=newest, text=f'comment {i}')
+        Reaction.objects.create(user=user, feed_item=newest, emoji='🔥')
+        Reaction.objects.create(user=other, feed_item=newest, emoji='🔥')
+        Reaction.objects.create(user=other, feed_item=newest, emoji='👍')
+        
+        row = self._page(authenticated_client, page_size=1)['results'][0]
+        
+        assert row['comments_count'] == 5
+        assert [c['text'] for c in row['comments']] == ['comment 4', 'comment 3', 'comment 2']
+        assert row['reaction_counts'] == {'🔥': 2, '👍': 1}
+    
+    @pytest.mark.parametrize(
+        'params', [{'page_size': 0}, {'page_size': 'ten'}, {'cursor': 'not-a-cursor'}]
+    )
+    def test_invalid_parameters(self, authenticated_client, params):
+        response = authenticated_client.get('/api/v1/habits/feed/', params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 class TestAuthentication:
     """Test authentication endpoints"""
     
-    def test_user_registration(self, api_client):
+    def test_user_registration(self, db, api_client):
         """Test user registration"""
         response = api_client.post(
             '/api/v1/auth/register/',
@@ -0,0 +1,197 @@
+"""
+Tests for the incremental streak engine
+"""
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from habits import streaks
+from habits.models import Habit, HabitEntry
+from habits.services import HabitService, StreakService
+
+
+def _assert_matches_full_recompute(habit):
+    """Stored streak fields must agree with a full recompute"""
+    habit.refresh_from_db()
+    dates = habit.entries.filter(completed=True).values_list('date', flat=True)
+    current, best, last = streaks.streaks_from_dates(dates)
+    assert habit.current_streak == current
+    assert habit.last_completed == last
+    assert habit.best_streak >= best
+
+
+class TestStreaksFromDates:
+    """Test the reference run-length computation"""
+
+    def test_empty(self):
+        assert streaks.streaks_from_dates([]) == (0, 0, None)
+
+    def test_current_and_best_runs(self):
+        today = timezone.now().date()
+        dates = [today - timedelta(days=i) for i in (0, 1, 5, 6, 7, 8)]
+        assert streaks.streaks_from_dates(dates) == (2, 4, today)
+
+
+class TestBatchStreaks:
+    """Test the batch API and the live streak rule"""
+
+    def test_batch_matches_single_habit_computation(self):
+        today = timezone.now().date()
+        per_habit = {
+            1: [today - timedelta(days=i) for i in (0, 1, 2, 7)],
+            2: [today - timedelta(days=i) for i in (3, 5, 6, 6)],
+            3: [today],
+        }
+        rows = [(habit_id, day) for habit_id, days in per_habit.items() for day in days]
+
+        results = streaks.batch_streaks(reversed(rows))
+
+        for habit_id, days in per_habit.items():
+            assert results[habit_id] == streaks.streaks_from_dates(days)
+        assert results[2] == (1, 2, today - timedelta(days=3))
+
+    def test_streaks_for_habits_uses_one_query(self, db, user, django_assert_num_queries):
+        today = timezone.now().date()
+        habits = [Habit.objects.create(user=user, title=f'Habit {i}') for i in range(5)]
+        HabitEntry.objects.bulk_create([
+            HabitEntry(habit=h, date=today - timedelta(days=d), completed=True)
+            for i, h in enumerate(habits) for d in range(i)
+        ])
+
+        with django_assert_num_queries(1):
+            results = streaks.streaks_for_habits([h.id for h in habits])
+
+        assert [results[h.id].current_streak for h in habits] == [0, 1, 2, 3, 4]
+
+    def test_recompute_streaks_returns_changed_habits(self, db, habit):
+        today = timezone.now().date()
+        HabitEntry.objects.create(habit=habit, date=today, completed=True)
+
+        changed = StreakService.recompute_streaks([habit])
+
+        assert changed == [habit]
+        assert habit.current_streak == 1
+
+    def test_live_streak_expires_after_missed_day(self):
+        today = timezone.now().date()
+        assert streaks.live_streak(4, today, today) == 4
+        assert streaks.live_streak(4, today - timedelta(days=1), today) == 4
+        assert streaks.live_streak(4, today - timedelta(days=2), today) == 0
+
+    def test_services_agree_on_current_streak(self, db, habit):
+        today = timezone.now().date()
+        for i in range(2, 0, -1):
+            HabitService.mark_complete(habit, date=today - timedelta(days=i))
+
+        assert HabitService.calculate_streak(habit) == StreakService.calculate_streak(habit) == 2
+
+
+class TestIncrementalStreaks:
+    """Test streak updates driven by HabitService check-ins"""
+
+    def test_consecutive_completions(self, db, habit):
+        today = timezone.now().date()
+        for i in range(4, -1, -1):
+            HabitService.mark_complete(habit, date=today - timedelta(days=i))
+
+        habit.refresh_from_db()
+        assert habit.current_streak == 5
+        assert habit.best_streak == 5
+        assert habit.last_completed == today
+
+    def test_gap_restarts_streak(self, db, habit):
+        today = timezone.now().date()
+        HabitService.mark_complete(habit, date=today - timedelta(days=3))
+        HabitService.mark_complete(habit, date=today - timedelta(days=2))
+        HabitService.mark_complete(habit, date=today)
+
+        habit.refresh_from_db()
+        assert habit.current_streak == 1
+        assert habit.best_streak == 2
+
+    def test_backfill_joins_runs(self, db, habit):
+        today = timezone.now().date()
+        for offset in (4, 3, 1, 0):
+            HabitService.mark_complete(habit, date=today - timedelta(days=offset))
+
+        HabitService.mark_complete(habit, date=today - timedelta(days=2))
+
+        habit.refresh_from_db()
+        assert habit.current_streak == 5
+        assert habit.best_streak == 5
+        _assert_matches_full_recompute(habit)
+
+    def test_backfill_before_older_run_keeps_current(self, db, habit):
+        today = timezone.now().date()
+        for offset in (10, 9, 1, 0):
+            HabitService.mark_complete(habit, date=today - timedelta(days=offset))
+
+        HabitService.mark_complete(habit, date=today - timedelta(days=8))
+
+        habit.refresh_from_db()
+        assert habit.current_streak == 2
+        assert habit.best_streak == 3
+        _assert_matches_full_recompute(habit)
+
+    def test_uncomplete_inside_current_run(self, db, habit):
+        today = timezone.now().date()
+        for i in range(5, -1, -1):
+            HabitService.mark_complete(habit, date=today - timedelta(days=i))
+
+        HabitService.mark_incomplete(habit, date=today - timedelta(days=2))
+
+        habit.refresh_from_db()
+        assert habit.current_streak == 2
+        assert habit.best_streak == 6
+        _assert_matches_full_recompute(habit)
+
+    def test_uncomplete_last_day_falls_back_to_previous_run(self, db, habit):
+        today = timezone.now().date()
+        for offset in (5, 4, 3, 0):
+            HabitService.mark_complete(habit, date=today - timedelta(days=offset))
+
+        HabitService.mark_incomplete(habit, date=today)
+
+        habit.refresh_from_db()
+        assert habit.current_streak == 3
+        assert habit.last_completed == today - timedelta(days=3)
+        _assert_matches_full_recompute(habit)
+
+    def test_long_run_walks_multiple_windows(self, db, habit):
+        today = timezone.now().date()
+        HabitEntry.objects.bulk_create([
+            HabitEntry(habit=habit, date=today - timedelta(days=i), completed=True)
+            for i in range(1, 100)
+        ])
+        habit.update_streak()
+        habit.save()
+
+        HabitService.mark_incomplete(habit, date=today - timedelta(days=50))
+        habit.refresh_from_db()
+        assert habit.current_streak == 49
+
+        HabitService.mark_complete(habit, date=today - timedelta(days=50))
+        habit.refresh_from_db()
+        assert habit.current_streak == 99
+        _assert_matches_full_recompute(habit)
+
+
+class TestVerifyStreaksCommand:
+    """Test the verify_streaks management command"""
+
+    def test_consistent_habits_pass(self, db, habit):
+        HabitService.mark_complete(habit)
+        call_command('verify_streaks')
+
+    def test_detects_and_fixes_mismatch(self, db, habit):
+        HabitService.mark_complete(habit)
+        Habit.objects.filter(pk=habit.pk).update(current_streak=42)
+
+        with pytest.raises(CommandError):
+            call_command('verify_streaks')
+
+        call_command('verify_streaks', fix=True)
+        habit.refresh_from_db()
+        assert habit.current_streak == 1
@@ -0,0 +1,299 @@
+"""
+Tests for users app
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.utils import cache as aggregates
+
+from habits.models import Challenge, Habit
+from habits.services import HabitService
+from users import leaderboard
+from users.models import Follow, User, UserProfile
+
+
+class TestProfileCounters:
+    """Test atomic profile counter updates"""
+
+    def test_add_counters_increments_in_place(self, db, user):
+        UserProfile.add_counters(
+            user.id, points=150, completions=2, current_streak=3, best_streak=5
+        )
+        UserProfile.add_counters(user.id, points=10, current_streak=1)
+
+        profile = UserProfile.objects.get(user=user)
+        assert profile.total_points == 160
+        assert profile.total_completions == 2
+        assert profile.level == 2
+        assert profile.current_streak == 3
+        assert profile.best_streak == 5
+
+    def test_add_counters_is_a_single_update(self, db, user):
+        with CaptureQueriesContext(connection) as queries:
+            UserProfile.add_counters(user.id, points=10, completions=1)
+
+        assert len(queries) == 1
+        assert queries[0]['sql'].startswith('UPDATE')
+
+    def test_stale_instance_does_not_overwrite_counters(self, db, user):
+        profile = UserProfile.objects.get(user=user)
+        UserProfile.add_counters(user.id, points=50)
+
+        profile.identity = 'Runner'
+        profile.save(update_fields=['identity', 'updated_at'])
+
+        profile.refresh_from_db()
+        assert profile.total_points == 50
+
+
+class TestProfileSignals:
+    """Test profile creation signals"""
+
+    def test_profile_created_with_user(self, db, user):
+        assert UserProfile.objects.filter(user=user).exists()
+
+    def test_user_save_does_not_touch_profile(self, db, user):
+        with CaptureQueriesContext(connection) as queries:
+            user.save(update_fields=['last_login'])
+
+        assert not any('users_profile' in query['sql'] for query in queries)
+
+    def test_follow_updates_followers_count(self, db, user):
+        fan = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass12345'
+        )
+        follow = Follow.objects.create(follower=fan, following=user)
+        assert UserProfile.objects.get(user=user).followers_count == 1
+
+        follow.delete()
+        assert UserProfile.objects.get(user=user).followers_count == 0
+
+
+class TestCommunityStats:
+    """Test the cached community stats aggregate"""
+    URL = '/api/v1/users/community/stats/'
+
+    def test_zero_values_are_served_from_cache(
+        self, authenticated_client, django_assert_num_queries
+    ):
+        first = authenticated_client.get(self.URL)
+        assert first.data['completions_today'] == 0
+
+        with django_assert_num_queries(0):
+            second = authenticated_client.get(self.URL)
+        assert second.data == first.data
+
+    def test_stale_value_is_refreshed_by_a_single_request(self):
+        calls = []
+        aggregate = aggregates.CachedAggregate(
+            'test_counter', lambda: calls.append(1) or len(calls), ttl=60
+        )
+        assert aggregate.get() == 1
+
+        cache.set(aggregate.key, {'value': 1, 'fresh_until': 0})
+        cache.add(aggregate.lock_key, 1)
+        assert aggregate.get() == 1  # another request holds the lock: serve stale
+        cache.delete(aggregate.lock_key)
+        assert aggregate.get() == 2
+        assert len(calls) == 2
+
+    def test_refresh_command_prewarms_cache(self, db, user, django_assert_num_queries):
+        call_command('refresh_aggregates', 'community_stats')
+
+        with django_assert_num_queries(0):
+            stats = aggregates.get('community_stats')
+        assert stats['total_users'] == 1
+
+
+class TestLeaderboard:
+    """Test the sorted-set leaderboards and the leaderboard endpoint"""
+
+    URL = '/api/v1/users/community/leaderboard/'
+
+    def _user_with_completions(self, username, days):
+        user = User.objects.create_user(
+            username=username, email=f'{username}@example.com', password='pass12345'
+        )
+        habit = Habit.objects.create(user=user, title='Read')
+        today = timezone.now().date()
+        for offset in range(days - 1, -1, -1):
+            HabitService.mark_complete(habit, date=today - timedelta(days=offset))
+        return user, habit
+
+    def test_memory_backend_ranks(self):
+        backend = leaderboard.MemoryBackend()
+        for member, score in [(1, 5), (2, 9), (3, 5)]:
+            backend.incr('board', member, score)
+        backend.raise_to('board', 1, 4)
+        backend.raise_to('board', 3, 7)
+
+        assert backend.top('board', 2) == [(2, 9), (3, 7)]
+        assert backend.rank('board', 1) == 2
+        assert backend.scores('board', [1, 4]) == {1: 5}
+
+    def test_memory_fallback_seeds_from_database(self, db, monkeypatch, settings):
+        user, _ = self._user_with_completions('seeded', 3)
+        settings.LEADERBOARD_REDIS_URL = ''
+        monkeypatch.setattr(leaderboard, '_backend', None)
+
+        assert leaderboard.scores(leaderboard.POINTS, [user.id]) == {user.id: 30}
+        assert leaderboard.rank(leaderboard.completions_board('all_time'), user.id) == (1, 3)
+
+        # Writes handled by other processes show up after the refresh interval,
+        # once the background refresh has run; the stale boards are served meanwhile
+        refreshes = []
+        monkeypatch.setattr(leaderboard, '_start_refresh', refreshes.append)
+        UserProfile.objects.filter(user=user).update(total_points=99)
+        assert leaderboard.scores(leaderboard.POINTS, [user.id]) == {user.id: 30}
+        backend = leaderboard.get_backend()
+        backend.rebuilt_at -= settings.LEADERBOARD_MEMORY_REFRESH
+        assert leaderboard.scores(leaderboard.POINTS, [user.id]) == {user.id: 30}
+        assert refreshes == [backend]
+        assert leaderboard.scores(leaderboard.POINTS, [user.id]) == {user.id: 30}
+        assert len(refreshes) == 1
+
+        leaderboard.rebuild(backend=backend)
+        assert leaderboard.scores(leaderboard.POINTS, [user.id]) == {user.id: 99}
+
+    def test_completions_update_boards(self, db, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            user, habit = self._user_with_completions('ranked', 2)
+
+        assert leaderboard.rank(leaderboard.completions_board('weekly'), user.id) is not None
+        assert leaderboard.scores(leaderboard.POINTS, [user.id]) == {user.id: 20}
+        assert leaderboard.scores(leaderboard.STREAK, [user.id]) == {user.id: 2}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_incomplete(habit)
+        assert leaderboard.scores(leaderboard.STREAK, [user.id]) == {user.id: 1}
+
+    def test_rebuild_matches_incremental_updates(self, db, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            self._user_with_completions('first', 3)
+            self._user_with_completions('second', 1)
+        boards = [leaderboard.completions_board(window) for window in leaderboard.WINDOWS]
+        boards += [
+            leaderboard.completions_board('all_time', category='other'),
+            leaderboard.STREAK, leaderboard.POINTS,
+        ]
+        incremental = [leaderboard.top(board, 10) for board in boards]
+
+        leaderboard.get_backend().clear()
+        call_command('rebuild_leaderboards')
+
+        assert [leaderboard.top(board, 10) for board in boards] == incremental
+
+    def test_global_and_friends_scopes(self, api_client, user, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            leader, _ = self._user_with_completions('leader', 3)
+            friend, _ = self._user_with_completions('friend', 2)
+            HabitService.mark_complete(Habit.objects.create(user=user, title='Walk'))
+        Follow.objects.create(follower=user, following=friend)
+        api_client.force_authenticate(user=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(self.URL, {'type': 'points'})
+        assert len(queries) == 1
+        usernames = [row['user']['username'] for row in response.data['results']]
+        assert usernames == ['leader', 'friend', 'testuser']
+        assert response.data['results'][0]['total_points'] == 30
+
+        response = api_client.get(self.URL, {'type': 'points', 'scope': 'following'})
+        usernames = [row['user']['username'] for row in response.data['results']]
+        assert usernames == ['friend', 'testuser']
+        assert response.data['me'] == {'rank': 2, 'score': 10}
+        assert response.data['results'][0]['current_streak'] == 2
+
+    def test_windows_count_completions_by_date(self, authenticated_client, user, habit,
+                                               django_capture_on_commit_callbacks):
+        today = timezone.now().date()
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_complete(habit, date=today)
+            HabitService.mark_complete(habit, date=today - timedelta(days=40))
+
+        scores = {
+            window: authenticated_client.get(self.URL, {'window': window}).data['me']['score']
+            for window in ('daily', 'all_time')
+        }
+        assert scores == {'daily': 1, 'all_time': 2}
+
+    def test_category_scope(
+        self, authenticated_client, user, habit, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_complete(habit)
+
+        fitness = authenticated_client.get(self.URL, {'scope': 'category', 'category': 'fitness'})
+        learning = authenticated_client.get(self.URL, {'scope': 'category', 'category': 'learning'})
+
+        assert fitness.data['me'] == {'rank': 1, 'score': 1}
+        assert learning.data['results'] == []
+
+    def test_challenge_scope_counts_completions_in_range(
+        self, authenticated_client, user, habit, django_capture_on_commit_callbacks
+    ):
+        today = timezone.now().date()
+        challenge = Challenge.objects.create(
+            creator=user, title='Week of running',
+            start_date=today - timedelta(days=2), end_date=today + timedelta(days=5),
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_complete(habit, date=today - timedelta(days=5))
+            HabitService.mark_complete(habit, date=today - timedelta(days=1))
+
+        authenticated_client.post(f'/api/v1/habits/challenges/{challenge.id}/join/')
+        with django_capture_on_commit_callbacks(execute=True):
+            HabitService.mark_complete(habit, date=today)
+
+        response = authenticated_client.get(
+            self.URL, {'scope': 'challenge', 'challenge': challenge.id}
+        )
+        assert response.data['me'] == {'rank': 1, 'score': 2}
+        assert response.data['window'] is None
+
+    def test_following_scope_does_not_scan_history(self, authenticated_client, user):
+        for i in range(3):
+            Follow.objects.create(
+                follower=user,
+                following=User.objects.create_user(
+                    username=f'followed{i}', email=f'f{i}@example.com', password='pass12345'
+                ),
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(
+                self.URL, {'scope': 'following', 'window': 'monthly'}
+            )
+
+        assert len(queries) == 2
+        assert len(response.data['results']) == 4
+
+    @pytest.mark.parametrize('params', [
+        {'type': 'yearly'},
+        {'window': 'hourly'},
+        {'scope': 'category', 'category': 'cooking'},
+        {'scope': 'category', 'category': 'fitness', 'type': 'streak'},
+        {'scope': 'challenge'},
+        {'scope': 'challenge', 'challenge': 'abc'},
+    ])
+    def test_invalid_parameters_are_rejected(self, authenticated_client, params):
+        assert authenticated_client.get(self.URL, params).status_code == 400
+
+    @pytest.mark.parametrize('lb_type', ['streak', 'points'])
+    def test_challenge_scope_rejects_other_types(self, authenticated_client, user, lb_type):
+        today = timezone.now().date()
+        challenge = Challenge.objects.create(
+            creator=user, title='Week of running', start_date=today, end_date=today,
+        )
+
+        response = authenticated_client.get(
+            self.URL, {'scope': 'challenge', 'challenge': challenge.id, 'type': lb_type}
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,29 @@
+"""
+Site-wide aggregates served through `core.utils.cache`
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from core.utils.cache import register
+from habits.models import DailyRollup, Habit
+
+User = get_user_model()
+
+
+@register('community_stats', ttl=300, stale_ttl=600)
+def community_stats():
+    """Community totals for the dashboard/insights page"""
+    today = timezone.now().date()
+
+    # Completions and active users for today, read from the daily rollups
+    today_stats = DailyRollup.objects.filter(date=today, completed__gt=0).aggregate(
+        completions=Sum('completed'),
+        active_users=Count('user_id', distinct=True),
+    )
+    return {
+        'total_users': User.objects.filter(is_active=True).count(),
+        'active_today': today_stats['active_users'],
+        'total_habits': Habit.objects.filter(is_active=True).count(),
+        'completions_today': today_stats['completions'] or 0,
+    }
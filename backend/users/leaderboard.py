@@ -0,0 +1,439 @@
+"""
+Ranked leaderboards kept in sorted sets
+
+Each board maps user ids to a score. With Redis every board is one sorted
+set, so increments, rank lookups and top-N reads are O(log n) instead of a
+scan over every user. Without Redis an in-process stand-in with the same
+interface is used; each process seeds it from the database on first access
+and refreshes it in a background thread every LEADERBOARD_MEMORY_REFRESH
+seconds, since updates handled by other processes never reach it. Requests
+keep reading the previous boards while a refresh runs.
+
+Boards:
+- ``completions:<window>:<period>``: completions dated in one period of a
+  window (``daily``, ``weekly``, ``monthly`` or ``all_time``), e.g.
+  ``completions:weekly:2025-W07``; suffixed with ``:<category>`` for the
+  per-category boards
+- ``challenge:<id>``: completions of participants between the challenge dates
+- ``streak``: the user's longest current habit streak
+- ``points``: the user's total points
+
+Every window is its own precomputed board, so a ranking never aggregates
+raw history at read time; scoped rankings (the people someone follows) are
+score lookups for just those members.
+
+Updates are applied after the database transaction commits. A streak that
+breaks because a day was simply skipped is not an event, so
+``manage.py rebuild_leaderboards`` recomputes every board from the database
+and should run daily.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from habits import streaks
+from habits.models import Challenge, ChallengeParticipant, DailyRollup, Habit
+from users.models import UserProfile
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is only needed when LEADERBOARD_REDIS_URL is set
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+STREAK = 'streak'
+POINTS = 'points'
+
+# How long a window's board is kept after its period started (None: forever)
+WINDOW_TTLS = {
+    'daily': int(timedelta(days=8).total_seconds()),
+    'weekly': int(timedelta(weeks=5).total_seconds()),
+    'monthly': int(timedelta(days=400).total_seconds()),
+    'all_time': None,
+}
+WINDOWS = tuple(WINDOW_TTLS)
+
+
+class MemoryBackend:
+    """In-process sorted sets for development and tests (not shared between processes).
+
+    With a `refresh_interval` (seconds) the boards are rebuilt from the
+    database on first use and whenever they are older than that; without
+    one they start empty and only hold what is recorded in this process.
+    """
+
+    def __init__(self, refresh_interval=None):
+        self._scores = {}
+        self._order = {}
+        self.refresh_interval = refresh_interval
+        self.rebuilt_at = None
+
+    def is_stale(self):
+        if self.refresh_interval is None:
+            return False
+        if self.rebuilt_at is None:
+            return True
+        return time.monotonic() - self.rebuilt_at >= self.refresh_interval
+
+    def _set(self, board, member, score):
+        scores = self._scores.setdefault(board, {})
+        order = self._order.setdefault(board, [])
+        if member in scores:
+            del order[bisect_left(order, (-scores[member], member))]
+        scores[member] = score
+        insort(order, (-score, member))
+
+    def incr(self, board, member, amount, ttl=None):
+        self._set(board, member, self._scores.get(board, {}).get(member, 0) + amount)
+
+    def incr_many(self, increments):
+        for board, member, amount, ttl in increments:
+            self.incr(board, member, amount, ttl)
+
+    def raise_to(self, board, member, score):
+        current = self._scores.get(board, {}).get(member)
+        if current is None or score > current:
+            self._set(board, member, score)
+
+    def set(self, board, member, score):
+        self._set(board, member, score)
+
+    def top(self, board, count):
+        return [(member, -negative) for negative, member in self._order.get(board, [])[:count]]
+
+    def rank(self, board, member):
+        score = self._scores.get(board, {}).get(member)
+        if score is None:
+            return None
+        return bisect_left(self._order[board], (-score, member))
+
+    def scores(self, board, members):
+        scores = self._scores.get(board, {})
+        return {member: scores[member] for member in members if member in scores}
+
+    def replace(self, board, mapping, ttl=None):
+        self._scores[board] = dict(mapping)
+        self._order[board] = sorted((-score, member) for member, score in mapping.items())
+
+    def clear(self):
+        self._scores.clear()
+        self._order.clear()
+
+
+class RedisBackend:
+    """Redis sorted sets, one key per board"""
+
+    def __init__(self, url, prefix='leaderboard:'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, board):
+        return f'{self.prefix}{board}'
+
+    def incr(self, board, member, amount, ttl=None):
+        self.incr_many([(board, member, amount, ttl)])
+
+    def incr_many(self, increments):
+        """Apply ``(board, member, amount, ttl)`` increments in one round trip"""
+        pipe = self.client.pipeline()
+        for board, member, amount, ttl in increments:
+            pipe.zincrby(self._key(board), amount, member)
+            if ttl:
+                pipe.expire(self._key(board), ttl)
+        pipe.execute()
+
+    def raise_to(self, board, member, score):
+        self.client.zadd(self._key(board), {member: score}, gt=True)
+
+    def set(self, board, member, score):
+        self.client.zadd(self._key(board), {member: score})
+
+    def top(self, board, count):
+        rows = self.client.zrevrange(self._key(board), 0, count - 1, withscores=True)
+        return [(int(member), int(score)) for member, score in rows]
+
+    def rank(self, board, member):
+        return self.client.zrevrank(self._key(board), member)
+
+    def scores(self, board, members):
+        members = list(members)
+        if not members:
+            return {}
+        values = self.client.zmscore(self._key(board), members)
+        return {member: int(score) for member, score in zip(members, values) if score is not None}
+
+    def replace(self, board, mapping, ttl=None):
+        """Swap in a freshly computed board atomically (readers never see it half-built)"""
+        key, staging = self._key(board), self._key(f'{board}:rebuild')
+        pipe = self.client.pipeline()
+        pipe.delete(staging)
+        items = list(mapping.items())
+        for start in range(0, len(items), 10000):
+            pipe.zadd(staging, dict(items[start:start + 10000]))
+        if items:
+            pipe.rename(staging, key)
+            if ttl:
+                pipe.expire(key, ttl)
+        else:
+            pipe.delete(key)
+        pipe.execute()
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f'{self.prefix}*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+_backend = None
+
+
+def get_backend():
+    """Redis when LEADERBOARD_REDIS_URL is set, otherwise a self-seeding in-memory stand-in"""
+    global _backend
+    if _backend is None:
+        url = getattr(settings, 'LEADERBOARD_REDIS_URL', '')
+        if url and redis is None:
+            logger.warning(
+                'LEADERBOARD_REDIS_URL is set but redis is not installed; '
+                'using in-memory leaderboards'
+            )
+            url = ''
+        if url:
+            _backend = RedisBackend(url)
+        else:
+            _backend = MemoryBackend(refresh_interval=settings.LEADERBOARD_MEMORY_REFRESH)
+    backend = _backend
+    if isinstance(backend, MemoryBackend) and backend.is_stale():
+        seeded = backend.rebuilt_at is not None
+        # Marked first so the rebuild's own board writes don't trigger it again
+        backend.rebuilt_at = time.monotonic()
+        if seeded:
+            # Stale boards are still served; only the first seed blocks a request
+            _start_refresh(backend)
+        else:
+            rebuild(backend=backend)
+    return backend
+
+
+def _start_refresh(backend):
+    threading.Thread(
+        target=_refresh, args=(backend,), name='leaderboard-refresh', daemon=True
+    ).start()
+
+
+def _refresh(backend):
+    try:
+        rebuild(backend=backend)
+    except Exception:
+        logger.exception('Refreshing the in-memory leaderboards failed')
+    finally:
+        # The thread's own connection, which Django's request cycle never closes
+        connection.close()
+
+
+def completions_board(window='weekly', day=None, category=None):
+    """Board name of the `window` period containing `day` (default: today)"""
+    day = day or timezone.now().date()
+    if window == 'daily':
+        period = day.isoformat()
+    elif window == 'weekly':
+        year, week, _ = day.isocalendar()
+        period = f'{year}-W{week:02d}'
+    elif window == 'monthly':
+        period = f'{day:%Y-%m}'
+    else:
+        period = 'all'
+    board = f'completions:{window}:{period}'
+    return f'{board}:{category}' if category else board
+
+
+def window_start(window, day):
+    """First day of the `window` period containing `day` (None for all time)"""
+    if window == 'daily':
+        return day
+    if window == 'weekly':
+        return day - timedelta(days=day.weekday())
+    if window == 'monthly':
+        return day.replace(day=1)
+    return None
+
+
+def challenge_board(challenge_id):
+    return f'challenge:{challenge_id}'
+
+
+# ----- Updates -----
+# Callers run these once their database transaction has committed
+# (HabitService schedules them with transaction.on_commit).
+
+def _completion_increments(user_id, completions, amount):
+    """Increments for every window, category and running challenge a completion counts towards.
+
+    `completions` are ``(day, category)`` pairs; finding the user's challenges
+    takes one query.
+    """
+    increments = []
+    for day, category in completions:
+        for window, ttl in WINDOW_TTLS.items():
+            increments.append((completions_board(window, day), user_id, amount, ttl))
+            increments.append((completions_board(window, day, category), user_id, amount, ttl))
+    if completions:
+        days = [day for day, _ in completions]
+        challenges = ChallengeParticipant.objects.filter(
+            user_id=user_id,
+            challenge__start_date__lte=max(days),
+            challenge__end_date__gte=min(days),
+        ).values_list('challenge_id', 'challenge__start_date', 'challenge__end_date')
+        for challenge_id, start, end in challenges:
+            count = sum(1 for day in days if start <= day <= end)
+            if count:
+                increments.append((challenge_board(challenge_id), user_id, amount * count, None))
+    return increments
+
+
+def record_completions(user_id, completions, points=0, streak=None):
+    """Count `completions` (``(day, category)`` pairs), add `points` and raise the streak score"""
+    backend = get_backend()
+    backend.incr_many(_completion_increments(user_id, completions, 1))
+    if points:
+        backend.incr(POINTS, user_id, points)
+    if streak is not None:
+        backend.raise_to(STREAK, user_id, streak)
+
+
+def record_uncompletions(user_id, completions):
+    """Take back `completions` and reset the streak score from the database,
+    since un-completing a day can shorten a streak"""
+    backend = get_backend()
+    backend.incr_many(_completion_increments(user_id, completions, -1))
+    streak = Habit.objects.filter(user_id=user_id, is_active=True).aggregate(
+        streak=Max(streaks.live_streak_expression())
+    )['streak']
+    backend.set(STREAK, user_id, streak or 0)
+
+
+def add_points(user_id, points):
+    """Add points awarded outside of completions (e.g. badges)"""
+    get_backend().incr(POINTS, user_id, points)
+
+
+def join_challenge(challenge, user_id):
+    """Put a new participant on the challenge board with the completions they already have"""
+    end = min(challenge.end_date, timezone.now().date())
+    completions = DailyRollup.objects.filter(
+        user_id=user_id, date__range=(challenge.start_date, end)
+    ).aggregate(completions=Sum('completed'))['completions']
+    get_backend().set(challenge_board(challenge.id), user_id, completions or 0)
+
+
+# ----- Reads -----
+
+def top(board, count):
+    """The `count` best users as ``[(rank, user_id, score)]``, rank starting at 1"""
+    return [
+        (position, user_id, score)
+        for position, (user_id, score) in enumerate(get_backend().top(board, count), start=1)
+    ]
+
+
+def rank(board, user_id):
+    """``(rank, score)`` of one user, or None if the user is not on the board"""
+    backend = get_backend()
+    position = backend.rank(board, user_id)
+    if position is None:
+        return None
+    return position + 1, backend.scores(board, [user_id])[user_id]
+
+
+def rank_among(board, user_ids):
+    """Rank a subset of users (e.g. someone and the people they follow) by score.
+
+    One score lookup per member, so the cost depends on the subset only.
+    Users without a score rank last with 0.
+    """
+    scores = get_backend().scores(board, user_ids)
+    ordered = sorted(user_ids, key=lambda user_id: (-scores.get(user_id, 0), user_id))
+    return [
+        (position, user_id, scores.get(user_id, 0))
+        for position, user_id in enumerate(ordered, start=1)
+    ]
+
+
+def scores(board, user_ids):
+    """``{user_id: score}`` for the given users (missing users are omitted)"""
+    return get_backend().scores(board, user_ids)
+
+
+# ----- Rebuild -----
+
+def rebuild(today=None, backend=None):
+    """Recompute the current period of every board from the database.
+
+    Boards of past periods are left to expire. Challenges are rebuilt while
+    running and for a week after they end.
+    """
+    today = today or timezone.now().date()
+    backend = backend or get_backend()
+    categories = [code for code, _ in Habit.CATEGORY_CHOICES]
+
+    for window in WINDOWS:
+        rollups = DailyRollup.objects.filter(date__lte=today, completed__gt=0)
+        start = window_start(window, today)
+        if start is not None:
+            rollups = rollups.filter(date__gte=start)
+        ttl = WINDOW_TTLS[window]
+
+        totals = (
+            rollups.values('user_id').annotate(completions=Sum('completed'))
+            .values_list('user_id', 'completions')
+        )
+        backend.replace(completions_board(window, today), dict(totals), ttl=ttl)
+
+        per_category = {category: {} for category in categories}
+        rows = (
+            rollups.values('habit__category', 'user_id')
+            .annotate(completions=Sum('completed'))
+            .values_list('habit__category', 'user_id', 'completions')
+        )
+        for category, user_id, completions in rows:
+            per_category.setdefault(category, {})[user_id] = completions
+        for category, mapping in per_category.items():
+            backend.replace(completions_board(window, today, category), mapping, ttl=ttl)
+
+    challenges = Challenge.objects.filter(
+        start_date__lte=today, end_date__gte=today - timedelta(days=7)
+    )
+    for challenge in challenges:
+        totals = (
+            DailyRollup.objects.filter(
+                user__challenge_participations__challenge=challenge,
+                date__range=(challenge.start_date, min(challenge.end_date, today)),
+            )
+            .values('user_id')
+            .annotate(completions=Sum('completed'))
+            .values_list('user_id', 'completions')
+        )
+        members = dict.fromkeys(challenge.participants.values_list('user_id', flat=True), 0)
+        members.update(totals)
+        backend.replace(challenge_board(challenge.id), members)
+
+    live = (
+        Habit.objects.filter(
+            is_active=True, last_completed__gte=today - streaks.ONE_DAY, current_streak__gt=0
+        )
+        .values('user_id')
+        .annotate(streak=Max('current_streak'))
+        .values_list('user_id', 'streak')
+    )
+    backend.replace(STREAK, dict(live))
+
+    points = UserProfile.objects.filter(total_points__gt=0).values_list('user_id', 'total_points')
+    backend.replace(POINTS, dict(points))
@@ -0,0 +1,17 @@
+"""
+Management command to recompute leaderboards from the database
+"""
+from django.core.management.base import BaseCommand
+
+from users import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the weekly, streak and points leaderboards from the database. '
+        'Run daily so broken streaks leave the streak board.'
+    )
+
+    def handle(self, *args, **options):
+        leaderboard.rebuild()
+        self.stdout.write(self.style.SUCCESS('Leaderboards rebuilt'))
@@ -0,0 +1,28 @@
+"""
+Management command to pre-warm cached global aggregates
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils import cache as aggregates
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute cached global aggregates such as community stats. '
+        'Schedule it more often than the aggregate TTLs so requests never wait on a refresh.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Aggregates to refresh (default: all)')
+
+    def handle(self, *args, **options):
+        registry = aggregates.registered()
+        names = options['names'] or sorted(registry)
+        unknown = [name for name in names if name not in registry]
+        if unknown:
+            raise CommandError(f"Unknown aggregates: {', '.join(unknown)}")
+
+        for name in names:
+            registry[name].refresh()
+            self.stdout.write(f'Refreshed {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(names)} aggregates refreshed'))
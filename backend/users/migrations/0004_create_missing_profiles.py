@@ -0,0 +1,25 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:40
+
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Backfill profiles that the removed save-time safety net used to create lazily"""
+    User = apps.get_model('users', 'User')
+    UserProfile = apps.get_model('users', 'UserProfile')
+    missing = User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in missing],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_userprofile_identity_userprofile_identity_progress_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
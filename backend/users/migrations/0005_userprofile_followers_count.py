@@ -0,0 +1,34 @@
+# Generated by Django 5.0.8 on 2026-10-17 06:19
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_followers(apps, schema_editor):
+    """Initialize followers_count from existing follow relationships"""
+    Follow = apps.get_model('users', 'Follow')
+    UserProfile = apps.get_model('users', 'UserProfile')
+    counts = (
+        Follow.objects.filter(following_id=OuterRef('user_id'))
+        .values('following_id')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    UserProfile.objects.update(followers_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_create_missing_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_followers, migrations.RunPython.noop),
+    ]
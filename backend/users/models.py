@@ -4,6 +4,11 @@
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.utils.cache import bump_user_version
 
 
 class User(AbstractUser):
@@ -43,6 +48,8 @@ def get_public_id(self):
 
 class UserProfile(models.Model):
     """Extended profile: social fields, stats, privacy, and gamification."""
+    POINTS_PER_LEVEL = 100
+    
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     
     # Social
@@ -51,6 +58,7 @@ class UserProfile(models.Model):
     website = models.URLField(blank=True)
     identity = models.CharField(max_length=100, blank=True, help_text="Identity statement e.g., 'Runner', 'Reader'")
     identity_progress = models.IntegerField(default=0, help_text="0-100 percent progress toward identity")
+    followers_count = models.PositiveIntegerField(default=0)
     
     # Statistics
     total_habits_created = models.IntegerField(default=0)
@@ -73,6 +81,34 @@ class Meta:
     
     def __str__(self):
         return f"Profile: {self.user.username}"
+    
+    @classmethod
+    def add_counters(
+        cls, user_id, points=0, completions=0, current_streak=None, best_streak=None
+    ) -> int:
+        """Atomically apply counter changes for a user's profile.
+
+        Issues a single `UPDATE ... SET total_points = total_points + n, ...`
+        touching only the affected columns, so concurrent writers never lose
+        each other's increments. Streak values only ever raise the stored maximum.
+        Returns the number of rows updated (0 if the profile does not exist).
+        """
+        updates = {'updated_at': timezone.now()}
+        if points:
+            total_points = F('total_points') + points
+            updates['total_points'] = total_points
+            # Simple level formula: one level per POINTS_PER_LEVEL points
+            updates['level'] = Greatest(1, total_points / cls.POINTS_PER_LEVEL + 1)
+        if completions:
+            updates['total_completions'] = F('total_completions') + completions
+        if current_streak is not None:
+            updates['current_streak'] = Greatest(F('current_streak'), current_streak)
+        if best_streak is not None:
+            updates['best_streak'] = Greatest(F('best_streak'), best_streak)
+        updated = cls.objects.filter(user_id=user_id).update(**updates)
+        # Profile totals are part of the cached habit statistics
+        bump_user_version(user_id, 'habits')
+        return updated
 
 
 class Follow(models.Model):
@@ -1,9 +1,11 @@
 """
 Users app signals - Automatically create UserProfile when User is created
+and keep follower counts up to date
 """
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import User, UserProfile
+from .models import Follow, User, UserProfile
 
 
 @receiver(post_save, sender=User)
@@ -25,22 +27,16 @@ def create_user_profile(sender, instance, created, **kwargs):
         )
 
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """
-    Save the UserProfile whenever the User is saved.
-    Creates profile if it doesn't exist (safety net).
-    """
-    if not hasattr(instance, 'profile'):
-        UserProfile.objects.create(
-            user=instance,
-            total_habits_created=0,
-            total_completions=0,
-            current_streak=0,
-            best_streak=0,
-            total_points=0,
-            level=1,
-            identity_progress=0,
+@receiver(post_save, sender=Follow)
+def increment_followers_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserProfile.objects.filter(user_id=instance.following_id).update(
+            followers_count=F('followers_count') + 1
         )
-    else:
-        instance.profile.save()
\ No newline at end of file
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(sender, instance, **kwargs):
+    UserProfile.objects.filter(user_id=instance.following_id, followers_count__gt=0).update(
+        followers_count=F('followers_count') - 1
+    )
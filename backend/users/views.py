@@ -3,12 +3,8 @@
 
 Import order: Django/standard lib -> DRF -> third-party -> local apps.
 """
-from datetime import timedelta
-
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
-from django.db.models import Q, Count, F
-from django.utils import timezone
+from django.db.models import Q, F
 
 from rest_framework import generics, serializers, status, views, viewsets
 from rest_framework.decorators import action
@@ -18,8 +14,10 @@
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from habits.models import Badge, Habit, HabitEntry, PointsTransaction, UserBadge
+from core.utils import cache as aggregates
+from habits.models import Badge, Challenge, Habit, PointsTransaction, UserBadge
 from habits.serializers import UserBadgeSerializer
+from users import leaderboard
 from users.models import Follow, UserProfile
 from users.serializers import (
     UserRegistrationSerializer,
@@ -209,12 +207,14 @@ def patch(self, request, *args, **kwargs):
         # Update user fields
         for field, value in user_data.items():
             setattr(user, field, value)
-        user.save()
+        if user_data:
+            user.save(update_fields=[*user_data, 'updated_at'])
         
         # Update profile fields
         for field, value in profile_data.items():
             setattr(profile, field, value)
-        profile.save()
+        if profile_data:
+            profile.save(update_fields=[*profile_data, 'updated_at'])
         
         # Return updated profile data
         serializer = self.get_serializer(profile)
@@ -330,7 +330,7 @@ def post(self, request):
         
         user = request.user
         user.avatar = request.FILES['avatar']
-        user.save()
+        user.save(update_fields=['avatar', 'updated_at'])
         
         # Return updated user data
         return Response(UserSerializer(user).data, status=status.HTTP_200_OK)
@@ -470,89 +470,126 @@ class CommunityStatsView(views.APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        cache_key = 'community_stats_v1'
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-
-        now = timezone.now()
-        last_24h = now - timedelta(hours=24)
-
-        total_users = User.objects.filter(is_active=True).count()
-        total_habits = Habit.objects.filter(is_active=True).count()
-
-        # Users with completions in last 24h based on completed_at
-        recent_entries = HabitEntry.objects.filter(
-            completed=True,
-            completed_at__gte=last_24h
-        ).select_related('habit')
-
-        completions_today = recent_entries.count()
-        active_user_ids = recent_entries.values_list('habit__user_id', flat=True).distinct()
-        active_today = active_user_ids.count()
-
-        data = {
-            'total_users': total_users,
-            'active_today': active_today,
-            'total_habits': total_habits,
-            'completions_today': completions_today,
-        }
-        cache.set(cache_key, data, 300)  # 5 minutes
-        return Response(data)
+        return Response(aggregates.get('community_stats'))
 
 
 class LeaderboardView(views.APIView):
+    """
+    Ranked users served from the precomputed leaderboards (see users.leaderboard).
+
+    GET /api/v1/users/community/leaderboard/
+    - type: completions (default) | streak | points; `weekly` is kept as an
+      alias for weekly completions
+    - window: daily | weekly (default) | monthly | all_time, for completions
+    - scope: global (default) | following (the user and the people they
+      follow) | challenge (requires challenge=<id>, completions only; ranks
+      the challenge dates, so window is null) | category (requires
+      category=<name>, completions only)
+    - limit: 1-100 (default 5)
+    Response: {"type", "window", "scope",
+               "results": [{"rank", "score", "user", "current_streak", "weekly_completions", "total_points"}],
+               "me": {"rank", "score"} or null}
+    """
     permission_classes = [IsAuthenticated]
+    TYPES = ('completions', 'streak', 'points')
+    SCOPES = ('global', 'following', 'challenge', 'category')
+    DEFAULT_LIMIT = 5
+    MAX_LIMIT = 100
 
     def get(self, request):
-        lb_type = request.query_params.get('type', 'weekly')
-        now = timezone.now()
-        week_ago = now.date() - timedelta(days=7)
-
-        # Weekly completions aggregation
-        weekly_qs = HabitEntry.objects.filter(
-            completed=True,
-            date__gte=week_ago
-        ).values('habit__user_id').annotate(
-            weekly_completions=Count('id')
-        )
-        weekly_map = {row['habit__user_id']: row['weekly_completions'] for row in weekly_qs}
+        params = request.query_params
+        lb_type = params.get('type', 'completions')
+        window = params.get('window', 'weekly')
+        if lb_type == 'weekly':
+            lb_type, window = 'completions', 'weekly'
+        scope = params.get('scope', 'global')
+
+        if lb_type not in self.TYPES:
+            return self._error(f"type must be one of: {', '.join(self.TYPES)}")
+        if window not in leaderboard.WINDOWS:
+            return self._error(f"window must be one of: {', '.join(leaderboard.WINDOWS)}")
+        if scope not in self.SCOPES:
+            return self._error(f"scope must be one of: {', '.join(self.SCOPES)}")
+        try:
+            limit = int(params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.MAX_LIMIT:
+            return self._error(f'limit must be between 1 and {self.MAX_LIMIT}')
+
+        boards = {
+            'completions': leaderboard.completions_board(window),
+            'streak': leaderboard.STREAK,
+            'points': leaderboard.POINTS,
+        }
+        board = boards[lb_type]
+        if scope == 'challenge':
+            try:
+                challenge_id = int(params.get('challenge'))
+            except (TypeError, ValueError):
+                challenge_id = None
+            if challenge_id is None or not Challenge.objects.filter(id=challenge_id).exists():
+                return self._error('challenge must be the id of an existing challenge')
+            if lb_type != 'completions':
+                return self._error('challenge leaderboards rank completions only')
+            # Challenge boards rank completions between the challenge dates
+            board = leaderboard.challenge_board(challenge_id)
+            window = None
+        elif scope == 'category':
+            category = params.get('category')
+            if category not in dict(Habit.CATEGORY_CHOICES):
+                return self._error('category must be a valid habit category')
+            if lb_type != 'completions':
+                return self._error('category leaderboards rank completions only')
+            board = leaderboard.completions_board(window, category=category)
+
+        me = None
+        if scope == 'following':
+            member_ids = list(
+                Follow.objects.filter(follower=request.user).values_list('following_id', flat=True)
+            ) + [request.user.id]
+            ranked = leaderboard.rank_among(board, member_ids)
+            for position, user_id, score in ranked:
+                if user_id == request.user.id:
+                    me = {'rank': position, 'score': score}
+            ranked = ranked[:limit]
+        else:
+            ranked = leaderboard.top(board, limit)
+            mine = leaderboard.rank(board, request.user.id)
+            if mine:
+                me = {'rank': mine[0], 'score': mine[1]}
+
+        # The headline stats for the ranked users, one lookup per board
+        user_ids = [user_id for _, user_id, _ in ranked]
+        weekly_map = leaderboard.scores(leaderboard.completions_board('weekly'), user_ids)
+        streak_map = leaderboard.scores(leaderboard.STREAK, user_ids)
+        points_map = leaderboard.scores(leaderboard.POINTS, user_ids)
+        users = User.objects.only('id', 'username', 'first_name').in_bulk(user_ids)
 
-        # Current streaks approximation: use max habit.current_streak per user
-        streak_qs = Habit.objects.filter(is_active=True).values('user_id').annotate(
-            current_streak=Count('id')  # placeholder, override with max below
-        )
-        # We will compute max current_streak per user efficiently
-        streak_map = {}
-        for h in Habit.objects.filter(is_active=True).values('user_id', 'current_streak'):
-            uid = h['user_id']
-            cs = h['current_streak'] or 0
-            if uid not in streak_map or cs > streak_map[uid]:
-                streak_map[uid] = cs
-
-        # Total points from profile
-        profile_fields = UserProfile.objects.values('user_id', 'total_points')
-        points_map = {p['user_id']: p['total_points'] for p in profile_fields}
-
-        user_ids = set(weekly_map.keys()) | set(streak_map.keys()) | set(points_map.keys())
-        users = User.objects.filter(id__in=user_ids).values('id', 'username', 'first_name')
-
-        # Build result list
         results = []
-        for u in users:
-            uid = u['id']
+        for position, user_id, score in ranked:
+            user = users.get(user_id)
+            if user is None:
+                continue
             results.append({
-                'user': {'username': u['username'], 'first_name': u['first_name']},
-                'current_streak': int(streak_map.get(uid, 0)),
-                'weekly_completions': int(weekly_map.get(uid, 0)),
-                'total_points': int(points_map.get(uid, 0)),
+                'rank': position,
+                'score': score,
+                'user': {'username': user.username, 'first_name': user.first_name},
+                'current_streak': streak_map.get(user_id, 0),
+                'weekly_completions': weekly_map.get(user_id, 0),
+                'total_points': points_map.get(user_id, 0),
             })
 
-        # Sort primarily by weekly_completions desc, then current_streak desc, then points desc
-        results.sort(key=lambda r: (r['weekly_completions'], r['current_streak'], r['total_points']), reverse=True)
-        results = results[:5]
+        return Response({
+            'type': lb_type,
+            'window': window,
+            'scope': scope,
+            'results': results,
+            'me': me,
+        })
 
-        return Response({'results': results})
+    def _error(self, message):
+        return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class UserLevelView(views.APIView):
@@ -571,7 +608,7 @@ def get(self, request):
         current_level = user_profile.level
         
         # Simple leveling system: 100 points per level
-        points_per_level = 100
+        points_per_level = UserProfile.POINTS_PER_LEVEL
         points_for_current_level = (current_level - 1) * points_per_level
         points_for_next_level = current_level * points_per_level
         points_in_current_level = total_points - points_for_current_level
@@ -580,7 +617,7 @@ def get(self, request):
         calculated_level = max(1, total_points // points_per_level + 1)
         if calculated_level != current_level:
             user_profile.level = calculated_level
-            user_profile.save()
+            user_profile.save(update_fields=['level', 'updated_at'])
             current_level = calculated_level
         
         return Response({
@@ -223,8 +223,12 @@ class APIClient {
   }
 
   // ===== Community / Gamification =====
-  async getSocialFeed() {
-    const response = await this.client.get('habits/feed/');
+  // Returns { results, next_cursor }; pass next_cursor back as `cursor` for the next page
+  async getSocialFeed({ cursor, pageSize } = {}) {
+    const params = {};
+    if (cursor) params.cursor = cursor;
+    if (pageSize) params.page_size = pageSize;
+    const response = await this.client.get('habits/feed/', { params });
     return response.data;
   }
 